@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+from ubuntu_archive_assistant.utils import bugtools
+
+LP = 'https://api.launchpad.net/devel/'
+
+
+def fake_task(bug_id, package, assignee=None):
+    return SimpleNamespace(status='New', importance='High',
+                           web_link='https://launchpad.net/bugs/%s' % bug_id,
+                           self_link=LP + 'ubuntu/+source/%s/+bug/%s' % (package, bug_id),
+                           bug_link=LP + 'bugs/%s' % bug_id,
+                           target_link=LP + 'ubuntu/+source/%s' % package,
+                           assignee_link=LP + '~%s' % assignee if assignee else None)
+
+
+def fake_load(link, fields):
+    name = link.rsplit('/', 1)[-1].lstrip('~')
+    values = {'id': int(name) if name.isdigit() else None,
+              'title': 'Bug %s' % name, 'web_link': link,
+              'name': name, 'display_name': name.title(),
+              'duplicate_of_link': None}
+    return dict((field, values[field]) for field in fields)
+
+
+class TestHydrateTasks(unittest.TestCase):
+
+    def setUp(self):
+        self.loaded = []
+        self.threads = set()
+        self.lock = threading.Lock()
+        self.tasks = [fake_task(1, 'foo', 'alice'),
+                      fake_task(1, 'bar', 'alice'),
+                      fake_task(2, 'foo')]
+
+    def _load(self, link, fields):
+        with self.lock:
+            self.loaded.append(link)
+            self.threads.add(threading.get_ident())
+        return fake_load(link, fields)
+
+    def _hydrate(self, **kwargs):
+        with mock.patch.object(bugtools, '_load_fields', self._load):
+            return bugtools.hydrate_tasks(self.tasks, jobs=4, **kwargs)
+
+    def test_links_loaded_once(self):
+        self._hydrate()
+        self.assertEqual(sorted(set(self.loaded)), sorted(self.loaded))
+        self.assertEqual(5, len(self.loaded))
+
+    def test_hydrated(self):
+        tasks = self._hydrate()
+        self.assertEqual([1, 1, 2], [task.bug.id for task in tasks])
+        self.assertEqual(['foo', 'bar', 'foo'], [task.target.name for task in tasks])
+        self.assertEqual('Alice', tasks[0].assignee.display_name)
+        self.assertIsNone(tasks[2].assignee)
+
+        lines = []
+        bugtools.list_bugs(lambda line: lines.append(line), tasks)
+        self.assertEqual(5, len(lines))
+        self.assertEqual("(LP: #1) Bug 1", lines[0])
+
+    def test_executor(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            workers = set(executor.submit(threading.get_ident).result() for _ in range(4))
+            self._hydrate(executor=executor)
+            self._hydrate(executor=executor)
+            # Still running after both calls, on the same threads
+            workers.update(executor.submit(threading.get_ident).result() for _ in range(4))
+        self.assertEqual(10, len(self.loaded))
+        self.assertLessEqual(self.threads, workers)
+        self.assertLessEqual(len(workers), 2)
+
+
+class TestBugTaskStore(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.path = os.path.join(self.workdir, 'mir', 'tasks.json')
+        self.searches = []
+        self.results = [fake_task(1, 'foo', 'alice'), fake_task(2, 'bar')]
+        patcher = mock.patch.object(bugtools, '_load_fields', fake_load)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _search(self, **kwargs):
+        self.searches.append(kwargs)
+        return self.results
+
+    def _sync(self, **kwargs):
+        store = bugtools.BugTaskStore(self.path)
+        store.sync(self._search, ('New', 'Fix Committed'), jobs=2, **kwargs)
+        return store
+
+    def test_full_sync(self):
+        store = self._sync()
+        self.assertNotIn('modified_since', self.searches[0])
+        self.assertEqual([1, 2], [task.bug.id for task in store.get_tasks(('New',))])
+        self.assertEqual([], store.get_tasks(('Fix Committed',)))
+
+    def test_incremental_sync(self):
+        self._sync()
+        fixed = fake_task(1, 'foo', 'alice')
+        fixed.status = 'Fix Committed'
+        closed = fake_task(2, 'bar')
+        closed.status = 'Fix Released'
+        self.results = [fixed, closed, fake_task(3, 'baz')]
+
+        store = self._sync()
+        self.assertIn('modified_since', self.searches[1])
+        self.assertEqual([3], [task.bug.id for task in store.get_tasks(('New',))])
+        self.assertEqual([1], [task.bug.id for task in store.get_tasks(('Fix Committed',))])
+
+        # The store is saved, and a full sync can still be forced.
+        self.results = []
+        store = self._sync(full=True)
+        self.assertNotIn('modified_since', self.searches[2])
+        self.assertEqual([], store.get_tasks(('New', 'Fix Committed')))
@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import unittest
+
+from ubuntu_archive_assistant.utils.builds import BuildResults
+
+
+class CountingBuildResults(BuildResults):
+
+    def __init__(self):
+        super().__init__(jobs=4)
+        self.lookups = []
+        self.lookups_lock = threading.Lock()
+
+    def lookup(self, source, version):
+        with self.lookups_lock:
+            self.lookups.append((source, version))
+        return {'uploads': {}, 'builds': [], 'source_package_name': source,
+                'source_package_version': version}
+
+
+class TestBuildResults(unittest.TestCase):
+
+    def setUp(self):
+        self.builds = CountingBuildResults()
+        self.addCleanup(self.builds.shutdown)
+
+    def test_memoized(self):
+        for _ in range(3):
+            self.builds.prefetch('foo', '1.0')
+        self.builds.prefetch('foo', '1.1')
+        self.assertEqual('1.0', self.builds.get('foo', '1.0')['source_package_version'])
+        self.assertEqual('1.1', self.builds.get('foo', '1.1')['source_package_version'])
+        self.assertEqual([('foo', '1.0'), ('foo', '1.1')], sorted(self.builds.lookups))
@@ -16,9 +16,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import sys
+import types
 import unittest
 
-from ubuntu_archive_assistant.command import AssistantCommand
+from ubuntu_archive_assistant import commands
+from ubuntu_archive_assistant.command import AssistantCommand, LazyCommand
 
 # class AssistantCommand():
 #    def print_usage(self):
@@ -44,6 +46,19 @@ class MySubCommand(AssistantCommand):
         self._args.append("extra")
 
 
+class MyLazyCommand(AssistantCommand):
+
+    instances = 0
+
+    def __init__(self, logger):
+        super().__init__(command_id="lazytest", description="lazy test", logger=logger)
+        MyLazyCommand.instances += 1
+
+    def run(self):
+        global scratch
+        scratch = self._args
+
+
 def do_nothing():
     return
 
@@ -109,3 +124,24 @@ class TestCommand(unittest.TestCase):
         except Exception as e:
             self.assertIn('unexpected', e.args)
 
+    def test_import_subcommands_manifest(self):
+        manifest = types.SimpleNamespace(COMMANDS=[commands.CommandEntry(
+            'MyLazyCommand', __name__, 'lazytest', 'lazy test')])
+        main = MyMainCommand()
+        main._import_subcommands(manifest)
+        command = main.subcommands['MyLazyCommand']['instance']
+        self.assertIsInstance(command, LazyCommand)
+        self.assertEqual(0, MyLazyCommand.instances)
+
+        main._args = ['lazytest', 'extra']
+        main.parse_args()
+        main.run_command()
+        self.assertEqual(1, MyLazyCommand.instances)
+        self.assertEqual(['extra'], scratch)
+
+    def test_commands_manifest(self):
+        main = MyMainCommand()
+        for entry in commands.COMMANDS:
+            command = getattr(commands, entry.name)(main.logger)
+            self.assertEqual((entry.command_id, entry.description),
+                             (command.command_id, command.description))
@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from unittest import mock
+
+import requests
+
+from ubuntu_archive_assistant.utils.debian_ci import (DebianCIResults, pool_prefix,
+                                                      DEBIAN_CI_URL)
+
+STATUS_URL = DEBIAN_CI_URL + '/data/status/unstable/{}/packages.json'
+LATEST_URL = DEBIAN_CI_URL + '/data/packages/unstable/amd64/{}/{}/latest.json'
+
+
+class TestDebianCIResults(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.responses = {
+            LATEST_URL.format('f', 'foo'): {'package': 'foo', 'status': 'pass'},
+            LATEST_URL.format('libb', 'libbar'): {'package': 'libbar', 'status': 'fail'},
+            STATUS_URL.format('amd64'): [{'package': 'foo', 'status': 'pass'},
+                                         {'package': 'libbar', 'status': 'fail'}],
+            STATUS_URL.format('arm64'): [{'package': 'foo', 'status': 'neutral'}],
+        }
+        self.urls = []
+
+    def _get(self, url):
+        self.urls.append(url)
+        response = mock.Mock()
+        if url not in self.responses:
+            response.raise_for_status.side_effect = requests.HTTPError('404')
+        response.json.return_value = self.responses.get(url)
+        return response
+
+    def _results(self, **kwargs):
+        results = DebianCIResults(cache_path=self.workdir, **kwargs)
+        results.session = mock.Mock()
+        results.session.get.side_effect = self._get
+        return results
+
+    def test_pool_prefix(self):
+        self.assertEqual('f', pool_prefix('foo'))
+        self.assertEqual('libb', pool_prefix('libbar'))
+        self.assertEqual('l', pool_prefix('lua'))
+
+    def test_get(self):
+        results = self._results()
+        self.assertEqual('pass', results.get('foo', 'amd64')['status'])
+        self.assertEqual('fail', results.get('libbar', 'amd64')['status'])
+        self.assertEqual([LATEST_URL.format('f', 'foo'), LATEST_URL.format('libb', 'libbar')],
+                         self.urls)
+        # Kept in memory
+        results.get('foo', 'amd64')
+        self.assertEqual(2, len(self.urls))
+
+    def test_disk_cache(self):
+        self._results().get('foo', 'amd64')
+        self.responses[LATEST_URL.format('f', 'foo')] = {'package': 'foo', 'status': 'fail'}
+
+        # Fresh enough
+        self.assertEqual('pass', self._results().get('foo', 'amd64')['status'])
+        self.assertEqual(1, len(self.urls))
+
+        # Older than 30 minutes
+        path = os.path.join(self.workdir, 'debian-ci', 'unstable', 'amd64', 'foo.json')
+        os.utime(path, (0, 0))
+        self.assertEqual('fail', self._results().get('foo', 'amd64')['status'])
+        self.assertEqual(2, len(self.urls))
+
+    def test_bulk(self):
+        results = self._results(bulk=True)
+        self.assertEqual('fail', results.get('libbar', 'amd64')['status'])
+        self.assertEqual('pass', results.get('foo', 'amd64')['status'])
+        self.assertIsNone(results.get('missing', 'amd64'))
+        self.assertEqual('neutral', results.get('foo', 'arm64')['status'])
+        self.assertEqual([STATUS_URL.format('amd64'), STATUS_URL.format('arm64')], self.urls)
+        self.assertEqual({'foo': {'package': 'foo', 'status': 'pass'}, 'missing': None},
+                         results.get_many(['missing', 'foo', 'foo'], 'amd64'))
+
+    def test_get_many(self):
+        results = self._results(jobs=2)
+        self.assertEqual({'foo': {'package': 'foo', 'status': 'pass'},
+                          'libbar': {'package': 'libbar', 'status': 'fail'},
+                          'missing': None},
+                         results.get_many(['libbar', 'missing', 'foo', 'libbar'], 'amd64'))
+        self.assertEqual(3, len(self.urls))
+
+    def test_errors(self):
+        results = self._results()
+        self.assertIsNone(results.get('missing', 'amd64'))
+        self.assertEqual({}, self._results(bulk=True).load_status('s390x'))
+        self.assertIsNone(self._results(bulk=True).get('foo', 's390x'))
+        response = mock.Mock()
+        response.json.side_effect = ValueError('not JSON')
+        results.session.get.side_effect = lambda url: response
+        self.assertIsNone(results.get('foo', 'amd64'))
+
+    def test_concurrent_status(self):
+        results = self._results(bulk=True)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_get(url):
+            if 'amd64' in url:
+                started.set()
+                release.wait(10)
+            return self._get(url)
+
+        results.session.get.side_effect = slow_get
+        thread = threading.Thread(target=results.load_status, args=('amd64',))
+        thread.start()
+        try:
+            self.assertTrue(started.wait(10))
+            # Not held up by the download for amd64
+            self.assertEqual('neutral', results.get('foo', 'arm64')['status'])
+            self.assertTrue(thread.is_alive())
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual('pass', results.get('foo', 'amd64')['status'])
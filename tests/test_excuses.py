@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import yaml
+import shutil
+import tempfile
+import unittest
+
+from ubuntu_archive_assistant.utils.excuses import ExcusesIndex
+
+
+def excuses_item(name, **kwargs):
+    item = {
+        'item-name': name,
+        'source': name.lstrip('-').split('/')[0],
+        'excuses': ["Migration status: BLOCKED\nsecond line: here"],
+        'policy_info': {'age': {'current-age': 1.5}},
+        'reason': ['depends'],
+    }
+    item.update(kwargs)
+    return item
+
+
+class TestExcusesIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'excuses.yaml')
+        self.index_path = self.path + '.index.json'
+        self.sources = [excuses_item('foo'),
+                        excuses_item('-bar', **{'new-version': '-'}),
+                        excuses_item('baz/amd64'),
+                        excuses_item("'quoted'")]
+        self._write({'generated-date': '2019-01-01 00:00:00',
+                     'sources': self.sources,
+                     'zz-after': ['not', 'an', 'item']})
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def _write(self, excuses, **kwargs):
+        with open(self.path, 'w') as fp:
+            yaml.dump(excuses, fp, **kwargs)
+
+    def test_items(self):
+        with ExcusesIndex(self.path) as excuses:
+            self.assertEqual(4, len(excuses))
+            self.assertEqual([s['item-name'] for s in self.sources], excuses.names())
+            self.assertEqual(self.sources, list(excuses.items()))
+
+    def test_get(self):
+        with ExcusesIndex(self.path) as excuses:
+            for item in self.sources:
+                self.assertIn(item['item-name'], excuses)
+                self.assertEqual([item], excuses.get(item['item-name']))
+            self.assertEqual([], excuses.get('missing'))
+
+    def test_indentation(self):
+        self._write({'sources': self.sources}, indent=4)
+        with ExcusesIndex(self.path) as excuses:
+            self.assertEqual(self.sources, excuses.get('foo') + excuses.get('-bar') +
+                             excuses.get('baz/amd64') + excuses.get("'quoted'"))
+
+    def test_index_reused(self):
+        with ExcusesIndex(self.path, index_path=self.index_path):
+            pass
+        self.assertTrue(os.path.exists(self.index_path))
+
+        excuses = ExcusesIndex(self.path, index_path=self.index_path)
+        excuses.scan = None
+        with excuses:
+            self.assertEqual([self.sources[2]], excuses.get('baz/amd64'))
+
+        self._write({'sources': [excuses_item('other')]})
+        with ExcusesIndex(self.path, index_path=self.index_path) as excuses:
+            self.assertEqual(['other'], excuses.names())
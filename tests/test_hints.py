@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ubuntu_archive_assistant.utils.hints import HintsIndex
+
+
+class TestHintsIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'hints-ubuntu')
+        os.mkdir(self.path)
+        self._write('ubuntu-release', "# comment\n"
+                                      "unblock foo/1.0-1 bar/2.0\n"
+                                      "force-badtest baz/3.1/amd64  # flaky\n")
+        self._write('freeze', "block-all source\nunblock frozen/1\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def _write(self, name, content):
+        with open(os.path.join(self.path, name), 'w') as fp:
+            fp.write(content)
+
+    def test_parse_line(self):
+        self.assertEqual((None, []), HintsIndex.parse_line("  # only a comment"))
+        self.assertEqual(('unblock', [('foo', '1.0-1'), ('bar', None)]),
+                         HintsIndex.parse_line("unblock foo/1.0-1 bar # why"))
+
+    def test_find_unblock(self):
+        index = HintsIndex(self.path)
+        hint = index.find_unblock('foo', '1.0-1')
+        self.assertEqual(('ubuntu-release', 2), (hint.file, hint.line))
+        self.assertIsNone(index.find_unblock('foo', '1.0-2'))
+        self.assertEqual('1.0-1', index.find_unblock('foo').version)
+        self.assertEqual('3.1/amd64', index.lookup('force-badtest', 'baz')[0].version)
+
+    def test_ignored_files(self):
+        index = HintsIndex(self.path)
+        self.assertIsNone(index.find_unblock('frozen'))
+
+    def test_index_reused(self):
+        HintsIndex(self.path).load()
+        self.assertTrue(os.path.exists(self.path + '.index.json'))
+
+        index = HintsIndex(self.path)
+        index.parse = None
+        self.assertIsNotNone(index.find_unblock('bar'))
+
+        self._write('ubuntu-release', "unblock qux/1\n")
+        index = HintsIndex(self.path)
+        self.assertIsNone(index.find_unblock('bar'))
+        self.assertIsNotNone(index.find_unblock('qux', '1'))
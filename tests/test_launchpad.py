@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from ubuntu_archive_assistant.utils.launchpad import ResourceCache
+
+
+class TestResourceCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def _fetch(self, name):
+        self.calls.append(name)
+        return name.upper()
+
+    def _stats(self, kind):
+        return ResourceCache.stats().get(kind, (0, 0))
+
+    def test_memoized(self):
+        cache = ResourceCache(ttl={'test-memo': 60})
+        hits, misses = self._stats('test-memo')
+        self.assertEqual('A', cache.get('test-memo', 'a', self._fetch, 'a'))
+        self.assertEqual('A', cache.get('test-memo', 'a', self._fetch, 'a'))
+        self.assertEqual('B', cache.get('test-memo', 'b', self._fetch, name='b'))
+        self.assertEqual(['a', 'b'], self.calls)
+        self.assertEqual((hits + 1, misses + 2), self._stats('test-memo'))
+
+    def test_expired(self):
+        cache = ResourceCache(ttl={'test-expired': 0})
+        cache.get('test-expired', 'a', self._fetch, 'a')
+        cache.get('test-expired', 'a', self._fetch, 'a')
+        self.assertEqual(['a', 'a'], self.calls)
+
+    def test_clear(self):
+        cache = ResourceCache(ttl={'test-clear': 60})
+        cache.get('test-clear', 'a', self._fetch, 'a')
+        cache.clear()
+        cache.get('test-clear', 'a', self._fetch, 'a')
+        self.assertEqual(['a', 'a'], self.calls)
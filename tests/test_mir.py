@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+
+from concurrent.futures import Future
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+from unittest import mock
+
+from ubuntu_archive_assistant.commands import mir
+from ubuntu_archive_assistant.logging import AssistantLogger
+
+
+class TestPullSource(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.sources_path = os.path.join(self.workdir, 'sources')
+        self.version = '1.0-1'
+        self.pulls = []
+        self.shells = []
+
+        lp = mock.Mock()
+        lp.published_sources.side_effect = lambda **kwargs: [
+            SimpleNamespace(source_package_version=self.version)]
+        for target, replacement in ((mir.launchpad, 'LaunchpadInstance'),
+                                    (mir.subprocess, 'run'),
+                                    (mir.subprocess, 'call')):
+            patcher = mock.patch.object(target, replacement)
+            self.addCleanup(patcher.stop)
+            patched = patcher.start()
+            if replacement == 'LaunchpadInstance':
+                patched.return_value = lp
+            elif replacement == 'run':
+                patched.side_effect = self._pull
+            else:
+                patched.side_effect = self._shell
+
+        self.command = mir.MIRReview(AssistantLogger(module='mir_test'))
+        self.command.cache_path = self.workdir
+
+    def _pull(self, args, cwd=None, **kwargs):
+        self.pulls.append(args)
+        if self.version == 'broken':
+            os.mkdir(os.path.join(cwd, 'partial'))
+            raise subprocess.CalledProcessError(1, args, output='no such version')
+        source, version = args[1:]
+        os.mkdir(os.path.join(cwd, '%s-%s' % (source, version.split('-')[0])))
+        with open(os.path.join(cwd, '%s_%s.dsc' % (source, version)), 'w') as fp:
+            fp.write(version)
+
+    def _shell(self, args, cwd=None):
+        self.shells.append((cwd, sorted(os.listdir(cwd))))
+        # Changes made during the review don't reach the cache
+        for entry in os.listdir(cwd):
+            if entry.endswith('.dsc'):
+                os.unlink(os.path.join(cwd, entry))
+        return 0
+
+    def test_pull(self):
+        path = self.command.pull_source('foo')
+        self.assertEqual(os.path.join(self.sources_path, 'foo_1.0-1'), path)
+        self.assertEqual([['pull-lp-source', 'foo', '1.0-1']], self.pulls)
+        self.assertEqual(['foo-1.0', 'foo_1.0-1.dsc'], sorted(os.listdir(path)))
+        # Only the complete pull is left behind
+        self.assertEqual(['foo_1.0-1'], os.listdir(self.sources_path))
+
+    def test_cached(self):
+        path = self.command.pull_source('foo')
+        self.assertEqual(path, self.command.pull_source('foo'))
+        self.assertEqual(1, len(self.pulls))
+
+    def test_evict(self):
+        self.command.pull_source('foo')
+        self.command.pull_source('foobar')
+        self.version = '1.0-2'
+        path = self.command.pull_source('foo')
+        self.assertEqual(2, len([args for args in self.pulls if args[1] == 'foo']))
+        self.assertEqual(['foo_1.0-2', 'foobar_1.0-1'], sorted(os.listdir(self.sources_path)))
+        self.assertEqual(os.path.join(self.sources_path, 'foo_1.0-2'), path)
+
+    def test_failed_pull(self):
+        self.command.pull_source('foo')
+        self.version = 'broken'
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.command.pull_source('foo')
+        # Neither the partial pull nor the cached version are removed
+        self.assertEqual(['foo_1.0-1'], os.listdir(self.sources_path))
+
+    def test_review_copy(self):
+        pulled = Future()
+        pulled.set_result(self.command.pull_source('foo'))
+        with redirect_stdout(io.StringIO()):
+            self.command.open_source_tmpdir('foo', pulled)
+
+        review_path, contents = self.shells[0]
+        self.assertEqual('foo_1.0-1', os.path.basename(review_path))
+        self.assertFalse(review_path.startswith(self.workdir))
+        self.assertEqual(['foo-1.0', 'foo_1.0-1.dsc'], contents)
+        self.assertFalse(os.path.exists(review_path))
+        self.assertEqual(['foo-1.0', 'foo_1.0-1.dsc'],
+                         sorted(os.listdir(pulled.result())))
+
+    def test_review_pulls(self):
+        with redirect_stdout(io.StringIO()):
+            self.command.open_source_tmpdir('foo')
+        self.assertEqual(1, len(self.pulls))
+        self.assertEqual(['foo-1.0', 'foo_1.0-1.dsc'], self.shells[0][1])
+
+    def test_review_failed_pull(self):
+        pulled = Future()
+        pulled.set_exception(subprocess.CalledProcessError(1, 'pull-lp-source',
+                                                           output='no such version'))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.command.open_source_tmpdir('foo', pulled)
+        self.assertIn("pull-lp-source foo failed:\nno such version", output.getvalue())
+        # Still dropped to a shell, in an empty directory
+        self.assertEqual([], self.shells[0][1])
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+import subprocess
+import http.client
+
+from ubuntu_archive_assistant.utils import profiling
+from ubuntu_archive_assistant.utils.tasks import TaskGraph
+
+
+def process_branch():
+    with profiling.task('leaf'):
+        return True
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_inactive(self):
+        self.assertFalse(profiling.active())
+        with profiling.task('nothing'):
+            self.assertEqual((), profiling.current_path())
+
+    def test_task_hierarchy(self):
+        with profiling.Profiler() as profiler:
+            with profiling.task('command'):
+                with profiling.task('first'):
+                    pass
+                graph = TaskGraph()
+                graph.add(process_branch)
+                graph.add(process_branch)
+                graph.run()
+        self.assertFalse(profiling.active())
+        self.assertEqual({('command',), ('command', 'first'),
+                          ('command', 'branch'), ('command', 'branch', 'leaf')},
+                         set(profiler.times))
+        self.assertEqual(2, profiler.times[('command', 'branch', 'leaf')][0])
+
+        output = io.StringIO()
+        profiler.report(file=output)
+        self.assertIn("\n    leaf ", output.getvalue())
+
+    def test_external_calls(self):
+        with profiling.Profiler() as profiler:
+            conn = http.client.HTTPConnection('launchpad.example')
+            conn.putrequest('GET', '/')
+            subprocess.call(['true'])
+        conn.close()
+        self.assertEqual({'launchpad.example': 1}, dict(profiler.hosts))
+        self.assertEqual({'true': 1}, dict(profiler.programs))
+
+    def test_pstats(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        path = os.path.join(workdir, 'profile.pstats')
+        with profiling.Profiler(path):
+            sorted(range(1000))
+        pstats.Stats(path)
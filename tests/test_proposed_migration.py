@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import json
+import yaml
+import shutil
+import logging
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from ubuntu_archive_assistant.commands.proposed_migration import ProposedMigration
+from ubuntu_archive_assistant.logging import (AssistantLogger, AssistantTaskLogger,
+                                              ReviewResult)
+from ubuntu_archive_assistant.utils.excuses import ExcusesIndex
+
+
+def excuses_item(name, age, reasons, **kwargs):
+    item = {
+        'item-name': name,
+        'source': name,
+        'old-version': '1.0-1',
+        'new-version': '1.0-2',
+        'maintainer': 'Someone',
+        'policy_info': {'age': {'current-age': age}},
+        'reason': reasons,
+    }
+    item.update(kwargs)
+    return item
+
+
+class ReportedMigration(ProposedMigration):
+    """Review the excuses without any network lookup: each package depends
+    on the packages in its 'blockers'.
+    """
+
+    def process(self, source, level):
+        task_logger = AssistantTaskLogger(source['source'], self.task_logger)
+        assistant = task_logger.newTask(source['source'], depth=level)
+        assistant.error("Next steps for {}:".format(source['source']),
+                        status=ReviewResult.NONE)
+        for blocker in source.get('blockers', []):
+            assistant.error("Depends on {}".format(blocker),
+                            status=ReviewResult.FAIL, depth=1)
+            self.find_excuses(blocker, level + 2)
+
+
+class TestReport(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.path = os.path.join(self.workdir, 'excuses.yaml')
+        sources = [
+            excuses_item('foo', 10.5, ['depends'], blockers=['lib']),
+            excuses_item('bar', 2, ['depends'], blockers=['lib']),
+            excuses_item('baz', 30, ['autopkgtest', 'block'], component='universe'),
+            excuses_item('lib', 1, ['autopkgtest']),
+        ]
+        with open(self.path, 'w') as fp:
+            yaml.dump({'sources': sources}, fp)
+
+        logger = AssistantLogger(module='report_test')
+        logger.setReviewLevel(logging.INFO)
+        self.command = ReportedMigration(logger)
+        self.command.excuses = ExcusesIndex(self.path)
+        self.command.excuses.open()
+        self.addCleanup(self.command.excuses.close)
+        self.command.evaluator = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.command.evaluator.shutdown)
+        self.command.teams = None
+        self.command.min_age = None
+        self.command.reasons = None
+        self.command.json_path = os.path.join(self.workdir, 'report.json')
+        self.command.get_team_mapping = lambda: {
+            'foo': ['desktop'], 'baz': ['foundations', 'desktop'], 'lib': ['foundations']}
+
+    def _report(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.command.report_excuses()
+        with open(self.command.json_path) as fp:
+            return json.load(fp), output.getvalue()
+
+    def test_json(self):
+        report, _ = self._report()
+        self.assertEqual(['foo', 'bar', 'baz', 'lib'],
+                         [entry['item-name'] for entry in report])
+        baz = report[2]
+        self.assertEqual({'item-name': 'baz', 'source': 'baz', 'old-version': '1.0-1',
+                          'new-version': '1.0-2', 'age': 30, 'component': 'universe',
+                          'maintainer': 'Someone', 'teams': [], 'is-candidate': False,
+                          'reasons': ['autopkgtest', 'block']},
+                         dict((key, value) for key, value in baz.items()
+                              if key != 'review'))
+        self.assertEqual('main', report[0]['component'])
+        self.assertEqual([(0, 'Next steps for baz:')],
+                         [(record['depth'], record['message'])
+                          for record in baz['review']])
+
+    def test_shared_blocker(self):
+        report, _ = self._report()
+        # Both packages blocked by lib show its review, whatever the order
+        for entry in report[:2]:
+            self.assertEqual([(0, 'Next steps for {}:'.format(entry['source'])),
+                              (1, 'Depends on lib'),
+                              (2, 'Next steps for lib:')],
+                             [(record['depth'], record['message'])
+                              for record in entry['review']])
+
+    def test_filters(self):
+        self.command.teams = ['desktop']
+        report, _ = self._report()
+        self.assertEqual(['foo', 'baz'], [entry['item-name'] for entry in report])
+        self.assertEqual(['foundations', 'desktop'], report[1]['teams'])
+
+        self.command.teams = None
+        self.command.min_age = 5
+        report, _ = self._report()
+        self.assertEqual(['foo', 'baz'], [entry['item-name'] for entry in report])
+
+        self.command.min_age = None
+        self.command.reasons = ['autopkgtest']
+        report, _ = self._report()
+        self.assertEqual(['baz', 'lib'], [entry['item-name'] for entry in report])
+
+    def test_summary(self):
+        _, output = self._report()
+        lines = output.splitlines()
+        self.assertEqual(['Source', 'Version', 'Age', 'Reasons'], lines[0].split())
+        self.assertEqual(['baz', 'foo', 'bar', 'lib'],
+                         [line.split()[0] for line in lines[2:6]])
+        self.assertEqual(['baz', '1.0-2', '30', 'autopkgtest,', 'block'], lines[2].split())
+        self.assertIn("4 packages blocked in proposed.", lines)
+        self.assertEqual([['autopkgtest', '2'], ['depends', '2']],
+                         sorted(line.split() for line in lines[-3:-1]))
+        self.assertEqual(['block', '1'], lines[-1].split())
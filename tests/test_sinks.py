@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import json
+import logging
+import unittest
+
+from ubuntu_archive_assistant.logging import (AssistantLogger, AssistantTaskLogger,
+                                              ReviewResult, ReviewTranscript,
+                                              ResultTree, NDJSONSink, TextSink, JSONSink)
+
+
+class TestResultSinks(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = AssistantLogger(module='sinks_test')
+        self.logger.setReviewLevel(logging.INFO)
+        self.addCleanup(self.logger.closeResultSinks)
+
+    def _review(self):
+        task_logger = AssistantTaskLogger('pkg', self.logger)
+        assistant = task_logger.newTask('pkg', depth=0)
+        assistant.critical("Next steps for pkg:", status=ReviewResult.NONE)
+        assistant.error("Fix it", status=ReviewResult.FAIL, depth=1)
+        assistant.warning("See %s", "there", status=ReviewResult.INFO, depth=2)
+        assistant.debug("not shown", status=ReviewResult.NONE)
+        assistant.info("Done", status=ReviewResult.PASS)
+
+    def test_tree(self):
+        tree = ResultTree()
+        self.logger.setResultSinks([tree])
+        self._review()
+
+        results = tree.results()
+        self.assertEqual(["Next steps for pkg:", "Done"],
+                         [node['message'] for node in results])
+        child = results[0]['children'][0]
+        self.assertEqual(('Fix it', 'fail', 'error', 1),
+                         (child['message'], child['status'], child['level'], child['depth']))
+        self.assertEqual('See there', child['children'][0]['message'])
+        self.assertEqual('review.sinks_test.pkg', child['task'])
+
+    def test_ndjson_buffered(self):
+        stream = io.StringIO()
+        self.logger.setResultSinks([NDJSONSink(stream, batch_size=3)])
+        self._review()
+        self.assertEqual(3, len(stream.getvalue().splitlines()))
+        self.logger.closeResultSinks()
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([0, 1, 2, 0], [record['depth'] for record in records])
+
+    def test_text_and_json(self):
+        text, tree = io.StringIO(), io.StringIO()
+        self.logger.setResultSinks([TextSink(text), JSONSink(tree)])
+        self._review()
+        self.logger.closeResultSinks()
+        self.assertEqual("Next steps for pkg: ", text.getvalue().splitlines()[0])
+        self.assertTrue(text.getvalue().splitlines()[1].startswith("  Fix it "))
+        self.assertEqual(2, len(json.loads(tree.getvalue())))
+
+    def test_transcript_replay(self):
+        tree = ResultTree()
+        self.logger.setResultSinks([tree])
+        with ReviewTranscript() as transcript:
+            self._review()
+        self.assertEqual([], tree.results())
+        transcript.replay(depth=1)
+        self.assertEqual([1, 1], [node['depth'] for node in tree.results()])
+
+    def test_transcript_export(self):
+        task_logger = AssistantTaskLogger('pkg', self.logger)
+        assistant = task_logger.newTask('pkg', depth=0)
+
+        def show_blocker(depth, name):
+            with ReviewTranscript() as blocker:
+                assistant.error("Blocked by %s", name, status=ReviewResult.FAIL, depth=1)
+            blocker.replay(depth)
+
+        with ReviewTranscript() as transcript:
+            self._review()
+            transcript.defer(show_blocker, 'other')
+        records = transcript.export(depth=1)
+        self.assertEqual(["Next steps for pkg:", "Fix it", "See there", "Done",
+                          "Blocked by other"], [record['message'] for record in records])
+        self.assertEqual([1, 2, 3, 1, 2], [record['depth'] for record in records])
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import logging
+import unittest
+
+from ubuntu_archive_assistant.logging import (AssistantLogger, ReviewResult,
+                                              ReviewTranscript)
+from ubuntu_archive_assistant.utils.tasks import TaskGraph
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestTaskGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = AssistantLogger(module='tasks_test')
+        self.logger.setReviewLevel(logging.DEBUG)
+        self.handler = ListHandler()
+        self.logger.review_logger.addHandler(self.handler)
+        self.logger.review_logger.propagate = False
+
+    def tearDown(self):
+        self.logger.review_logger.removeHandler(self.handler)
+
+    def _task(self, name, delay):
+        time.sleep(delay)
+        self.logger.review.error(name, status=ReviewResult.NONE)
+        return name
+
+    def test_output_in_order(self):
+        graph = TaskGraph()
+        graph.add(self._task, 'first', 0.2)
+        graph.add(self._task, 'second', 0.1)
+        graph.add(self._task, 'third', 0)
+        results = graph.run()
+        self.assertEqual(['first', 'second', 'third'], results)
+        self.assertEqual(['first ', 'second ', 'third '], self.handler.messages)
+
+    def test_nested_transcript(self):
+        with ReviewTranscript() as transcript:
+            graph = TaskGraph()
+            graph.add(self._task, 'first', 0.1)
+            graph.add(self._task, 'second', 0)
+            graph.run()
+        self.assertEqual([], self.handler.messages)
+        transcript.replay(depth=1)
+        self.assertEqual(['  first ', '  second '], self.handler.messages)
+
+    def test_deferred_call(self):
+        calls = []
+        with ReviewTranscript() as transcript:
+            self.logger.review.error('before', status=ReviewResult.NONE)
+            transcript.defer(lambda depth, name: calls.append((depth, name)), 'blocker')
+        transcript.replay(depth=2)
+        self.assertEqual([(2, 'blocker')], calls)
+        self.assertEqual(['    before '], self.handler.messages)
@@ -18,10 +18,14 @@
 import sys
 import os
 import argparse
+import functools
+import importlib
 import subprocess
 import logging
 
-from ubuntu_archive_assistant.logging import AssistantLogger, AssistantTaskLogger
+from ubuntu_archive_assistant.logging import (AssistantLogger, AssistantTaskLogger,
+                                              TextSink, JSONSink, NDJSONSink)
+from ubuntu_archive_assistant.utils import profiling
 
 
 class AssistantCommand(argparse.Namespace):
@@ -33,6 +37,10 @@ class AssistantCommand(argparse.Namespace):
         self.testing = testing
         self._args = None
         self.debug = False
+        self.profile = False
+        self.profile_output = None
+        self.review_format = None
+        self.review_output = None
         self.cache_path = None
         self.commandclass = None
         self.subcommands = {}
@@ -50,6 +58,17 @@ class AssistantCommand(argparse.Namespace):
                                  help='Enable debug messages')
         self.parser.add_argument('--verbose', action='store_true',
                                  help='Enable debug messages')
+        self.parser.add_argument('--profile', action='store_true',
+                                 help='Report the time spent per task and the network '
+                                      'calls made')
+        self.parser.add_argument('--profile-output', metavar='PSTATS',
+                                 help='With --profile, also save cProfile statistics '
+                                      'to PSTATS')
+        self.parser.add_argument('--review-format', choices=('text', 'json', 'ndjson'),
+                                 help='Format of the review output (default: text)')
+        self.parser.add_argument('--review-output', metavar='PATH',
+                                 help='Write the review output to PATH instead of '
+                                      'the terminal')
 
         if not leaf:
             self.subparsers = self.parser.add_subparsers(title='Available commands',
@@ -83,7 +102,46 @@ class AssistantCommand(argparse.Namespace):
         if self.leaf_command and 'help' in self._args:
             self.print_usage()
 
-        self.func()
+        stream = self.open_result_sinks()
+        try:
+            self.run_profiled()
+        finally:
+            if stream is not None:
+                self.logger.closeResultSinks()
+                if stream not in (sys.stdout, sys.stderr):
+                    stream.close()
+
+    def run_profiled(self):
+        if not self.profile or profiling.active():
+            with profiling.task(self.command_id or 'main'):
+                self.func()
+            return
+
+        profiler = profiling.Profiler(self.profile_output)
+        try:
+            with profiler, profiling.task(self.command_id or 'main'):
+                self.func()
+        finally:
+            profiler.report()
+
+    def open_result_sinks(self):
+        """Set up the result sink asked for on the command line, if any,
+        and return the stream it writes to.
+        """
+        review_format = self.review_format or 'text'
+        if AssistantLogger.sinks() or (review_format == 'text' and not self.review_output):
+            return None
+
+        if self.review_output and self.review_output != '-':
+            stream = open(self.review_output, 'w')
+        elif review_format == 'text':
+            stream = sys.stderr
+        else:
+            stream = sys.stdout
+
+        sink_class = {'text': TextSink, 'json': JSONSink, 'ndjson': NDJSONSink}[review_format]
+        self.logger.setResultSinks([sink_class(stream)])
+        return stream
 
     def print_usage(self):
         self.parser.print_help(file=sys.stderr)
@@ -108,7 +166,43 @@ class AssistantCommand(argparse.Namespace):
         self.subcommands[name]['parser'] = p
 
     def _import_subcommands(self, submodules):
+        manifest = getattr(submodules, 'COMMANDS', None)
+        if manifest is not None:
+            for entry in manifest:
+                self._add_subparser_from_class(entry.name,
+                                               functools.partial(LazyCommand, entry))
+            return
+
         import inspect
         for name, obj in inspect.getmembers(submodules):
             if inspect.isclass(obj) and issubclass(obj, AssistantCommand):
                 self._add_subparser_from_class(name, obj)
+
+
+class LazyCommand(object):
+    """Stand-in for a command listed in a commands manifest; the command's
+    module is only imported once the command runs.
+    """
+
+    def __init__(self, entry, logger):
+        self.entry = entry
+        self.logger = logger
+        self.command_id = entry.command_id
+        self.description = entry.description
+        self.testing = False
+        self.instance = None
+        self._args = None
+
+    def load(self):
+        if self.instance is None:
+            module = importlib.import_module(self.entry.module)
+            self.instance = getattr(module, self.entry.name)(self.logger)
+        return self.instance
+
+    def update(self, args):
+        self._args = args
+
+    def run(self):
+        instance = self.load()
+        instance.update(self._args)
+        instance.run()
@@ -15,10 +15,26 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from ubuntu_archive_assistant.commands.proposed_migration import ProposedMigration
-from ubuntu_archive_assistant.commands.mir import MIRReview
+import importlib
 
-__all__ = [
-    'ProposedMigration',
-    'MIRReview',
+from collections import namedtuple
+
+# The available commands, so they can be listed without importing them (and
+# everything they use); a command's module is only imported when it runs.
+CommandEntry = namedtuple('CommandEntry', ['name', 'module', 'command_id', 'description'])
+
+COMMANDS = [
+    CommandEntry('ProposedMigration', 'ubuntu_archive_assistant.commands.proposed_migration',
+                 'proposed', "Assess next work required for a package's proposed migration"),
+    CommandEntry('MIRReview', 'ubuntu_archive_assistant.commands.mir',
+                 'mir', 'Review Main Inclusion Requests'),
 ]
+
+__all__ = [entry.name for entry in COMMANDS]
+
+
+def __getattr__(name):
+    for entry in COMMANDS:
+        if entry.name == name:
+            return getattr(importlib.import_module(entry.module), name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -18,14 +18,18 @@
 import os
 import sys
 import time
+import shutil
 import subprocess
 import tempfile
 import argparse
 import requests
 import logging
 
+from concurrent.futures import ThreadPoolExecutor
+
 from ubuntu_archive_assistant.command import AssistantCommand
 from ubuntu_archive_assistant.utils import urlhandling, launchpad, bugtools
+from ubuntu_archive_assistant.utils.tasks import DEFAULT_JOBS
 from ubuntu_archive_assistant.logging import ReviewResult, AssistantTaskLogger
 
 
@@ -47,6 +51,12 @@ class MIRReview(AssistantCommand):
         self.parser.add_argument('--unprocessed', action="store_true",
                                  default=False,
                                  help='show MIRs accepted but not yet processed')
+        self.parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                                 help='Number of Launchpad lookups to run concurrently '
+                                      '(default: %(default)s)')
+        self.parser.add_argument('--refresh', action='store_true', default=False,
+                                 help='Search all the MIR bugs again, instead of only '
+                                      'the ones changed since the last run')
 
         self.func = self.mir_review
 
@@ -54,8 +64,23 @@ class MIRReview(AssistantCommand):
         self.run_command()
 
     def mir_review(self):
+        # One pool for the whole run: its threads keep their Launchpad
+        # sessions from one bug to the next.
+        self.executor = ThreadPoolExecutor(max_workers=max(3, self.jobs))
+        try:
+            self.review_mirs()
+        finally:
+            self.executor.shutdown(wait=False)
+            self.log.debug("Launchpad cache (hits, misses): {}".format(
+                launchpad.LaunchpadInstance.cache_stats()))
+
+    def review_mirs(self):
+        xdg_cache = os.getenv('XDG_CACHE_HOME', '~/.cache')
+        self.cache_path = os.path.expanduser(
+            os.path.join(xdg_cache, 'ubuntu-archive-assistant', 'mir'))
+
         lp = launchpad.LaunchpadInstance()
-        self.mir_team = lp.lp.people["ubuntu-mir"]
+        self.mir_team = lp.person("ubuntu-mir")
 
         if not self.source and not self.bug:
             self.log.debug("showing MIR report. show unprocessed=%s" % self.unprocessed)
@@ -66,7 +91,7 @@ class MIRReview(AssistantCommand):
             if self.bug:
                 self.log.debug("show MIR by bug")
                 bug_no = int(self.bug)
-                bug = lp.lp.bugs[bug_no]
+                bug = lp.bug(bug_no)
                 for bug_task in bug.bug_tasks:
                     if self.source:
                         if self.source != bug_task.target.name:
@@ -90,7 +115,7 @@ class MIRReview(AssistantCommand):
         cache_name = None
         name = None
 
-        source_pkg = lp.ubuntu.getSourcePackage(name=binary)
+        source_pkg = lp.source_package(binary)
         if source_pkg:
             return source_pkg
 
@@ -104,32 +129,91 @@ class MIRReview(AssistantCommand):
                 shell=True, universal_newlines=True)
 
         if cache_name is not None:
-            if source.startswith("Source:") or source.startswith("Package:"):
-                name = source.split()[1]
+            if cache_name.startswith("Source:") or cache_name.startswith("Package:"):
+                name = cache_name.split()[1]
 
         if name:
-            source_pkg = lp.ubuntu.getSourcePackage(name=name)
+            source_pkg = lp.source_package(name)
 
         return source_pkg
 
-    def lp_build_logs(self, source):
+    def get_build_logs(self, source):
         lp = launchpad.LaunchpadInstance()
-        archive = lp.ubuntu_archive()
-        spph = archive.getPublishedSources(exact_match=True,
-                                           source_name=source,
-                                           distro_series=lp.current_series(),
-                                           pocket="Release",
-                                           order_by_date=True)
+        spph = lp.published_sources(exact_match=True,
+                                    source_name=source,
+                                    distro_series=lp.current_series(),
+                                    pocket="Release",
+                                    order_by_date=True)
 
+        lines = []
         builds = spph[0].getBuilds()
         for build in builds:
             if "Successfully" not in build.buildstate:
-                print("%s has failed to build" % build.arch_tag)
-            print(build.build_log_url)
+                lines.append("%s has failed to build" % build.arch_tag)
+            lines.append(build.build_log_url)
+        return lines
+
+    def lp_build_logs(self, source):
+        for line in self.get_build_logs(source):
+            print(line)
+
+    def get_subscribers(self, source):
+        lp = launchpad.LaunchpadInstance()
+        lines = []
+        for sub in lp.source_package(source).getSubscriptions():
+            sub_text = "  - %s" % sub.subscriber.display_name
+            if sub.subscribed_by:
+                sub_text += ", subscribed by %s" % sub.subscribed_by.display_name
+            lines.append(sub_text)
+        return lines
+
+    def pull_source(self, source):
+        """Pull the latest version of source into the sources cache, unless
+        it is there already, and return its path. The older versions of
+        source are removed from the cache.
+        """
+        lp = launchpad.LaunchpadInstance()
+        version = lp.published_sources(exact_match=True,
+                                       source_name=source,
+                                       distro_series=lp.current_series(),
+                                       order_by_date=True)[0].source_package_version
+
+        sources_path = os.path.join(self.cache_path, 'sources')
+        path = os.path.join(sources_path, "%s_%s" % (source, version))
+        if os.path.isdir(path):
+            self.log.debug("Using cached source in %s" % path)
+            return path
+
+        os.makedirs(sources_path, exist_ok=True)
+        partial = tempfile.mkdtemp(prefix='.%s_' % source, dir=sources_path)
+        try:
+            subprocess.run(['pull-lp-source', source, version], cwd=partial,
+                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                           universal_newlines=True, check=True)
+            os.rename(partial, path)
+        except (OSError, subprocess.CalledProcessError):
+            shutil.rmtree(partial, ignore_errors=True)
+            raise
+
+        for entry in os.listdir(sources_path):
+            # Source package names can't contain underscores
+            if entry.startswith("%s_" % source) and entry != os.path.basename(path):
+                self.log.debug("Removing older cached source %s" % entry)
+                shutil.rmtree(os.path.join(sources_path, entry), ignore_errors=True)
+        return path
 
     def process(self, source_pkg, task=None):
         lp = launchpad.LaunchpadInstance()
         source_name = source_pkg.name
+
+        # Start on everything that doesn't depend on the reviewer right
+        # away; the sections below wait for their part when they get to it.
+        subscribers = self.executor.submit(self.get_subscribers, source_name)
+        build_logs = self.executor.submit(self.get_build_logs, source_name)
+        pulled_source = None
+        if not self.skip_review:
+            pulled_source = self.executor.submit(self.pull_source, source_name)
+
         print("== MIR report for source package '%s' ==" % source_name)
 
         print("\n=== Details ===")
@@ -140,15 +224,16 @@ class MIRReview(AssistantCommand):
             print(task.bug.description)
 
         print("\n\n=== MIR assessment ===")
-        latest = lp.ubuntu_archive().getPublishedSources(exact_match=True,
-                                                        source_name=source_name,
-                                                        distro_series=lp.current_series())[0]
+        latest = lp.published_sources(exact_match=True,
+                                      source_name=source_name,
+                                      distro_series=lp.current_series())[0]
 
         if not source_pkg:
             print("\n%s does not exist in Ubuntu")
             sys.exit(1)
-        if latest.pocket is "Proposed":
-            print("\nThere is a version of %s in -proposed: %s" % (source, latest.source_package_version))
+        if latest.pocket == "Proposed":
+            print("\nThere is a version of %s in -proposed: %s" % (
+                source_name, latest.source_package_version))
 
         if task:
             if task.assignee:
@@ -160,42 +245,61 @@ class MIRReview(AssistantCommand):
                                             task.status))
 
         print("\nPackage bug subscribers:")
-        for sub in source_pkg.getSubscriptions():
-            sub_text = "  - %s" % sub.subscriber.display_name
-            if sub.subscribed_by:
-                sub_text += ", subscribed by %s" % sub.subscribed_by.display_name
-            print(sub_text)
+        for line in subscribers.result():
+            print(line)
 
         print("\nBuild logs:")
-        self.lp_build_logs(source_name)
+        for line in build_logs.result():
+            print(line)
 
         if not self.skip_review:
-            self.open_source_tmpdir(source_name)
+            self.open_source_tmpdir(source_name, pulled_source)
 
     def get_mir_bugs(self, show_unprocessed=False):
         bug_statuses = ("New", "Incomplete", "Confirmed", "Triaged",
                         "In Progress")
 
-        def only_ubuntu(task):
-            if 'ubuntu/+source' not in task.target_link:
-                return True
-            return False
+        store = bugtools.BugTaskStore(os.path.join(self.cache_path, 'tasks.json'))
+        store.sync(self.search_mir_tasks, bug_statuses + ("Fix Committed",),
+                   jobs=self.jobs, full=self.refresh, executor=self.executor)
 
         if show_unprocessed:
-            unprocessed = self.mir_team.searchTasks(omit_duplicates=True, bug_subscriber=self.mir_team, status="Fix Committed")
+            unprocessed = store.get_tasks(("Fix Committed",))
             if any(unprocessed):
                 print("== Open MIRs reviewed but not processed ==")
-                bugtools.list_bugs(print, unprocessed, filter=only_ubuntu, file=sys.stderr)
+                bugtools.list_bugs(print, unprocessed, file=sys.stderr)
 
-        tasks = self.mir_team.searchTasks(omit_duplicates=True, bug_subscriber=self.mir_team, status=bug_statuses)
+        tasks = store.get_tasks(bug_statuses)
 
-        bugtools.list_bugs(print, tasks, filter=only_ubuntu, file=sys.stderr)
+        bugtools.list_bugs(print, tasks, file=sys.stderr)
 
         result = None
 
         return result
 
-    def open_source_tmpdir(self, source_name):
+    def search_mir_tasks(self, **kwargs):
+        def only_ubuntu(task):
+            if 'ubuntu/+source' not in task.target_link:
+                return True
+            return False
+
+        tasks = self.mir_team.searchTasks(bug_subscriber=self.mir_team, **kwargs)
+        return [task for task in tasks if not only_ubuntu(task)]
+
+    def open_source_tmpdir(self, source_name, pulled_source=None):
         print("\nDropping to a shell for code review:\n")
         with tempfile.TemporaryDirectory() as temp_dir:
-            os.system('cd %s; pull-lp-source %s; bash -l' % (temp_dir, source_name))
+            review_path = temp_dir
+            try:
+                # Review a copy, the cached source is kept as it was pulled.
+                if pulled_source is not None:
+                    source_path = pulled_source.result()
+                else:
+                    source_path = self.pull_source(source_name)
+                review_path = os.path.join(temp_dir, os.path.basename(source_path))
+                shutil.copytree(source_path, review_path, symlinks=True)
+            except subprocess.CalledProcessError as e:
+                print("pull-lp-source %s failed:\n%s" % (source_name, e.output))
+            except Exception as e:
+                print("Could not pull the source of %s: %s" % (source_name, e))
+            subprocess.call(['bash', '-l'], cwd=review_path)
@@ -24,9 +24,9 @@ proposed migration.
 # FIXME: Various parts of slangasek's pseudocode (in comments where relevant)
 #        are not well implemented.
 
-import yaml
 import os
-import re
+import json
+import functools
 import sys
 import time
 import math
@@ -34,20 +34,28 @@ import subprocess
 import argparse
 import tempfile
 import logging
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import ExitStack
 from enum import Enum
 from collections import defaultdict
 
 from ubuntu_archive_assistant.command import AssistantCommand
-from ubuntu_archive_assistant.utils import urlhandling, launchpad
-from ubuntu_archive_assistant.logging import ReviewResult, ReviewResultAdapter, AssistantTaskLogger
+from ubuntu_archive_assistant.utils import urlhandling, launchpad, profiling
+from ubuntu_archive_assistant.utils.builds import BuildResults
+from ubuntu_archive_assistant.utils.debian_ci import DebianCIResults
+from ubuntu_archive_assistant.utils.excuses import ExcusesIndex
+from ubuntu_archive_assistant.utils.hints import HintsIndex, HintsError
+from ubuntu_archive_assistant.utils.tasks import TaskGraph, DEFAULT_JOBS
+from ubuntu_archive_assistant.logging import (ReviewResult, ReviewResultAdapter,
+                                              ReviewTranscript, AssistantTaskLogger)
 
-HINTS_BRANCH = 'lp:~ubuntu-release/britney/hints-ubuntu'
 DEBIAN_CURRENT_SERIES = 'sid'
 ARCHIVE_PAGES = 'https://people.canonical.com/~ubuntu-archive/'
 LAUNCHPAD_URL = 'https://launchpad.net'
 AUTOPKGTEST_URL = 'http://autopkgtest.ubuntu.com'
+TEAM_MAPPING_URL = ARCHIVE_PAGES + 'package-team-mapping.json'
 MAX_CACHE_AGE = 14400   # excuses cache should not be older than 4 hours
 
 
@@ -58,8 +66,16 @@ class ProposedMigration(AssistantCommand):
                          description='Assess next work required for a package\'s proposed migration',
                          logger=logger,
                          leaf=True)
-        self.excuses = {}
+        self.excuses = None
         self.seen = []
+        self.evaluations = {}
+        self.evaluations_lock = threading.Lock()
+        self.evaluator = None
+        self.debian_ci = None
+        self.builds = None
+        self.hints = None
+        self.hints_lock = threading.Lock()
+        self.hints_error = None
 
 
     def run(self):
@@ -71,6 +87,24 @@ class ProposedMigration(AssistantCommand):
         self.parser.add_argument('--refresh', action='store_const',
                                  const=True, default=False,
                                  help='Force refresh of cached excuses')
+        self.parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                                 help='Number of lookups to run concurrently '
+                                      '(default: %(default)s)')
+        self.parser.add_argument('--report', action='store_true', default=False,
+                                 help='Report on all the packages blocked in proposed, '
+                                      'instead of a single package')
+        self.parser.add_argument('--team', dest='teams', action='append',
+                                 help='Only report on packages owned by TEAM; '
+                                      'can be used multiple times')
+        self.parser.add_argument('--min-age', type=float, default=None,
+                                 help='Only report on packages older than MIN_AGE days')
+        self.parser.add_argument('--reason', dest='reasons', action='append',
+                                 help='Only report on packages blocked for REASON '
+                                      '(e.g. autopkgtest, depends, block); '
+                                      'can be used multiple times')
+        self.parser.add_argument('--json', dest='json_path', default=None,
+                                 help='Write the report as JSON to JSON_PATH '
+                                      '("-" for standard output)')
 
         self.func = self.proposed_migration
 
@@ -79,6 +113,7 @@ class ProposedMigration(AssistantCommand):
 
     def proposed_migration(self):
         refresh_due = False
+        index_path = None
         with ExitStack() as resources:
             if self.do_not_cache:
                 fp = resources.enter_context(tempfile.NamedTemporaryFile())
@@ -91,6 +126,7 @@ class ProposedMigration(AssistantCommand):
                     os.path.join(xdg_cache, 'ubuntu-archive-assistant', 'proposed-migration'))
 
                 excuses_path = os.path.join(self.cache_path, 'excuses.yaml')
+                index_path = excuses_path + '.index.json'
 
                 if os.path.exists(self.cache_path):
                     if not os.path.isdir(self.cache_path):
@@ -116,68 +152,220 @@ class ProposedMigration(AssistantCommand):
 
             if self.refresh or refresh_due:
                 excuses_url = ARCHIVE_PAGES + 'proposed-migration/update_excuses.yaml'
-                urlhandling.get_with_progress(url=excuses_url, filename=fp.name)
+                with profiling.task('download excuses'):
+                    urlhandling.get_with_progress(url=excuses_url, filename=fp.name)
 
-            fp.seek(0)
+            # The excuses are large: only index where each item is in the file,
+            # and parse the items as they are needed.
+            with profiling.task('index excuses'):
+                self.excuses = resources.enter_context(
+                    ExcusesIndex(fp.name, index_path=index_path))
 
-            # Use the C implementation of the SafeLoader, it's noticeably faster, and
-            # here we're dealing with large input files.
-            self.excuses = yaml.load(fp, Loader=yaml.CSafeLoader)
-
-            if self.source_name is None:
+            if self.source_name is None and not self.report:
                 print("No source package name was provided. The following packages are "
                       "blocked in proposed:\n")
                 self.source_name = self.choose_blocked_source(self.excuses)
 
-            self.find_excuses(self.source_name, 0)
+            TaskGraph.set_jobs(self.jobs)
+            self.debian_ci = DebianCIResults(cache_path=self.cache_path,
+                                             bulk=self.report, jobs=self.jobs)
+            self.builds = BuildResults(jobs=self.jobs)
+            self.evaluator = ThreadPoolExecutor(max_workers=max(1, self.jobs))
+            try:
+                if self.report:
+                    self.report_excuses()
+                else:
+                    self.find_excuses(self.source_name, 0)
+            finally:
+                self.evaluator.shutdown(wait=False)
+                self.builds.shutdown()
+                self.log.debug("Launchpad cache (hits, misses): {}".format(
+                    launchpad.LaunchpadInstance.cache_stats()))
 
 
-    def get_debian_ci_results(self, source_name, arch):
+    def get_team_mapping(self):
+        mapping_path = os.path.join(self.cache_path, 'package-team-mapping.json')
         try:
-            url = "https://ci.debian.net/data/packages/unstable/{}/{}/latest.json"
-            results_url = url.format("amd64", self.get_pkg_archive_path(source_name))
-            resp = urlhandling.get(url=results_url)
-            return resp.json()
-        except Exception:
-            return None
+            refresh_due = (time.time() - os.stat(mapping_path).st_mtime) > MAX_CACHE_AGE
+        except FileNotFoundError:
+            refresh_due = True
+
+        if self.refresh or refresh_due:
+            resp = urlhandling.get(url=TEAM_MAPPING_URL)
+            resp.raise_for_status()
+            with open(mapping_path, 'w') as fp:
+                fp.write(resp.text)
+
+        with open(mapping_path, 'r') as fp:
+            mapping = json.load(fp)
+
+        teams = defaultdict(list)
+        for team, packages in mapping.items():
+            for package in packages:
+                teams[package].append(team)
+        return teams
+
+
+    def filter_excuses(self, package_teams):
+        for excuses_item in self.excuses.items():
+            source_name = excuses_item.get('source')
+            if self.teams:
+                if not set(self.teams) & set(package_teams.get(source_name, [])):
+                    continue
+            if self.min_age is not None:
+                if self.get_excuses_age(excuses_item) < self.min_age:
+                    continue
+            if self.reasons:
+                if not set(self.reasons) & set(excuses_item.get('reason') or []):
+                    continue
+            yield excuses_item
 
 
-    def find_excuses(self, source_name, level):
-        if source_name in self.seen:
-            return
+    def report_excuses(self):
+        package_teams = {}
+        if self.teams:
+            package_teams = self.get_team_mapping()
 
-        for excuses_item in self.excuses['sources']:
+        selected = list(self.filter_excuses(package_teams))
+        for excuses_item in selected:
+            self.evaluate_excuses(excuses_item.get('item-name'))
+
+        report = []
+        for excuses_item in selected:
             item_name = excuses_item.get('item-name')
+            entry = {
+                'item-name': item_name,
+                'source': excuses_item.get('source'),
+                'old-version': excuses_item.get('old-version'),
+                'new-version': excuses_item.get('new-version'),
+                'age': self.get_excuses_age(excuses_item),
+                'component': excuses_item.get('component', 'main'),
+                'maintainer': excuses_item.get('maintainer'),
+                'teams': package_teams.get(excuses_item.get('source'), []),
+                'is-candidate': bool(excuses_item.get('is-candidate')),
+                'reasons': excuses_item.get('reason') or [],
+            }
+            try:
+                transcript = self.evaluations[item_name].result()
+                entry['review'] = self.export_review(excuses_item, transcript)
+            except Exception as e:
+                self.log.error("Failed to evaluate {}: {}".format(item_name, e))
+                entry['error'] = str(e)
+            report.append(entry)
+
+        if self.json_path == '-':
+            json.dump(report, sys.stdout, indent=2)
+            print()
+            return
+        elif self.json_path:
+            with open(self.json_path, 'w') as fp:
+                json.dump(report, fp, indent=2)
 
-            if item_name == source_name:
-                self.selected = excuses_item
-                self.process(level)
+        self.print_report_summary(report)
 
 
-    def get_pkg_archive_path(self, package):
+    def export_review(self, excuses_item, transcript):
+        # Each entry of the report shows its blockers in full, whichever
+        # entries showed them before: start from a fresh list of the
+        # packages seen.
+        seen = self.seen
+        self.seen = [excuses_item.get('source')]
         try:
-            # TODO: refactor to avoid shell=True
-            path = subprocess.check_output(
-                "apt-cache show %s | grep Filename:" % package,
-                shell=True, universal_newlines=True)
-            path = path.split(' ')[1].split('/')
-            path = "/".join(path[2:4])
-            return path
-        except Exception:
-            return None
+            return transcript.export()
+        finally:
+            self.seen = seen
+
+
+    def print_report_summary(self, report):
+        row = "{:<30} {:<30} {:>5}  {}"
+        print(row.format("Source", "Version", "Age", "Reasons"))
+        print(row.format("-" * 30, "-" * 30, "-" * 5, "-" * 20))
+        for entry in sorted(report, key=lambda e: e['age'], reverse=True):
+            reasons = ", ".join(entry['reasons'])
+            if 'error' in entry:
+                reasons += " (evaluation failed)"
+            print(row.format(entry['item-name'], entry['new-version'] or '-',
+                             math.floor(entry['age']), reasons))
+
+        counts = defaultdict(int)
+        for entry in report:
+            for reason in entry['reasons']:
+                counts[reason] += 1
+        print("\n{} packages blocked in proposed.".format(len(report)))
+        for reason, count in sorted(counts.items(), key=lambda c: c[1], reverse=True):
+            print("  {:<20} {:>5}".format(reason, count))
+
+
+    def get_excuses_age(self, excuses_item):
+        policy_info = excuses_item.get('policy_info') or {}
+        return policy_info.get('age', {}).get('current-age', 0)
+
+
+    def find_excuses(self, source_name, level):
+        transcript = ReviewTranscript.current()
+        if transcript is not None:
+            # We're evaluating some other package concurrently: start looking
+            # at this one right away, and show it once the review output gets
+            # to this point.
+            self.evaluate_excuses(source_name)
+            transcript.defer(self.show_excuses, source_name, level)
+            return
+
+        self.show_excuses(0, source_name, level)
+
+
+    def get_excuses_items(self, source_name):
+        return self.excuses.get(source_name)
+
+
+    def evaluate_excuses(self, source_name):
+        evaluations = []
+        excuses_items = self.get_excuses_items(source_name)
+        with self.evaluations_lock:
+            for excuses_item in excuses_items:
+                key = excuses_item.get('item-name')
+                if key not in self.evaluations:
+                    if self.needs_build_results(excuses_item):
+                        self.builds.prefetch(excuses_item.get('source'),
+                                             excuses_item.get('new-version'))
+                    self.evaluations[key] = self.evaluator.submit(
+                        self.record_evaluation, excuses_item, profiling.current_path())
+                evaluations.append((excuses_item, self.evaluations[key]))
+        return evaluations
+
 
+    def record_evaluation(self, excuses_item, profile_path=()):
+        with profiling.task(excuses_item.get('item-name'), parent=profile_path), \
+                ReviewTranscript() as transcript:
+            self.process(excuses_item, 0)
+        return transcript
 
+
+    def show_excuses(self, depth, source_name, level):
+        # Only ever called serially, from the main thread replaying the
+        # review output: this keeps the order in which packages are marked
+        # as seen the same as if everything had been evaluated in sequence.
+        if source_name in self.seen:
+            return
+
+        for excuses_item, future in self.evaluate_excuses(source_name):
+            self.seen.append(excuses_item.get('source'))
+            future.result().replay(depth + level)
+
+
+    @functools.lru_cache(maxsize=None)
     def get_source_package(self, binary_name):
         cache_output = None
         # TODO: refactor to avoid shell=True
-        try:
-            cache_output = subprocess.check_output(
-                "apt-cache show %s | grep Source:" % binary_name,
-                shell=True, universal_newlines=True)
-        except subprocess.CalledProcessError:
-            cache_output = subprocess.check_output(
-                "apt-cache show %s | grep Package:" % binary_name,
-                shell=True, universal_newlines=True)
+        with profiling.task('apt-cache'):
+            try:
+                cache_output = subprocess.check_output(
+                    "apt-cache show %s | grep Source:" % binary_name,
+                    shell=True, universal_newlines=True)
+            except subprocess.CalledProcessError:
+                cache_output = subprocess.check_output(
+                    "apt-cache show %s | grep Package:" % binary_name,
+                    shell=True, universal_newlines=True)
 
         if cache_output is not None:
             if cache_output.startswith("Source:") or cache_output.startswith("Package:"):
@@ -187,9 +375,10 @@ class ProposedMigration(AssistantCommand):
         return None
 
 
+    @functools.lru_cache(maxsize=None)
     def package_in_distro(self, package, distro='ubuntu', distroseries='bionic',
                         proposed=False):
-        # TODO: This operation is pretty costly, do caching?
+        # This operation is pretty costly, results are cached for the run.
 
         if distro == 'debian':
             distroseries = DEBIAN_CURRENT_SERIES
@@ -201,7 +390,8 @@ class ProposedMigration(AssistantCommand):
                                                         distro,
                                                         distroseries)
         url = madison_url + params
-        resp = urlhandling.get(url=url)
+        with profiling.task('madison'):
+            resp = urlhandling.get(url=url)
 
         package_found = {}
         for line in resp.text.split('\n'):
@@ -230,53 +420,31 @@ class ProposedMigration(AssistantCommand):
         return {}
 
 
-    def process_lp_build_results(self, level, uploads, failed):
-        logger = AssistantTaskLogger("lp_builds", self.task_logger)
+    def process_lp_build_results(self, source, task_logger, level, uploads, failed):
+        logger = AssistantTaskLogger("lp_builds", task_logger)
         assistant = logger.newTask("lp_builds", level + 1)
 
-        lp = launchpad.LaunchpadInstance()
-        archive = lp.ubuntu_archive()
-        series = lp.current_series()
-
-        source_name = self.selected.get('source')
-
-        spph = archive.getPublishedSources(exact_match=True,
-                                        source_name=source_name,
-                                        distro_series=series,
-                                        pocket="Proposed",
-                                        order_by_date=True)
-
-        new_version = series.getPackageUploads(archive=archive,
-                                            name=source_name,
-                                            version=self.selected.get('new-version'),
-                                            pocket="Proposed",
-                                            exact_match=True)
-
-        for item in new_version:
-            arch = item.display_arches.split(',')[0]
-            if item.package_version not in uploads:
-                uploads[item.package_version] = {}
-            if arch == 'source':
-                continue
-            uploads[item.package_version][arch] = item.getBinaryProperties()
+        source_name = source.get('source')
+        results = self.builds.get(source_name, source.get('new-version'))
 
-        # Only get the builds for the latest publication, this is more likely to
-        # be new source in -proposed, or the most recent upload.
-        builds = spph[0].getBuilds()
+        for version, arches in results['uploads'].items():
+            uploads.setdefault(version, {}).update(arches)
+
+        builds = results['builds']
         for build in builds:
             missing_arches = set()
-            if "Successfully" not in build.buildstate:
-                failed[build.arch_tag] = {
-                    'state': build.buildstate,
+            if "Successfully" not in build['buildstate']:
+                failed[build['arch_tag']] = {
+                    'state': build['buildstate'],
                 }
                 if self.logger.getReviewLevel() < logging.ERROR:
                     assistant.error("{} is missing a build on {}:".format(
-                                        source_name, build.arch_tag),
+                                        source_name, build['arch_tag']),
                                     status=ReviewResult.FAIL)
-                    log_url = build.build_log_url
+                    log_url = build['build_log_url']
                     if not log_url:
                         log_url = "<No build log available>"
-                    assistant.warning("[%s] %s" % (build.buildstate,
+                    assistant.warning("[%s] %s" % (build['buildstate'],
                                                    log_url),
                                       status=ReviewResult.NONE, depth=1)
 
@@ -286,8 +454,8 @@ class ProposedMigration(AssistantCommand):
                                status=ReviewResult.NONE)
             assistant.error("{}/ubuntu/+source/{}/{}".format(
                                 LAUNCHPAD_URL,
-                                spph[0].source_package_name,
-                                spph[0].source_package_version),
+                                results['source_package_name'],
+                                results['source_package_version']),
                             status=ReviewResult.INFO, depth=1)
 
 
@@ -301,9 +469,9 @@ class ProposedMigration(AssistantCommand):
 
         lp = launchpad.LaunchpadInstance()
         source_name = self.get_source_package(target_package)
-        source_pkg = lp.ubuntu.getSourcePackage(name=source_name)
+        source_pkg = lp.source_package(source_name)
 
-        mir_tasks = source_pkg.searchTasks(bug_subscriber=lp.lp.people['ubuntu-mir'],
+        mir_tasks = source_pkg.searchTasks(bug_subscriber=lp.person('ubuntu-mir'),
                                         omit_duplicates=True)
 
         if not mir_tasks:
@@ -334,8 +502,8 @@ class ProposedMigration(AssistantCommand):
                                 status=ReviewResult.INFO, depth=1)
 
 
-    def process_unsatisfiable_depends(self, level):
-        logger = AssistantTaskLogger("unsatisfiable", self.task_logger)
+    def process_unsatisfiable_depends(self, source, task_logger, level):
+        logger = AssistantTaskLogger("unsatisfiable", task_logger)
         assistant = logger.newTask("unsatisfiable", level + 1)
 
         distroseries = launchpad.LaunchpadInstance().current_series().name
@@ -343,7 +511,7 @@ class ProposedMigration(AssistantCommand):
         affected_sources = set()
         unsatisfiable = defaultdict(set)
 
-        depends = self.selected.get('dependencies').get('unsatisfiable-dependencies', {})
+        depends = source.get('dependencies').get('unsatisfiable-dependencies', {})
         for arch, signatures in depends.items():
             for signature in signatures:
                 binary_name = signature.split(' ')[0]
@@ -368,7 +536,7 @@ class ProposedMigration(AssistantCommand):
             return
 
         logger.critical("Fix unsatisfiable dependencies in {}:".format(
-                           self.selected.get('source')),
+                           source.get('source')),
                            status=ReviewResult.NONE)
 
         # TODO: Check version comparisons for removal requests/fixes
@@ -404,7 +572,7 @@ class ProposedMigration(AssistantCommand):
                                     depends,
                                     in_archive.get('version')),
                                 status=ReviewResult.FAIL, depth=1)
-                if self.selected.get('component', 'main') != in_archive.get('component'):
+                if source.get('component', 'main') != in_archive.get('component'):
                     possible_mir.add(depends)
             elif not any(in_archive) and any(in_proposed):
                 assistant.info("{} is only in -proposed".format(depends),
@@ -426,7 +594,7 @@ class ProposedMigration(AssistantCommand):
                     assistant.debug("Has this package been removed?",
                                     status=ReviewResult.INFO, depth=2)
             else:
-                if self.selected.get('component', 'main') != in_archive.get('component'):
+                if source.get('component', 'main') != in_archive.get('component'):
                     possible_mir.add(depends)
 
         for p_mir in possible_mir:
@@ -437,15 +605,20 @@ class ProposedMigration(AssistantCommand):
                 self.find_excuses(src_name, level+2)
 
 
-    def process_autopkgtest(self, level):
-        logger = AssistantTaskLogger("autopkgtest", self.task_logger)
+    def process_autopkgtest(self, source, task_logger, level):
+        logger = AssistantTaskLogger("autopkgtest", task_logger)
         assistant = logger.newTask("autopkgtest", level + 1)
 
-        autopkgtests = self.selected.get('policy_info').get('autopkgtest')
+        autopkgtests = source.get('policy_info').get('autopkgtest')
 
         assistant.critical("Fix autopkgtests triggered by this package for:",
                            status=ReviewResult.NONE)
 
+        # Look up the Debian results for all the regressions at once.
+        regressed = [key.split('/')[0] for key, test in autopkgtests.items()
+                     if 'REGRESSION' in test.get('amd64', [])]
+        ci_results = self.debian_ci.get_many(regressed, "amd64")
+
         waiting = 0
         failed_tests = defaultdict(set)
         for key, test in autopkgtests.items():
@@ -459,13 +632,9 @@ class ProposedMigration(AssistantCommand):
                                       status=ReviewResult.FAIL)
                     failed_tests[key].add(arch)
                     if arch == "amd64":
-                        if '/' in key:
-                            pkgname = key.split('/')[0]
-                        else:
-                            pkgname = key
-                        ci_results = self.get_debian_ci_results(pkgname, "amd64")
-                        if ci_results is not None:
-                            result = ci_results.get('status')
+                        pkgname = key.split('/')[0]
+                        result = (ci_results.get(pkgname) or {}).get('status')
+                        if result is not None:
                             status_ci = ReviewResult.FAIL
                             if result == 'pass':
                                 status_ci = ReviewResult.PASS
@@ -499,18 +668,19 @@ class ProposedMigration(AssistantCommand):
                                 status=ReviewResult.INFO, depth=1)
 
 
-    def process_blocking(self, level):
-        assistant = self.task_logger.newTask("blocking", level + 1)
+    def process_blocking(self, source, task_logger, level):
+        logger = AssistantTaskLogger("blocking", task_logger)
+        assistant = logger.newTask("blocking", level + 1)
 
-        lp = launchpad.LaunchpadInstance().lp
-        bugs = self.selected.get('policy_info').get('block-bugs')
-        source_name = self.selected.get('source')
+        lp = launchpad.LaunchpadInstance()
+        bugs = source.get('policy_info').get('block-bugs') or {}
+        source_name = source.get('source')
 
         if bugs:
             assistant.critical("Resolve blocking bugs:", status=ReviewResult.NONE)
 
         for bug in bugs.keys():
-            lp_bug = lp.bugs[bug]
+            lp_bug = lp.bug(bug)
             assistant.error("[LP: #{}] {} {}".format(lp_bug.id,
                                                     lp_bug.title,
                                                     lp_bug.web_link),
@@ -535,43 +705,37 @@ class ProposedMigration(AssistantCommand):
                 assistant.info("Consider pinging #ubuntu-release for processing",
                             status=ReviewResult.INFO)
 
-        hints = self.selected.get('hints')
+        hints = source.get('hints')
         if hints is not None:
-            hints_path = os.path.join(self.cache_path, 'hints-ubuntu')
-            self.get_latest_hints(hints_path)
             assistant.critical("Update manual hinting (contact #ubuntu-release):",
                             status=ReviewResult.NONE)
             hint_from = hints[0]
             if hint_from == 'freeze':
                 assistant.error("Package blocked by freeze.")
             else:
-                version = None
-                unblock_re = re.compile(r'^unblock {}\/(.*)$'.format(source_name))
-                files = [f for f in os.listdir(hints_path) if (os.path.isfile(
-                    os.path.join(hints_path, f)) and f != 'freeze')]
-
-                for hints_file in files:
-                    with open(os.path.join(hints_path, hints_file)) as fp:
-                        print("Checking {}".format(os.path.join(hints_path, hints_file)))
-                        for line in fp:
-                            match = unblock_re.match(line)
-                            if match:
-                                version = match.group(1)
-                                break
-                        if version:
-                            break
-
-                if version:
-                    reason = \
-                        ("Unblock request by {} ignored due to version mismatch: "
-                        "{}".format(hints_file, version))
-                else:
-                    reason = "Missing unblock sequence in the hints file"
+                try:
+                    self.get_latest_hints()
+                    unblock = self.hints.find_unblock(source_name,
+                                                      source.get('new-version'))
+                    if unblock:
+                        reason = ("Unblocked by {} (line {}), waiting for britney".format(
+                            unblock.file, unblock.line))
+                    else:
+                        unblock = self.hints.find_unblock(source_name)
+                        if unblock:
+                            reason = \
+                                ("Unblock request by {} ignored due to version mismatch: "
+                                "{}".format(unblock.file, unblock.version))
+                        else:
+                            reason = "Missing unblock sequence in the hints file"
+                except HintsError as e:
+                    reason = "Could not check the hints: {}".format(e)
                 assistant.error(reason, status=ReviewResult.INFO)
 
 
-    def process_dependencies(self, source, level):
-        assistant = self.task_logger.newTask("dependencies", level + 1)
+    def process_dependencies(self, source, task_logger, level):
+        logger = AssistantTaskLogger("dependencies", task_logger)
+        assistant = logger.newTask("dependencies", level + 1)
 
         dependencies = source.get('dependencies')
         blocked_by = dependencies.get('blocked-by', None)
@@ -581,7 +745,7 @@ class ProposedMigration(AssistantCommand):
             assistant.critical("Clear outstanding promotion interdependencies:",
                             status=ReviewResult.NONE)
 
-        assistant = self.task_logger.newTask("dependencies", level + 2)
+        assistant = logger.newTask("dependencies", level + 2)
         if migrate_after is not None:
             assistant.error("{} will migrate after {}".format(
                             source.get('source'), ", ".join(migrate_after)),
@@ -603,12 +767,12 @@ class ProposedMigration(AssistantCommand):
                 self.find_excuses(blocker, level+2)
 
 
-    def process_missing_builds(self, level):
-        logger = AssistantTaskLogger("missing_builds", self.task_logger)
+    def process_missing_builds(self, source, task_logger, level):
+        logger = AssistantTaskLogger("missing_builds", task_logger)
         assistant = logger.newTask("missing_builds", level + 1)
 
-        new_version = self.selected.get('new-version')
-        old_version = self.selected.get('old-version')
+        new_version = source.get('new-version')
+        old_version = source.get('old-version')
 
         # TODO: Process missing builds; suggest options
         #
@@ -660,7 +824,7 @@ class ProposedMigration(AssistantCommand):
         new = []
         new_binaries = set()
 
-        self.process_lp_build_results(level, uploads, failed)
+        self.process_lp_build_results(source, logger, level, uploads, failed)
 
         if new_version in uploads:
             for arch, item in uploads[new_version].items():
@@ -675,7 +839,7 @@ class ProposedMigration(AssistantCommand):
             assistant.warning("No failed builds found", status=ReviewResult.PASS)
 
             try:
-                missing_builds = self.selected.get('missing-builds')
+                missing_builds = source.get('missing-builds')
                 missing_arches = missing_builds.get('on-architectures')
                 arch_o = []
                 for arch in missing_arches:
@@ -683,7 +847,7 @@ class ProposedMigration(AssistantCommand):
                         arch_o.append("-a {}".format(arch))
 
                 if any(arch_o):
-                    old_binaries = self.selected.get('old-binaries').get(old_version)
+                    old_binaries = source.get('old-binaries').get(old_version)
                     assistant.warning("This package has dropped support for "
                                     "architectures it previous supported. ",
                                     status=ReviewResult.INFO)
@@ -711,51 +875,53 @@ class ProposedMigration(AssistantCommand):
                                 status=ReviewResult.FAIL, depth=1)
 
 
-    def process(self, level):
-        source_name = self.selected.get('source')
-        reasons = self.selected.get('reason')
+    def needs_build_results(self, source):
+        return (source.get('missing-builds') is not None or
+                'no-binaries' in (source.get('reason') or []))
 
-        self.seen.append(source_name)
 
-        self.task_logger = AssistantTaskLogger(source_name, self.task_logger)
-        assistant = self.task_logger.newTask(source_name, depth=level)
+    def process(self, source, level):
+        source_name = source.get('source')
+        reasons = source.get('reason') or []
+
+        task_logger = AssistantTaskLogger(source_name, self.task_logger)
+        assistant = task_logger.newTask(source_name, depth=level)
 
         text_candidate = "not considered"
         candidate = ReviewResult.FAIL
-        if self.selected.get('is-candidate'):
+        if source.get('is-candidate'):
             text_candidate = "a valid candidate"
             candidate = ReviewResult.PASS
         assistant.info("{} is {}".format(source_name, text_candidate),
                        status=candidate)
 
         assistant.critical("Next steps for {} {}:".format(
-                            source_name, self.selected.get('new-version')),
+                            source_name, source.get('new-version')),
                           status=ReviewResult.NONE)
         assistant.debug("reasons: {}".format(reasons), status=ReviewResult.NONE)
 
-        work_needed = False
+        # Each of these does its own (slow) network lookups, independently
+        # of the others; run them concurrently.
+        branches = TaskGraph()
 
-        missing_builds = self.selected.get('missing-builds')
-        if missing_builds is not None or 'no-binaries' in reasons:
-            work_needed = True
-            self.process_missing_builds(level)
+        if self.needs_build_results(source):
+            branches.add(self.process_missing_builds, source, task_logger, level)
 
         if 'depends' in reasons:
-            work_needed = True
-            self.process_unsatisfiable_depends(level)
+            branches.add(self.process_unsatisfiable_depends, source, task_logger, level)
 
         if 'block' in reasons:
-            work_needed = True
-            self.process_blocking(level)
+            branches.add(self.process_blocking, source, task_logger, level)
 
         if 'autopkgtest' in reasons:
-            work_needed = True
-            self.process_autopkgtest(level)
+            branches.add(self.process_autopkgtest, source, task_logger, level)
 
-        dependencies = self.selected.get('dependencies')
+        dependencies = source.get('dependencies')
         if dependencies is not None:
-            work_needed = True
-            self.process_dependencies(self.selected, level)
+            branches.add(self.process_dependencies, source, task_logger, level)
+
+        work_needed = bool(branches.tasks)
+        branches.run()
 
         if work_needed is False:
             assistant.error("Good job!", status=ReviewResult.PASS)
@@ -784,14 +950,13 @@ class ProposedMigration(AssistantCommand):
         options = []
         entry_list = []
         sorted_excuses = sorted(
-            self.excuses['sources'],
-            key=lambda e: e.get('policy_info').get('age').get('current-age'),
+            ((item.get('item-name'), self.get_excuses_age(item))
+             for item in excuses.items()),
+            key=lambda item: item[1],
             reverse=True)
 
-        for src_num, item in enumerate(sorted_excuses, start=1):
-            item_name = item.get('item-name')
-            age = math.floor(
-                item.get('policy_info').get('age').get('current-age'))
+        for src_num, (item_name, age) in enumerate(sorted_excuses, start=1):
+            age = math.floor(age)
             options.append(item_name)
             entry_list.append("({}) {} (Age: {} days)\n".format(
                 src_num, item_name, age))
@@ -812,24 +977,14 @@ class ProposedMigration(AssistantCommand):
         return options[choice - 1]
 
 
-    def get_latest_hints(self, path):
-        if os.path.exists(path):
-            try:
-                subprocess.check_call(
-                    "bzr info %s" % path, shell=True, stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE)
-                subprocess.check_call("bzr pull -d %s" % path, shell=True,
-                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            except subprocess.CalledProcessError:
-                print("The {} path either exists but doesn't seem to be a valid "
-                    "branch or failed to update it properly.".format(
-                        path))
-                exit(1)
-        else:
-            try:
-                subprocess.check_call(
-                    "bzr branch %s %s" % (HINTS_BRANCH, path), shell=True,
-                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            except subprocess.CalledProcessError:
-                print("Could not access the hints-ubuntu bzr branch, exiting.")
-                exit(1)
+    def get_latest_hints(self):
+        with self.hints_lock:
+            if self.hints is None:
+                self.hints = HintsIndex(os.path.join(self.cache_path, 'hints-ubuntu'))
+                try:
+                    with profiling.task('update hints'):
+                        self.hints.update(force=self.refresh)
+                except HintsError as e:
+                    self.hints_error = e
+            if self.hints_error is not None:
+                raise self.hints_error
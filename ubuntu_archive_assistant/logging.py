@@ -16,7 +16,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import json
 import logging
+import threading
 from enum import Enum
 
 
@@ -28,6 +30,28 @@ class ReviewResult(Enum):
     INFO = 4
 
 
+def format_review(msg, status, depth):
+    # FIXME: identationing may be ugly because of character width
+    if status is ReviewResult.PASS:
+        icon = "\033[92m✔\033[0m"
+        #icon = ""
+    elif status is ReviewResult.FAIL:
+        icon = "\033[91m✘\033[0m"
+        #icon = ""
+    elif status is ReviewResult.INFO:
+        icon = "\033[94m\033[0m"
+        #icon = ""
+    else:
+        icon = ""
+
+    if depth <= 0:
+        return '%s %s' % (msg, icon)
+    elif status is ReviewResult.INFO:
+        return '%s%s %s' % (" " * depth * 2, icon, msg)
+    else:
+        return '%s%s %s' % (" " * depth * 2, msg, icon)
+
+
 class ReviewResultAdapter(logging.LoggerAdapter):
 
     depth = 0
@@ -35,51 +59,215 @@ class ReviewResultAdapter(logging.LoggerAdapter):
     def process(self, msg, kwargs):
         status = kwargs.pop('status')
         depth = self.depth + kwargs.pop('depth', 0)
-
-        # FIXME: identationing may be ugly because of character width
-        if status is ReviewResult.PASS:
-            icon = "\033[92m✔\033[0m"
-            #icon = ""
-        elif status is ReviewResult.FAIL:
-            icon = "\033[91m✘\033[0m"
-            #icon = ""
-        elif status is ReviewResult.INFO:
-            icon = "\033[94m\033[0m"
-            #icon = ""
-        else:
-            icon = ""
-
-        if depth <= 0:
-            return '%s %s' % (msg, icon), kwargs
-        elif status is ReviewResult.INFO:
-            return '%s%s %s' % (" " * depth * 2, icon, msg), kwargs
-        else:
-            return '%s%s %s' % (" " * depth * 2, msg, icon), kwargs
-
-    def critical(self, msg, *args, **kwargs):
+        return format_review(msg, status, depth), kwargs
+
+    def make_record(self, level, msg, args, kwargs, depth=0):
+        """Return the review output as a dict, for result sinks."""
+        if args:
+            msg = msg % args
+        return {
+            'task': self.name,
+            'depth': self.extra['depth'] + kwargs.get('depth', 0) + depth,
+            'level': logging.getLevelName(level).lower(),
+            'status': kwargs.get('status', ReviewResult.NONE).name.lower(),
+            'message': msg,
+        }
+
+    def _log(self, level, msg, args, kwargs):
+        transcript = ReviewTranscript.current()
+        if transcript is not None:
+            transcript.record(self, level, msg, args, kwargs)
+            return
+        sinks = AssistantLogger.sinks()
+        if sinks:
+            if self.isEnabledFor(level):
+                record = self.make_record(level, msg, args, kwargs)
+                for sink in sinks:
+                    sink.emit(record)
+            return
         self.depth = self.extra['depth']
         msg, kwargs = self.process(msg, kwargs)
-        self.logger.critical(msg, *args, **kwargs)
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def critical(self, msg, *args, **kwargs):
+        self._log(logging.CRITICAL, msg, args, kwargs)
 
     def error(self, msg, *args, **kwargs):
-        self.depth = self.extra['depth']
-        msg, kwargs = self.process(msg, kwargs)
-        self.logger.error(msg, *args, **kwargs)
+        self._log(logging.ERROR, msg, args, kwargs)
 
     def warning(self, msg, *args, **kwargs):
-        self.depth = self.extra['depth']
-        msg, kwargs = self.process(msg, kwargs)
-        self.logger.warning(msg, *args, **kwargs)
+        self._log(logging.WARNING, msg, args, kwargs)
 
     def info(self, msg, *args, **kwargs):
-        self.depth = self.extra['depth']
-        msg, kwargs = self.process(msg, kwargs)
-        self.logger.info(msg, *args, **kwargs)
+        self._log(logging.INFO, msg, args, kwargs)
 
     def debug(self, msg, *args, **kwargs):
-        self.depth = self.extra['depth']
-        msg, kwargs = self.process("DEBUG<{}>: {}".format(self.name, msg), kwargs)
-        self.logger.debug(msg, *args, **kwargs)
+        self._log(logging.DEBUG, "DEBUG<{}>: {}".format(self.name, msg), args, kwargs)
+
+
+class ReviewTranscript(object):
+    """Record the review output of the current thread instead of emitting it.
+
+    Work that runs concurrently records its output in a transcript, which is
+    replayed once it is done; this keeps the review output in the same order
+    no matter which piece of work finished first.
+    """
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.entries = []
+
+    def __enter__(self):
+        ReviewTranscript._stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        ReviewTranscript._stack().pop()
+
+    @classmethod
+    def _stack(cls):
+        if not hasattr(cls._local, 'stack'):
+            cls._local.stack = []
+        return cls._local.stack
+
+    @classmethod
+    def current(cls):
+        stack = cls._stack()
+        if stack:
+            return stack[-1]
+        return None
+
+    def record(self, adapter, level, msg, args, kwargs):
+        self.entries.append(('log', adapter, (level, msg, args, dict(kwargs))))
+
+    def defer(self, func, *args):
+        """Call func(depth, *args) at this point of the replay."""
+        self.entries.append(('call', func, args))
+
+    def extend(self, transcript):
+        self.entries.extend(transcript.entries)
+
+    def export(self, depth=0):
+        """Return the recorded review output as a list of dicts.
+
+        The calls deferred with defer() are made, as replay() would, and
+        the review output they record is part of the export.
+        """
+        with ReviewTranscript() as replayed:
+            self.replay(depth)
+        results = []
+        for _, target, args in replayed.entries:
+            level, msg, log_args, kwargs = args
+            if not target.isEnabledFor(level):
+                continue
+            results.append(target.make_record(level, msg, log_args, kwargs))
+        return results
+
+    def replay(self, depth=0):
+        for kind, target, args in self.entries:
+            if kind == 'log':
+                level, msg, log_args, kwargs = args
+                kwargs = dict(kwargs)
+                kwargs['depth'] = kwargs.get('depth', 0) + depth
+                target._log(level, msg, log_args, kwargs)
+            else:
+                target(depth, *args)
+
+
+class ResultSink(object):
+    """Where the review output goes, instead of the review loggers.
+
+    Sinks get each piece of review output as a dict (see
+    ReviewResultAdapter.make_record), in order.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def emit(self, record):
+        with self.lock:
+            self.write(record)
+
+    def write(self, record):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class BufferedSink(ResultSink):
+    """Write the rendered records to stream in batches of batch_size."""
+
+    def __init__(self, stream, batch_size=256):
+        super().__init__()
+        self.stream = stream
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def render(self, record):
+        raise NotImplementedError
+
+    def write(self, record):
+        self.buffer.append(self.render(record))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.stream.write(''.join(self.buffer))
+            self.stream.flush()
+            self.buffer = []
+
+    def close(self):
+        with self.lock:
+            self.flush()
+
+
+class TextSink(BufferedSink):
+
+    def render(self, record):
+        status = ReviewResult[record['status'].upper()]
+        return format_review(record['message'], status, record['depth']) + '\n'
+
+
+class NDJSONSink(BufferedSink):
+
+    def render(self, record):
+        return json.dumps(record) + '\n'
+
+
+class ResultTree(ResultSink):
+    """Keep the review output in memory, as a tree following its depth."""
+
+    def __init__(self):
+        super().__init__()
+        self.root = {'children': []}
+        self._stack = [(-1, self.root)]
+
+    def write(self, record):
+        node = dict(record, children=[])
+        while self._stack[-1][0] >= record['depth']:
+            self._stack.pop()
+        self._stack[-1][1]['children'].append(node)
+        self._stack.append((record['depth'], node))
+
+    def results(self):
+        return self.root['children']
+
+
+class JSONSink(ResultTree):
+    """Write the tree of review output to stream as JSON, once closed."""
+
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+
+    def close(self):
+        with self.lock:
+            json.dump(self.results(), self.stream, indent=2)
+            self.stream.write('\n')
+            self.stream.flush()
 
 
 class AssistantLogger(object):
@@ -96,6 +284,7 @@ class AssistantLogger(object):
             main_handler.setFormatter(fmt)
             main_root_logger.addHandler(main_handler)
             main_review_logger.addHandler(review_handler)
+            self.sinks = []
 
     instance = None
 
@@ -129,6 +318,22 @@ class AssistantLogger(object):
     def getReviewLogger(self, name):
         return AssistantLogger.instance.review_log_manager.getLogger(name)
 
+    @staticmethod
+    def sinks():
+        if AssistantLogger.instance is None:
+            return None
+        return AssistantLogger.instance.sinks
+
+    def setResultSinks(self, sinks):
+        """Send the review output to sinks rather than the review loggers."""
+        AssistantLogger.instance.sinks = list(sinks)
+
+    def closeResultSinks(self):
+        """Close the result sinks, and go back to the review loggers."""
+        sinks, AssistantLogger.instance.sinks = AssistantLogger.instance.sinks, []
+        for sink in sinks:
+            sink.close()
+
 
 class AssistantTask(object):
 
@@ -15,11 +15,34 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+import json
+import datetime
+
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
 from termcolor import colored
 
 from ubuntu_archive_assistant.utils import launchpad
+from ubuntu_archive_assistant.utils.tasks import DEFAULT_JOBS
 from ubuntu_archive_assistant.logging import AssistantLogger
 
+# The fields of the bugs, people and targets list_bugs() shows.
+HYDRATE_FIELDS = {
+    'bug': ('id', 'title', 'web_link', 'duplicate_of_link'),
+    'assignee': ('name', 'display_name'),
+    'target': ('name', 'display_name'),
+}
+TASK_FIELDS = ('self_link', 'status', 'importance', 'target_link', 'web_link')
+
+# All the statuses a bug task can be searched by; searchTasks() leaves the
+# closed ones out by default.
+ALL_STATUSES = ("New", "Incomplete", "Opinion", "Invalid", "Won't Fix",
+                "Expired", "Confirmed", "Triaged", "In Progress",
+                "Fix Committed", "Fix Released")
+MAX_SYNC_AGE = 86400    # resynchronize all the tasks at least once a day
+SYNC_OVERLAP = 300      # allow for clock skew between here and Launchpad
+
 
 def _colorize_status(status):
     color = 'grey'
@@ -79,4 +102,146 @@ def list_bugs(print_func, tasks, filter=None, **kwargs):
         if task.bug.id != last_bug_id:
             show_bug(print_func, task.bug, **kwargs)
             last_bug_id = task.bug.id
-        show_task(print_func, task, show_bug_header=False, **kwargs)
\ No newline at end of file
+        show_task(print_func, task, show_bug_header=False, **kwargs)
+
+
+def _load_fields(link, fields):
+    # Runs in a worker thread: use this thread's session, and only hand
+    # plain values back.
+    entry = launchpad.LaunchpadInstance().lp.load(link)
+    return dict((field, getattr(entry, field)) for field in fields)
+
+
+def hydrate_tasks(tasks, jobs=DEFAULT_JOBS, executor=None):
+    """Return plain copies of the bug tasks, with their bug, assignee and
+    target.
+
+    The bugs, people and targets the tasks refer to are each fetched once,
+    concurrently, instead of once per task as they get dereferenced. Pass
+    the caller's executor to reuse its threads, and their Launchpad
+    sessions; otherwise a pool of jobs threads is started for this call.
+    """
+    tasks = list(tasks)
+    links = {}
+    for task in tasks:
+        for name, fields in HYDRATE_FIELDS.items():
+            link = getattr(task, name + '_link')
+            if link:
+                links[link] = fields
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+    try:
+        futures = dict((link, executor.submit(_load_fields, link, fields))
+                       for link, fields in links.items())
+        loaded = dict((link, future.result()) for link, future in futures.items())
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False)
+
+    hydrated = []
+    for task in tasks:
+        values = dict((field, getattr(task, field)) for field in TASK_FIELDS)
+        for name in HYDRATE_FIELDS:
+            values[name] = loaded.get(getattr(task, name + '_link'))
+        hydrated.append(_as_task(values))
+    return hydrated
+
+
+def _as_task(values):
+    task = SimpleNamespace(**values)
+    for name in HYDRATE_FIELDS:
+        if values[name] is not None:
+            setattr(task, name, SimpleNamespace(**values[name]))
+    return task
+
+
+def _task_values(task):
+    values = dict(vars(task))
+    for name in HYDRATE_FIELDS:
+        if values[name] is not None:
+            values[name] = dict(vars(values[name]))
+    return values
+
+
+class BugTaskStore(object):
+    """Local copy of the bug tasks matching a search, kept up to date
+    incrementally.
+
+    sync() only asks Launchpad for the tasks modified since the last sync,
+    and merges them in; everything is searched again once the last full
+    sync is older than MAX_SYNC_AGE.
+    """
+
+    def __init__(self, path):
+        self.logger = AssistantLogger()
+        self.path = path
+        self.tasks = {}
+        self.last_sync = None
+        self.last_full_sync = None
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as fp:
+                store = json.load(fp)
+            self.tasks = dict((values['self_link'], _as_task(values))
+                              for values in store['tasks'])
+            self.last_sync = store['last_sync']
+            self.last_full_sync = store['last_full_sync']
+        except (OSError, ValueError, KeyError, TypeError):
+            self.tasks = {}
+            self.last_sync = self.last_full_sync = None
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        store = {
+            'last_sync': self.last_sync,
+            'last_full_sync': self.last_full_sync,
+            'tasks': [_task_values(task) for task in self.tasks.values()],
+        }
+        with open(self.path + '.new', 'w') as fp:
+            json.dump(store, fp)
+        os.replace(self.path + '.new', self.path)
+
+    def _needs_full_sync(self, now):
+        if self.last_sync is None or self.last_full_sync is None:
+            return True
+        last_full_sync = datetime.datetime.fromisoformat(self.last_full_sync)
+        return (now - last_full_sync).total_seconds() > MAX_SYNC_AGE
+
+    def sync(self, search, statuses, jobs=DEFAULT_JOBS, full=False, executor=None):
+        """Update the store with the tasks returned by search(**kwargs)
+        that have one of statuses. The tasks are hydrated on executor, if
+        given.
+        """
+        self.load()
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        if full or self._needs_full_sync(now):
+            self.logger.log.debug("Searching all bug tasks")
+            tasks = hydrate_tasks(search(status=statuses, omit_duplicates=True),
+                                  jobs=jobs, executor=executor)
+            self.tasks = dict((task.self_link, task) for task in tasks)
+            self.last_full_sync = now.isoformat()
+        else:
+            since = (datetime.datetime.fromisoformat(self.last_sync) -
+                     datetime.timedelta(seconds=SYNC_OVERLAP))
+            self.logger.log.debug("Searching bug tasks modified since {}".format(since))
+            # Look at closed and duplicate tasks too, to drop them.
+            tasks = hydrate_tasks(search(status=ALL_STATUSES, omit_duplicates=False,
+                                         modified_since=since),
+                                  jobs=jobs, executor=executor)
+            for task in tasks:
+                if task.status in statuses and not task.bug.duplicate_of_link:
+                    self.tasks[task.self_link] = task
+                else:
+                    self.tasks.pop(task.self_link, None)
+
+        self.last_sync = now.isoformat()
+        self.save()
+
+    def get_tasks(self, statuses):
+        """Return the stored tasks with one of statuses, by bug."""
+        tasks = [task for task in self.tasks.values() if task.status in statuses]
+        return sorted(tasks, key=lambda task: (task.bug.id, task.target.name))
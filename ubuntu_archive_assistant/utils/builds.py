@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ubuntu_archive_assistant.utils import launchpad, profiling
+from ubuntu_archive_assistant.utils.tasks import DEFAULT_JOBS
+from ubuntu_archive_assistant.logging import AssistantLogger
+
+
+class BuildResults(object):
+    """Builds and uploads of sources in -proposed, by (source, version).
+
+    prefetch() starts looking a source up in the background, as soon as it
+    is known to be needed; get() waits for the lookup. Each source and
+    version is only looked up once. The results are plain data, so they can
+    be used from any thread.
+    """
+
+    def __init__(self, jobs=DEFAULT_JOBS):
+        self.logger = AssistantLogger()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+    def prefetch(self, source, version):
+        key = (source, version)
+        with self.lock:
+            if key not in self.results:
+                self.results[key] = self.executor.submit(self._lookup, source, version,
+                                                         profiling.current_path())
+            return self.results[key]
+
+    def get(self, source, version):
+        """Return a dict with the uploads ({version: {arch: binaries}}) and
+        builds of the latest publication of source in -proposed.
+        """
+        return self.prefetch(source, version).result()
+
+    def _lookup(self, source, version, profile_path):
+        with profiling.task('builds', parent=profile_path):
+            return self.lookup(source, version)
+
+    def lookup(self, source, version):
+        self.logger.log.debug("Looking up builds of {} {}".format(source, version))
+        lp = launchpad.LaunchpadInstance()
+        archive = lp.ubuntu_archive()
+        series = lp.current_series()
+
+        spph = lp.published_sources(exact_match=True,
+                                    source_name=source,
+                                    distro_series=series,
+                                    pocket="Proposed",
+                                    order_by_date=True)
+
+        uploads = {}
+        new_version = series.getPackageUploads(archive=archive,
+                                               name=source,
+                                               version=version,
+                                               pocket="Proposed",
+                                               exact_match=True)
+        for item in new_version:
+            arch = item.display_arches.split(',')[0]
+            if item.package_version not in uploads:
+                uploads[item.package_version] = {}
+            if arch == 'source':
+                continue
+            uploads[item.package_version][arch] = item.getBinaryProperties()
+
+        # Only get the builds for the latest publication, this is more likely to
+        # be new source in -proposed, or the most recent upload.
+        builds = [{
+            'arch_tag': build.arch_tag,
+            'buildstate': build.buildstate,
+            'build_log_url': build.build_log_url,
+        } for build in spph[0].getBuilds()]
+
+        return {
+            'source_package_name': spph[0].source_package_name,
+            'source_package_version': spph[0].source_package_version,
+            'uploads': uploads,
+            'builds': builds,
+        }
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import json
+import time
+import threading
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ubuntu_archive_assistant.utils import profiling
+from ubuntu_archive_assistant.logging import AssistantLogger
+
+DEBIAN_CI_URL = 'https://ci.debian.net'
+MAX_CI_CACHE_AGE = 1800     # test results should not be older than 30 minutes
+
+
+def pool_prefix(package):
+    if package.startswith('lib'):
+        return package[:4]
+    return package[0]
+
+
+class DebianCIResults(object):
+    """Look up the latest autopkgtest results on ci.debian.net.
+
+    Results are cached on disk for MAX_CI_CACHE_AGE seconds, keyed by
+    architecture and package. With bulk=True, the status of all packages
+    for an architecture is downloaded once, instead of per package.
+    """
+
+    def __init__(self, cache_path=None, suite='unstable', bulk=False, jobs=8):
+        self.logger = AssistantLogger()
+        self.suite = suite
+        self.bulk = bulk
+        self.jobs = jobs
+        self.cache_path = None
+        if cache_path:
+            self.cache_path = os.path.join(cache_path, 'debian-ci', suite)
+        self.session = requests.Session()
+        self.results = {}
+        self.status = {}
+        self.status_locks = {}
+        self.lock = threading.Lock()
+
+    def _cache_file(self, arch, name):
+        if not self.cache_path:
+            return None
+        return os.path.join(self.cache_path, arch, name)
+
+    def _read_cache(self, path):
+        if not path:
+            return None
+        try:
+            if (time.time() - os.stat(path).st_mtime) > MAX_CI_CACHE_AGE:
+                return None
+            with open(path, 'r') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, path, data):
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.new', 'w') as fp:
+            json.dump(data, fp)
+        os.replace(path + '.new', path)
+
+    def _fetch(self, url):
+        self.logger.log.debug("Fetching {}".format(url))
+        with profiling.task('debian ci'):
+            resp = self.session.get(url)
+            resp.raise_for_status()
+            return resp.json()
+
+    def load_status(self, arch):
+        """Load the latest results of all the packages on arch."""
+        with self.lock:
+            if arch in self.status:
+                return self.status[arch]
+            arch_lock = self.status_locks.setdefault(arch, threading.Lock())
+
+        # Only the lookups on this arch wait for the download
+        with arch_lock:
+            with self.lock:
+                if arch in self.status:
+                    return self.status[arch]
+
+            path = self._cache_file(arch, 'packages.json')
+            packages = self._read_cache(path)
+            if packages is None:
+                url = "{}/data/status/{}/{}/packages.json".format(
+                    DEBIAN_CI_URL, self.suite, arch)
+                try:
+                    packages = self._fetch(url)
+                    self._write_cache(path, packages)
+                except (requests.RequestException, ValueError) as e:
+                    self.logger.log.debug("Could not load {}: {}".format(url, e))
+                    packages = []
+
+            status = dict((result.get('package'), result) for result in packages)
+            with self.lock:
+                self.status[arch] = status
+            return status
+
+    def get(self, package, arch):
+        """Return the latest test results for package on arch, or None."""
+        if self.bulk:
+            return self.load_status(arch).get(package)
+
+        key = (package, arch)
+        with self.lock:
+            if key in self.results:
+                return self.results[key]
+
+        path = self._cache_file(arch, package + '.json')
+        result = self._read_cache(path)
+        if result is None:
+            url = "{}/data/packages/{}/{}/{}/{}/latest.json".format(
+                DEBIAN_CI_URL, self.suite, arch, pool_prefix(package), package)
+            try:
+                result = self._fetch(url)
+                self._write_cache(path, result)
+            except (requests.RequestException, ValueError) as e:
+                self.logger.log.debug("No Debian CI results for {}: {}".format(package, e))
+                result = None
+
+        with self.lock:
+            self.results[key] = result
+        return result
+
+    def get_many(self, packages, arch):
+        """Return a dict of package to latest results on arch, fetching the
+        results concurrently.
+        """
+        packages = sorted(set(packages))
+        if self.bulk or len(packages) < 2:
+            return dict((package, self.get(package, arch)) for package in packages)
+
+        with ThreadPoolExecutor(max_workers=min(self.jobs, len(packages))) as executor:
+            results = executor.map(lambda package: self.get(package, arch), packages)
+            return dict(zip(packages, results))
@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import json
+import yaml
+
+from ubuntu_archive_assistant.logging import AssistantLogger
+
+INDEX_FORMAT = 1
+
+
+class ExcusesIndex(object):
+    """Lazily loaded update_excuses.yaml.
+
+    Only the byte ranges of the items in the 'sources' list are kept in
+    memory, by item name; each item is parsed from the file when asked for.
+    If index_path is given, the index is saved there and reused for as long
+    as the excuses file doesn't change.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.logger = AssistantLogger()
+        self.path = path
+        self.index_path = index_path
+        self.offsets = {}
+        self.order = []
+        self.fd = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, item_name):
+        return item_name in self.offsets
+
+    def __len__(self):
+        return len(self.order)
+
+    def open(self):
+        self.fd = os.open(self.path, os.O_RDONLY)
+        state = os.fstat(self.fd)
+        stamp = [state.st_mtime, state.st_size]
+
+        if self.index_path:
+            try:
+                with open(self.index_path, 'r') as fp:
+                    index = json.load(fp)
+                if index.get('format') == INDEX_FORMAT and index.get('stamp') == stamp:
+                    self.order = [tuple(r) for r in index['order']]
+                    self._map_names()
+                    return
+            except (OSError, ValueError):
+                pass
+
+        self.logger.log.debug("Indexing {}".format(self.path))
+        self.order = self.scan()
+        self._map_names()
+
+        if self.index_path:
+            with open(self.index_path + '.new', 'w') as fp:
+                json.dump({'format': INDEX_FORMAT, 'stamp': stamp,
+                           'order': self.order}, fp)
+            os.replace(self.index_path + '.new', self.index_path)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _map_names(self):
+        self.offsets = {}
+        for name, start, end in self.order:
+            self.offsets.setdefault(name, []).append((start, end))
+
+    @staticmethod
+    def _item_name(value):
+        value = value.strip()
+        if value[:1] in (b'"', b"'"):
+            return yaml.load(value, Loader=yaml.CSafeLoader)
+        return value.decode('utf-8')
+
+    def scan(self):
+        """Return (item-name, start, end) for each item of the sources list.
+
+        This relies on the block layout britney writes: the list items start
+        with '- ' at the indentation of the list, and their keys are aligned
+        with the first one.
+        """
+        order = []
+        indent = key_column = None
+        start = name = None
+        offset = 0
+        in_sources = False
+
+        with open(self.path, 'rb') as fp:
+            for line in fp:
+                line_start = offset
+                offset += len(line)
+
+                if not in_sources:
+                    in_sources = line.rstrip() == b'sources:'
+                    continue
+
+                stripped = line.lstrip(b' ')
+                if not stripped.strip() or stripped.startswith(b'#'):
+                    continue
+                column = len(line) - len(stripped)
+                if indent is None:
+                    if not stripped.startswith(b'- '):
+                        break
+                    indent = column
+
+                if column < indent or (column == indent and not stripped.startswith(b'-')):
+                    # Next top-level key, or the end of the list.
+                    break
+
+                if column == indent:
+                    if start is not None:
+                        order.append((name, start, line_start))
+                    start, name = line_start, None
+                    rest = stripped[1:]
+                    stripped = rest.lstrip(b' ')
+                    key_column = column + 1 + len(rest) - len(stripped)
+                elif column != key_column:
+                    continue
+
+                if stripped.startswith(b'item-name:'):
+                    name = self._item_name(stripped[len(b'item-name:'):])
+            else:
+                line_start = offset
+
+        if start is not None:
+            order.append((name, start, line_start))
+        return order
+
+    def _read(self, start, end):
+        data = os.pread(self.fd, end - start, start)
+        return yaml.load(data, Loader=yaml.CSafeLoader)[0]
+
+    def get(self, item_name):
+        """Return the list of excuses items named item_name."""
+        return [self._read(start, end)
+                for start, end in self.offsets.get(item_name, [])]
+
+    def names(self):
+        return [name for name, _, _ in self.order]
+
+    def items(self):
+        """Iterate over all the excuses items, parsing them one at a time."""
+        for _, start, end in self.order:
+            yield self._read(start, end)
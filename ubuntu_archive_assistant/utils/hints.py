@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import json
+import time
+import threading
+import subprocess
+
+from collections import namedtuple, defaultdict
+
+from ubuntu_archive_assistant.logging import AssistantLogger
+
+HINTS_BRANCH = 'lp:~ubuntu-release/britney/hints-ubuntu'
+MAX_HINTS_AGE = 3600    # hints branch should not be older than 1 hour
+INDEX_FORMAT = 1
+
+Hint = namedtuple('Hint', ['command', 'package', 'version', 'file', 'line'])
+
+
+class HintsError(Exception):
+    pass
+
+
+class HintsIndex(object):
+    """Index of the britney hints, by command and package.
+
+    The hints branch is updated at most every MAX_HINTS_AGE seconds; the
+    parsed hints are kept next to it and only re-parsed when the hints
+    files change.
+    """
+
+    def __init__(self, path, branch=HINTS_BRANCH, ignore=('freeze',)):
+        self.logger = AssistantLogger()
+        self.path = path
+        self.branch = branch
+        self.ignore = ignore
+        self.stamp_path = path + '.stamp'
+        self.index_path = path + '.index.json'
+        self.hints = None
+        self.lock = threading.Lock()
+
+    def is_stale(self):
+        try:
+            return (time.time() - os.stat(self.stamp_path).st_mtime) > MAX_HINTS_AGE
+        except FileNotFoundError:
+            return True
+
+    def update(self, force=False):
+        """Branch or pull the hints, unless they were updated recently."""
+        if not force and os.path.isdir(self.path) and not self.is_stale():
+            return
+
+        if os.path.isdir(os.path.join(self.path, '.bzr')):
+            cmd = ['bzr', 'pull', '-q', '-d', self.path]
+        elif os.path.exists(self.path):
+            raise HintsError("The {} path exists but doesn't seem to be a valid "
+                             "branch.".format(self.path))
+        else:
+            cmd = ['bzr', 'branch', '-q', self.branch, self.path]
+
+        self.logger.log.debug("Updating hints: {}".format(" ".join(cmd)))
+        try:
+            subprocess.check_call(cmd, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise HintsError("Could not update the hints-ubuntu branch: {}".format(e))
+
+        with open(self.stamp_path, 'w'):
+            pass
+
+    def _hints_files(self):
+        files = {}
+        for name in sorted(os.listdir(self.path)):
+            filename = os.path.join(self.path, name)
+            if name in self.ignore or name.startswith('.') or not os.path.isfile(filename):
+                continue
+            state = os.stat(filename)
+            files[name] = [state.st_mtime, state.st_size]
+        return files
+
+    @staticmethod
+    def parse_line(line):
+        """Return (command, [(package, version), ...]) for a hints line."""
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            return None, []
+        tokens = line.split()
+        items = []
+        for token in tokens[1:]:
+            package, _, version = token.partition('/')
+            items.append((package, version or None))
+        return tokens[0], items
+
+    def parse(self, files):
+        hints = defaultdict(lambda: defaultdict(list))
+        for name in files:
+            with open(os.path.join(self.path, name), errors='replace') as fp:
+                for lineno, line in enumerate(fp, start=1):
+                    command, items = self.parse_line(line)
+                    for package, version in items:
+                        hints[command][package].append((version, name, lineno))
+        return hints
+
+    def load(self):
+        """Load the index from disk, re-parsing the hints if they changed."""
+        with self.lock:
+            if self.hints is not None:
+                return
+
+            files = self._hints_files()
+            try:
+                with open(self.index_path, 'r') as fp:
+                    index = json.load(fp)
+                if index.get('format') == INDEX_FORMAT and index.get('files') == files:
+                    self.hints = index['hints']
+                    return
+            except (OSError, ValueError):
+                pass
+
+            self.logger.log.debug("Indexing hints in {}".format(self.path))
+            self.hints = self.parse(files)
+            with open(self.index_path + '.new', 'w') as fp:
+                json.dump({'format': INDEX_FORMAT, 'files': files, 'hints': self.hints}, fp)
+            os.replace(self.index_path + '.new', self.index_path)
+
+    def lookup(self, command, package):
+        """Return the list of hints for command on package."""
+        self.load()
+        return [Hint(command, package, *entry)
+                for entry in self.hints.get(command, {}).get(package, [])]
+
+    def find_unblock(self, package, version=None):
+        """Return the unblock hint for package (at version, if given), or
+        None.
+        """
+        for hint in self.lookup('unblock', package):
+            if version is None or hint.version == version:
+                return hint
+        return None
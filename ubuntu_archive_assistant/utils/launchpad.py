@@ -16,15 +16,74 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-from launchpadlib.launchpad import Launchpad
+import time
+import threading
+from collections import defaultdict
 
 from ubuntu_archive_assistant.logging import AssistantLogger
 
+# How long looked up objects are kept, by kind; the series, archive and
+# teams don't change during a run, bugs and publications might.
+CACHE_TTL = {
+    'distribution': 3600,
+    'series': 3600,
+    'archive': 3600,
+    'person': 3600,
+    'source_package': 3600,
+    'bug': 300,
+    'published_sources': 300,
+}
+
+
+class ResourceCache(object):
+    """Memoize Launchpad lookups for a while, keeping hit/miss counters.
+
+    Objects are stored per thread, since launchpadlib objects are bound to
+    the session that fetched them; the counters are shared.
+    """
+
+    _stats = defaultdict(lambda: [0, 0])
+    _stats_lock = threading.Lock()
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}
+
+    def get(self, kind, key, func, *args, **kwargs):
+        now = time.time()
+        entry = self.entries.get((kind, key))
+        hit = entry is not None and (now - entry[0]) < self.ttl.get(kind, 0)
+        with ResourceCache._stats_lock:
+            ResourceCache._stats[kind][0 if hit else 1] += 1
+        if hit:
+            return entry[1]
+
+        value = func(*args, **kwargs)
+        self.entries[(kind, key)] = (now, value)
+        return value
+
+    def clear(self):
+        self.entries = {}
+
+    @classmethod
+    def stats(cls):
+        """Return {kind: (hits, misses)} for all the threads."""
+        with cls._stats_lock:
+            return dict((kind, tuple(counts)) for kind, counts in cls._stats.items())
+
+
+def _cache_key(value):
+    # Launchpad objects aren't hashable; use their URL instead.
+    return getattr(value, 'self_link', value)
+
 
 class LaunchpadInstance(object):
 
     class __LaunchpadInstance(object):
         def __init__(self):
+            # launchpadlib is slow to import; only load it once it's needed.
+            from launchpadlib.launchpad import Launchpad
+
             self.logger = AssistantLogger()
             self.lp_cachedir = os.path.expanduser(os.path.join("~", ".launchpadlib/cache"))
             self.logger.log.debug("Using Launchpad cache dir: \"%s\"" % self.lp_cachedir)
@@ -32,16 +91,26 @@ class LaunchpadInstance(object):
                                            service_root='production',
                                            launchpadlib_dir=self.lp_cachedir,
                                            version='devel')
+            self.cache = ResourceCache()
 
 
-    instance = None
+    # launchpadlib objects can't be shared between threads; keep a session
+    # per thread instead.
+    _local = threading.local()
+    _login_lock = threading.Lock()
 
 
     def __init__(self, module=None, depth=0):
-        if not LaunchpadInstance.instance:
-            LaunchpadInstance.instance = LaunchpadInstance.__LaunchpadInstance()
-        self.lp = LaunchpadInstance.instance.lp
-        self.ubuntu = self.lp.distributions['ubuntu']
+        instance = getattr(LaunchpadInstance._local, 'instance', None)
+        if not instance:
+            # Serialize logins, so only one thread ever asks for credentials.
+            with LaunchpadInstance._login_lock:
+                instance = LaunchpadInstance.__LaunchpadInstance()
+            LaunchpadInstance._local.instance = instance
+        self.lp = instance.lp
+        self.cache = instance.cache
+        self.ubuntu = self.cache.get('distribution', 'ubuntu',
+                                     lambda: self.lp.distributions['ubuntu'])
 
 
     def lp(self):
@@ -53,8 +122,37 @@ class LaunchpadInstance(object):
 
 
     def ubuntu_archive(self):
-        return self.ubuntu.main_archive
+        return self.cache.get('archive', 'ubuntu', lambda: self.ubuntu.main_archive)
 
 
     def current_series(self):
-        return self.ubuntu.current_series
+        return self.cache.get('series', 'current', lambda: self.ubuntu.current_series)
+
+
+    def person(self, name):
+        """Return the Launchpad person or team called name."""
+        return self.cache.get('person', name, lambda: self.lp.people[name])
+
+
+    def bug(self, bug_id):
+        return self.cache.get('bug', int(bug_id), lambda: self.lp.bugs[int(bug_id)])
+
+
+    def source_package(self, name):
+        """Return the Ubuntu source package called name, or None."""
+        return self.cache.get('source_package', name,
+                              self.ubuntu.getSourcePackage, name=name)
+
+
+    def published_sources(self, **kwargs):
+        """Return the publications of the Ubuntu archive matching kwargs,
+        as getPublishedSources() does.
+        """
+        key = tuple(sorted((k, _cache_key(v)) for k, v in kwargs.items()))
+        return self.cache.get('published_sources', key,
+                              self.ubuntu_archive().getPublishedSources, **kwargs)
+
+
+    @staticmethod
+    def cache_stats():
+        return ResourceCache.stats()
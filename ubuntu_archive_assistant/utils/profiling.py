@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Timing of the assistant's tasks, for --profile.
+
+Tasks are timed with task(name); nested tasks are grouped under their
+parent, and work handed to another thread can carry its parent's path
+along (see current_path()). While profiling, HTTP requests are counted by
+host and subprocesses by program.
+"""
+
+import sys
+import time
+import threading
+import contextlib
+
+from collections import defaultdict
+
+_profiler = None
+_local = threading.local()
+
+
+def active():
+    return _profiler is not None
+
+
+def current_path():
+    return getattr(_local, 'path', ())
+
+
+@contextlib.contextmanager
+def _timed(name, parent):
+    saved = current_path()
+    path = (parent if parent is not None else saved) + (name,)
+    _local.path = path
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        _profiler.add_time(path, time.monotonic() - start)
+        _local.path = saved
+
+
+def task(name, parent=None):
+    """Time the enclosed block as task name, under parent (by default, the
+    task this thread is in).
+    """
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _timed(name, parent)
+
+
+class Profiler(object):
+
+    def __init__(self, pstats_path=None):
+        self.pstats_path = pstats_path
+        self.cprofile = None
+        self.times = defaultdict(lambda: [0, 0.0])
+        self.hosts = defaultdict(int)
+        self.programs = defaultdict(int)
+        self.lock = threading.Lock()
+        self._putrequest = None
+        self._popen_init = None
+
+    def add_time(self, path, elapsed):
+        with self.lock:
+            entry = self.times[path]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def _count(self, counter, key):
+        with self.lock:
+            counter[key] += 1
+
+    def __enter__(self):
+        # Only imported here, to keep them out of the startup of commands
+        # that aren't being profiled.
+        import http.client
+        import subprocess
+
+        global _profiler
+        profiler = self
+        putrequest = self._putrequest = http.client.HTTPConnection.putrequest
+        popen_init = self._popen_init = subprocess.Popen.__init__
+
+        def counting_putrequest(conn, *args, **kwargs):
+            profiler._count(profiler.hosts, conn.host)
+            return putrequest(conn, *args, **kwargs)
+
+        def counting_popen_init(popen, args, *more_args, **kwargs):
+            program = args.split()[0] if isinstance(args, str) else args[0]
+            profiler._count(profiler.programs, str(program))
+            return popen_init(popen, args, *more_args, **kwargs)
+
+        http.client.HTTPConnection.putrequest = counting_putrequest
+        subprocess.Popen.__init__ = counting_popen_init
+
+        if self.pstats_path:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        _profiler = self
+        return self
+
+    def __exit__(self, *args):
+        import http.client
+        import subprocess
+
+        global _profiler
+        _profiler = None
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.pstats_path)
+        http.client.HTTPConnection.putrequest = self._putrequest
+        subprocess.Popen.__init__ = self._popen_init
+
+    def report(self, file=sys.stderr):
+        print("\n== Profile ==", file=file)
+        print("{:<50} {:>7} {:>10}".format("Task", "Count", "Seconds"), file=file)
+        for path, (count, elapsed) in sorted(self.times.items()):
+            name = "  " * (len(path) - 1) + path[-1]
+            print("{:<50} {:>7} {:>10.3f}".format(name, count, elapsed), file=file)
+
+        for title, counter in (("HTTP requests", self.hosts),
+                               ("Subprocesses", self.programs)):
+            if not counter:
+                continue
+            print("\n{}:".format(title), file=file)
+            for key, count in sorted(counter.items(), key=lambda c: c[1], reverse=True):
+                print("  {:<48} {:>7}".format(key, count), file=file)
+
+        if self.pstats_path:
+            print("\ncProfile statistics of the main thread written to {}".format(
+                self.pstats_path), file=file)
@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019  Canonical Ltd.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ubuntu_archive_assistant.logging import ReviewTranscript
+from ubuntu_archive_assistant.utils import profiling
+
+DEFAULT_JOBS = 8
+
+
+class TaskGraph(object):
+    """Run independent review tasks concurrently.
+
+    Each task records its review output in its own transcript; once all the
+    tasks are done, the transcripts are replayed (or appended to the caller's
+    transcript) in the order the tasks were added.
+    """
+
+    jobs = DEFAULT_JOBS
+
+    _executor = None
+    _lock = threading.Lock()
+    _local = threading.local()
+
+    def __init__(self):
+        self.tasks = []
+
+    @classmethod
+    def set_jobs(cls, jobs):
+        with cls._lock:
+            cls.jobs = max(1, jobs)
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False)
+                cls._executor = None
+
+    @classmethod
+    def executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.jobs)
+            return cls._executor
+
+    def add(self, func, *args, **kwargs):
+        self.tasks.append((func, args, kwargs))
+
+    @staticmethod
+    def _task_name(func):
+        name = getattr(func, '__name__', str(func))
+        if name.startswith('process_'):
+            name = name[len('process_'):]
+        return name
+
+    @staticmethod
+    def _run_task(func, args, kwargs, profile_path):
+        TaskGraph._local.in_task = True
+        try:
+            with profiling.task(TaskGraph._task_name(func), parent=profile_path), \
+                    ReviewTranscript() as transcript:
+                result = func(*args, **kwargs)
+            return transcript, result
+        finally:
+            TaskGraph._local.in_task = False
+
+    def _run_inline(self, func, args, kwargs):
+        with profiling.task(self._task_name(func)):
+            return func(*args, **kwargs)
+
+    def run(self):
+        """Run all the tasks, and return their results in order."""
+        # Tasks running in the pool don't wait on the pool themselves, a
+        # nested graph just runs its tasks in place.
+        if self.jobs == 1 or len(self.tasks) < 2 or getattr(self._local, 'in_task', False):
+            return [self._run_inline(func, args, kwargs) for func, args, kwargs in self.tasks]
+
+        executor = self.executor()
+        profile_path = profiling.current_path()
+        futures = [executor.submit(TaskGraph._run_task, func, args, kwargs, profile_path)
+                   for func, args, kwargs in self.tasks]
+
+        parent = ReviewTranscript.current()
+        results = []
+        for future in futures:
+            transcript, result = future.result()
+            if parent is not None:
+                parent.extend(transcript)
+            else:
+                transcript.replay()
+            results.append(result)
+        return results
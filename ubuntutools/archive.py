@@ -51,6 +51,7 @@ from ubuntutools.config import UDTConfig
 from ubuntutools.lp.lpapicache import (Launchpad, Distribution,
                                        SourcePackagePublishingHistory)
 from ubuntutools.logger import Logger
+from ubuntutools.madison import SourcesIndex
 from ubuntutools import subprocess
 
 if sys.version_info[0] >= 3:
@@ -612,8 +613,26 @@ class FakeSPPH(object):
         return u''.join(new_entries)
 
 
+_sources_indexes = {}
+
+
 def rmadison(url, package, suite=None, arch=None):
-    "Call rmadison and parse the result"
+    """Call rmadison and parse the result.
+
+    With UBUNTUTOOLS_SOURCES_INDEX=yes, queries about the source packages of
+    debian and ubuntu are answered from local copies of the Sources of the
+    archive mirror (see ubuntutools.madison) instead.
+    """
+    if (url in ('debian', 'ubuntu') and arch in (None, 'source')
+            and UDTConfig().get_value('SOURCES_INDEX', boolean=True)):
+        if url not in _sources_indexes:
+            mirror = UDTConfig().get_value(url.upper() + '_MIRROR')
+            _sources_indexes[url] = SourcesIndex(url, mirror)
+        return _sources_indexes[url].query(package, suite)
+    return _rmadison(url, package, suite, arch)
+
+
+def _rmadison(url, package, suite, arch):
     cmd = ['rmadison', '-u', url]
     if suite:
         cmd += ['-s', suite]
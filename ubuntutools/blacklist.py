@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+#
+#   blacklist.py - the Ubuntu sync blacklists, cached and indexed
+#
+#   Copyright (C) 2019, Canonical Ltd.
+#
+#   This program is free software; you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License
+#   as published by the Free Software Foundation; version 3.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   See file /usr/share/common-licenses/GPL-3 for more details.
+
+"""The sync blacklists are kept in two places: as distro series differences
+(DSDs) blacklisted on Launchpad, and in the older sync-blacklist.txt.
+
+sync-blacklist.txt is kept on disk, and only downloaded again when it
+changed (using a conditional request). Its entries are indexed, exact names
+in a dict and globs in a single regular expression, so that a lookup
+doesn't scan the file. The blacklisted DSDs of a series are looked up all
+at once, and they and the DSD comments of each package are kept on disk for
+DSD_TTL seconds.
+"""
+
+from __future__ import print_function
+
+import fnmatch
+import os
+import re
+import socket
+import threading
+import time
+
+import httplib2
+
+from ubuntutools.logger import Logger
+from ubuntutools.misc import CACHE_DIR, load_cached_json, save_cached_json
+
+__all__ = [
+    'SyncBlacklist',
+]
+
+SYNC_BLACKLIST_URL = ('http://people.canonical.com/~ubuntu-archive/'
+                      'sync-blacklist.txt')
+
+DSD_TTL = 3600
+
+_BLACKLISTED_STATUSES = ('Blacklisted always', 'Blacklisted current version')
+
+
+class SyncBlacklist(object):
+    '''The sync blacklists, for checking one package or many.
+
+    A SyncBlacklist can be used from several threads at once; call save()
+    when done, to keep what was looked up for the next run.
+    '''
+
+    def __init__(self, url=SYNC_BLACKLIST_URL, cache_dir=CACHE_DIR,
+                 dsd_ttl=DSD_TTL):
+        self.url = url
+        self.cache_dir = cache_dir
+        self.dsd_ttl = dsd_ttl
+        self._lines = None
+        self._exact = None
+        self._globs = None
+        self._glob_re = None
+        self._differences = {}
+        self._comments = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _fetch(self):
+        '''Return the text of sync-blacklist.txt, downloading it only if it
+        changed since the copy on disk.
+        '''
+        path = self._cache_path('sync-blacklist.json')
+        cached = load_cached_json(path)
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last-modified'):
+                headers['If-Modified-Since'] = cached['last-modified']
+
+        try:
+            response, body = httplib2.Http().request(self.url, headers=headers)
+        except (httplib2.HttpLib2Error, socket.error) as e:
+            if not cached:
+                raise IOError('%s: %s' % (self.url, e))
+            Logger.warn('Using the cached sync-blacklist.txt: %s', e)
+            return cached['text']
+
+        if response.status == 304:
+            return cached['text']
+        if response.status != 200:
+            if not cached:
+                raise IOError('%s: %s %s' % (self.url, response.status,
+                                             response.reason))
+            Logger.warn('Using the cached sync-blacklist.txt: %s %s',
+                        response.status, response.reason)
+            return cached['text']
+
+        text = body.decode('utf-8')
+        save_cached_json(path, {'etag': response.get('etag'),
+                                'last-modified': response.get('last-modified'),
+                                'text': text})
+        return text
+
+    def lines(self):
+        '''Return the lines of sync-blacklist.txt.'''
+        with self._lock:
+            if self._lines is None:
+                self._lines = self._fetch().splitlines(True)
+                self._index()
+        return self._lines
+
+    def _index(self):
+        '''Index the entries of sync-blacklist.txt by position: exact names
+        in a dict, globs in a list and a regular expression matching any
+        of them.
+        '''
+        self._exact = {}
+        self._globs = []
+        applicable_lines = []
+        for line in self._lines:
+            if not line.strip():
+                applicable_lines = []
+                continue
+            applicable_lines.append(line)
+            try:
+                line = line[:line.index('#')]
+            except ValueError:
+                pass
+            source = line.strip()
+            if not source:
+                continue
+            entry = (len(self._exact) + len(self._globs), source,
+                     list(applicable_lines))
+            if any(c in source for c in '*?['):
+                self._globs.append(entry)
+            else:
+                self._exact.setdefault(source, entry)
+        if self._globs:
+            self._glob_re = re.compile('|'.join(
+                '(?:%s)' % fnmatch.translate(source)
+                for _, source, _ in self._globs))
+
+    def match(self, query):
+        '''Return the lines of sync-blacklist.txt that blacklist query (the
+        first matching entry with the comments leading to it), or None.
+        '''
+        self.lines()
+        matches = []
+        if query in self._exact:
+            matches.append(self._exact[query])
+        if self._glob_re is not None and self._glob_re.match(query):
+            matches.extend(entry for entry in self._globs
+                           if fnmatch.fnmatch(query, entry[1]))
+        if not matches:
+            return None
+        return min(matches)[2]
+
+    def differences(self, series):
+        '''Return {source package name: status} of the blacklisted DSDs of
+        series (a Launchpad distro series).
+        '''
+        with self._lock:
+            if series.name not in self._differences:
+                path = self._cache_path('dsd-%s.json' % series.name)
+                cached = load_cached_json(path)
+                if cached and time.time() - cached['time'] < self.dsd_ttl:
+                    differences = cached['differences']
+                else:
+                    differences = {}
+                    for status in _BLACKLISTED_STATUSES:
+                        for diff in series.getDifferencesTo(status=status):
+                            differences[diff.sourcepackagename] = diff.status
+                    save_cached_json(path, {'time': time.time(),
+                                            'differences': differences})
+                self._differences[series.name] = differences
+            return self._differences[series.name]
+
+    def _series_comments(self, series):
+        if series.name not in self._comments:
+            path = self._cache_path('dsd-comments-%s.json' % series.name)
+            cached = load_cached_json(path) or {}
+            now = time.time()
+            self._comments[series.name] = dict(
+                (name, entry) for name, entry in cached.items()
+                if now - entry[0] < self.dsd_ttl)
+        return self._comments[series.name]
+
+    def comments(self, series, query):
+        '''Return the comments on the DSD of query in series.'''
+        with self._lock:
+            entry = self._series_comments(series).get(query)
+        if entry is not None:
+            return entry[1]
+
+        comments = [u'%s\n  -- %s  %s'
+                    % (c.body_text, c.comment_author.name,
+                       c.comment_date.strftime('%a, %d %b %Y %H:%M:%S +0000'))
+                    for c in series.getDifferenceComments(
+                        source_package_name=query)]
+        with self._lock:
+            self._series_comments(series)[query] = [time.time(), comments]
+            self._dirty.add(series.name)
+        return comments
+
+    def save(self):
+        '''Keep the DSD comments looked up so far on disk.'''
+        with self._lock:
+            for name in self._dirty:
+                save_cached_json(
+                    self._cache_path('dsd-comments-%s.json' % name),
+                    self._comments[name])
+            self._dirty = set()
+
+    def check(self, query, series):
+        '''Determine if package "query" is in the sync blacklist of series
+        (a Launchpad distro series).
+
+        Returns tuple of (blacklisted, comments)
+        blacklisted is one of False, 'CURRENT', 'ALWAYS'
+        '''
+        comments = self.comments(series, query)
+        blacklisted = False
+        status = self.differences(series).get(query)
+        if status == 'Blacklisted current version':
+            blacklisted = 'CURRENT'
+        elif status == 'Blacklisted always':
+            blacklisted = 'ALWAYS'
+
+        # Old blacklist:
+        lines = self.match(query)
+        if lines is not None:
+            comments = comments + ["From sync-blacklist.txt:"] + lines
+            blacklisted = 'ALWAYS'
+
+        return (blacklisted, comments)
@@ -39,6 +39,8 @@ class UDTConfig(object):
         'DEBSEC_MIRROR': 'http://security.debian.org',
         'LPINSTANCE': 'production',
         'MIRROR_FALLBACK': True,
+        'RDEPENDS_INDEX': False,
+        'SOURCES_INDEX': False,
         'UBUNTU_MIRROR': 'http://archive.ubuntu.com/ubuntu',
         'UBUNTU_PORTS_MIRROR': 'http://ports.ubuntu.com',
         'UPDATE_BUILDER': False,
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+#
+#   builds.py - retry and rescore the builds of many source packages
+#
+#   Copyright (C) 2019, Canonical Ltd.
+#
+#   This program is free software; you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License
+#   as published by the Free Software Foundation; either version 3
+#   of the License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   Please see the /usr/share/common-licenses/GPL file for the full text
+#   of the GNU General Public License license.
+
+from __future__ import print_function
+
+import collections
+import sys
+import threading
+import time
+
+from debian.changelog import Version
+from launchpadlib.errors import HTTPError
+
+from ubuntutools.lp.lpapicache import Launchpad
+from ubuntutools.misc import format_table
+from ubuntutools.parallel import DEFAULT_JOBS, WorkerPool
+
+__all__ = [
+    'BuildBatch',
+    'BuildWatcher',
+    'SourceBuilds',
+]
+
+# What happened to a build, in the summary
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+DENIED = 'denied'
+
+# Build states that won't change unless someone acts on the build (or, for
+# dependency waits, on the archive)
+FINISHED_STATES = frozenset([
+    'Successfully built',
+    'Failed to build',
+    'Dependency wait',
+    'Chroot problem',
+    'Build for superseded Source',
+    'Failed to upload',
+    'Cancelled build',
+])
+
+BuildInfo = collections.namedtuple('BuildInfo',
+                                   'arch state can_be_retried can_be_rescored '
+                                   'link')
+
+
+class SourceBuilds(object):
+    '''The latest publication of a source package and its builds.
+
+    Only plain data is kept, so that it can be used from any thread.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.version = None
+        self.component = None
+        self.builds = {}
+        self.error = None
+        self.can_retry = False
+        # {arch: {'retry': result, 'rescore': result}}
+        self.results = collections.defaultdict(dict)
+
+
+class BuildBatch(object):
+    '''Retry and rescore the builds of many source packages at once.
+
+    The sources are looked up and their upload permissions checked
+    concurrently, and the retries and rescores are sent concurrently, at
+    most jobs at a time and rate a second.
+    '''
+
+    def __init__(self, archive, series, pocket, archs, jobs=DEFAULT_JOBS,
+                 rate=None):
+        self.archive = archive
+        self.series = series
+        self.pocket = pocket
+        self.archs = sorted(archs)
+        self.pool = WorkerPool(jobs)
+        self.rate = rate
+        self.priority = None
+        self.sources = []
+        self._can_upload = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.archive_name = archive.displayname
+        self.series_name = series.name
+        if pocket != 'Release':
+            self.series_name += '-' + pocket.lower()
+
+    def close(self):
+        self.pool.close()
+
+    def _load(self, link):
+        '''Load link with the session of the calling thread, once.'''
+        loaded = self._local.__dict__.setdefault('loaded', {})
+        if link not in loaded:
+            loaded[link] = Launchpad.thread_session().load(link)
+        return loaded[link]
+
+    def resolve(self, names):
+        '''Look up the latest published version of each source in names.'''
+        seen = set()
+        self.sources = []
+        for name in names:
+            if name not in seen:
+                seen.add(name)
+                self.sources.append(SourceBuilds(name))
+        self.pool.map(self._resolve, self.sources)
+        return self.sources
+
+    def _resolve(self, source):
+        archive = self._load(self.archive.self_link)
+        series = self._load(self.series.self_link)
+        latest = None
+        try:
+            for spph in archive.getPublishedSources(source_name=source.name,
+                                                    exact_match=True,
+                                                    status='Published',
+                                                    distro_series=series,
+                                                    pocket=self.pocket):
+                if latest is None or (Version(latest.source_package_version)
+                                      < Version(spph.source_package_version)):
+                    latest = spph
+            if latest is None:
+                source.error = ("The source package '%s' does not exist in "
+                                "the %s in %s" % (source.name,
+                                                  self.archive_name,
+                                                  self.series_name))
+                return
+            source.version = latest.source_package_version
+            source.component = latest.component_name
+            for build in latest.getBuilds():
+                source.builds[build.arch_tag] = BuildInfo(
+                    build.arch_tag, build.buildstate, build.can_be_retried,
+                    build.can_be_rescored, build.self_link)
+        except HTTPError as error:
+            source.error = "Failed to look up '%s': %s" % (source.name,
+                                                           error)
+
+    def _check_upload(self, args):
+        '''Check whether the person at me_link can upload (and so retry)
+        source, with Launchpad's own check: it also applies the freezes of
+        the series and pocket, which component upload rights don't say
+        anything about.
+        '''
+        me_link, source = args
+        key = (source.name, source.component)
+        with self._lock:
+            if key in self._can_upload:
+                return self._can_upload[key]
+        try:
+            self._load(self.archive.self_link).checkUpload(
+                component=source.component,
+                distroseries=self._load(self.series.self_link),
+                person=self._load(me_link),
+                pocket=self.pocket,
+                sourcepackagename=source.name)
+            can_upload = True
+        except HTTPError as error:
+            if error.response.status != 403:
+                raise
+            can_upload = False
+        with self._lock:
+            self._can_upload[key] = can_upload
+        return can_upload
+
+    def check_permissions(self, me):
+        '''Decide which sources may be retried, checking them concurrently;
+        return the names of those that may not.
+        '''
+        sources = [source for source in self.sources if not source.error]
+        results = self.pool.map(self._check_upload,
+                                [(me.self_link, source) for source in sources])
+        denied = []
+        for source, can_retry in zip(sources, results):
+            source.can_retry = can_retry
+            if not can_retry:
+                denied.append(source.name)
+        return denied
+
+    def run(self, retry=False, priority=None):
+        '''Retry the builds of the sources that may be retried, and rescore
+        all of them to priority (unless it is None).
+        '''
+        operations = []
+        for source in self.sources:
+            for arch in self.archs:
+                build = source.builds.get(arch)
+                if build is None:
+                    continue
+                results = source.results[arch]
+                if retry:
+                    if not source.can_retry:
+                        results['retry'] = DENIED
+                    elif not build.can_be_retried:
+                        results['retry'] = SKIPPED
+                    else:
+                        operations.append((source, build, 'retry'))
+                if priority is not None:
+                    if not build.can_be_rescored:
+                        results['rescore'] = SKIPPED
+                    else:
+                        operations.append((source, build, 'rescore'))
+        self.priority = priority
+        self.pool.map(self._operate, operations, self.rate)
+
+    def _operate(self, operation):
+        source, build, action = operation
+        try:
+            lp_build = self._load(build.link)
+            if action == 'retry':
+                lp_build.retry()
+            else:
+                lp_build.rescore(score=self.priority)
+            result = DONE
+        except HTTPError:
+            result = FAILED
+        source.results[build.arch][action] = result
+
+    def summary(self):
+        '''Return a table of the builds and what was done to them.'''
+        rows = [('Package', 'Version', 'Arch', 'State', 'Retry', 'Rescore')]
+        for source in self.sources:
+            if source.error:
+                rows.append((source.name, '-', '-', 'not found', '-', '-'))
+                continue
+            archs = [arch for arch in self.archs if arch in source.builds]
+            if not archs:
+                rows.append((source.name, source.version, '-', 'no builds',
+                             '-', '-'))
+            for arch in archs:
+                results = source.results.get(arch, {})
+                rows.append((source.name, source.version, arch,
+                             source.builds[arch].state,
+                             results.get('retry', '-'),
+                             results.get('rescore', '-')))
+        return format_table(rows)
+
+
+class BuildWatcher(object):
+    '''Follow the builds of a BuildBatch until they are all finished.
+
+    Every build is refreshed once, then only the builds that aren't
+    finished are. Refreshes are conditional requests, so a build that
+    didn't change costs little. The time between two rounds grows (up to
+    max_interval) while nothing changes, and goes back to interval when
+    something does.
+    '''
+
+    def __init__(self, batch, interval=30, max_interval=600, backoff=1.5,
+                 output=sys.stdout, sleep=time.sleep):
+        self.batch = batch
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.output = output
+        self.sleep = sleep
+        self.pending = [(source, arch)
+                        for source in batch.sources if not source.error
+                        for arch in batch.archs if arch in source.builds]
+
+    def _refresh(self, key):
+        source, arch = key
+        build = self.batch._load(source.builds[arch].link)
+        try:
+            build.lp_refresh()
+        except HTTPError:
+            # Try again in the next round
+            pass
+        return build.buildstate
+
+    def poll(self):
+        '''Refresh the pending builds; return the (source, arch, old state,
+        new state) of those that changed.
+        '''
+        states = self.batch.pool.map(self._refresh, self.pending)
+        changes = []
+        pending = []
+        for (source, arch), state in zip(self.pending, states):
+            build = source.builds[arch]
+            if state != build.state:
+                changes.append((source, arch, build.state, state))
+                source.builds[arch] = build._replace(state=state)
+            if state not in FINISHED_STATES:
+                pending.append((source, arch))
+        self.pending = pending
+        return changes
+
+    def watch(self):
+        '''Poll until all builds are finished, printing state changes.'''
+        interval = self.interval
+        while True:
+            changes = self.poll()
+            for source, arch, old, new in changes:
+                print('%s %s %s %s: %s -> %s' % (time.strftime('%H:%M:%S'),
+                                                 source.name, source.version,
+                                                 arch, old, new),
+                      file=self.output)
+            if not self.pending:
+                break
+            if changes:
+                interval = self.interval
+            else:
+                interval = min(interval * self.backoff, self.max_interval)
+            self.output.flush()
+            self.sleep(interval)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+#   checksums.py - file checksums of source publications, from Launchpad
+#
+#   Copyright (C) 2019, Canonical Ltd.
+#
+#   This program is free software; you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License
+#   as published by the Free Software Foundation; version 3.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   See file /usr/share/common-licenses/GPL-3 for more details.
+
+from __future__ import print_function
+
+import os
+import threading
+import time
+
+try:
+    from urllib.parse import unquote, urlparse
+except ImportError:
+    from urllib import unquote
+    from urlparse import urlparse
+
+from ubuntutools.misc import CACHE_DIR, load_cached_json, save_cached_json
+
+__all__ = [
+    'SourceChecksums',
+    'files_match',
+]
+
+# The files of a publication never change; this only bounds the cache size.
+CHECKSUMS_TTL = 30 * 24 * 3600
+
+
+def files_match(ours, theirs):
+    '''Check whether the files in two {filename: (size, sha256)} dicts that
+    have the same name also have the same size and checksum, like
+    Dsc.compare_dsc does.
+    '''
+    for name, checksum in ours.items():
+        if name.endswith('.dsc'):
+            continue
+        if name in theirs and tuple(theirs[name]) != tuple(checksum):
+            return False
+    return True
+
+
+class SourceChecksums(object):
+    '''The sizes and SHA-256 checksums of the files of source publications.
+
+    They come from the publishing records on Launchpad
+    (sourceFileUrls(include_meta=True)), so no .dsc needs to be downloaded
+    and verified, and are kept on disk by publication. A SourceChecksums
+    can be used from several threads at once; call save() when done.
+    '''
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CHECKSUMS_TTL):
+        self.path = os.path.join(cache_dir, 'source-checksums.json')
+        self.ttl = ttl
+        self._index = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._index is None:
+            now = time.time()
+            self._index = dict(
+                (link, entry)
+                for link, entry in (load_cached_json(self.path) or {}).items()
+                if now - entry[0] < self.ttl)
+        return self._index
+
+    def get(self, spph):
+        '''Return {filename: (size, sha256)} for the files of spph (a source
+        package publishing history, from launchpadlib or lpapicache).
+        '''
+        link = spph.self_link
+        with self._lock:
+            entry = self._load().get(link)
+        if entry is None:
+            files = {}
+            for meta in spph.sourceFileUrls(include_meta=True):
+                name = unquote(os.path.basename(urlparse(meta['url']).path))
+                files[name] = (meta['size'], meta['sha256'])
+            entry = [time.time(), files]
+            with self._lock:
+                self._load()[link] = entry
+                self._dirty = True
+        return dict((name, tuple(checksum))
+                    for name, checksum in entry[1].items())
+
+    def save(self):
+        with self._lock:
+            if self._dirty:
+                save_cached_json(self.path, self._index)
+                self._dirty = False
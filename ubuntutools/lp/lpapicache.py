@@ -29,6 +29,7 @@ from __future__ import print_function
 
 import collections
 import sys
+import threading
 
 from debian.changelog import Changelog, Version
 from httplib2 import Http, HttpLib2Error
@@ -84,6 +85,11 @@ _POCKETS = ('Release', 'Security', 'Updates', 'Proposed', 'Backports')
 class _Launchpad(object):
     '''Singleton for LP API access.'''
 
+    # How the session was created, to log in other threads the same way
+    _login_args = None
+    _owner = None
+    _local = threading.local()
+
     def login(self, service=service, api_version=api_version):
         '''Enforce a non-anonymous login.'''
         if not self.logged_in:
@@ -93,6 +99,7 @@ class _Launchpad(object):
             except IOError as error:
                 print('E: %s' % error, file=sys.stderr)
                 raise
+            self._logged_in('login_with', service, api_version)
         else:
             raise AlreadyLoggedInError('Already logged in to Launchpad.')
 
@@ -101,6 +108,7 @@ class _Launchpad(object):
         if not self.logged_in:
             self.__lp = LP.login_anonymously('ubuntu-dev-tools', service,
                                              version=api_version)
+            self._logged_in('login_anonymously', service, api_version)
         else:
             raise AlreadyLoggedInError('Already logged in to Launchpad.')
 
@@ -108,14 +116,40 @@ class _Launchpad(object):
         '''Use an already logged in Launchpad object'''
         if not self.logged_in:
             self.__lp = lp
+            self._logged_in('login_with', service, api_version)
         else:
             raise AlreadyLoggedInError('Already logged in to Launchpad.')
 
+    def _logged_in(self, method, service, api_version):
+        self._login_args = (method, service, api_version)
+        self._owner = threading.current_thread()
+
     @property
     def logged_in(self):
         '''Are we logged in?'''
         return '_Launchpad__lp' in self.__dict__
 
+    def thread_session(self):
+        '''Return the launchpadlib session to use in the calling thread.
+
+        A launchpadlib session can't be used by several threads at once: the
+        thread that logged in gets the main session, and any other thread
+        gets its own, logged in the same way (with the stored credentials)
+        on first use. Objects loaded through a session must only be used in
+        the thread that loaded them.
+        '''
+        if not self.logged_in:
+            self.login()
+        if threading.current_thread() is self._owner:
+            return self.__lp
+        lp = getattr(self._local, 'lp', None)
+        if lp is None:
+            method, service_root, version = self._login_args
+            lp = getattr(LP, method)('ubuntu-dev-tools', service_root,
+                                     version=version)
+            self._local.lp = lp
+        return lp
+
     def __getattr__(self, attr):
         if not self.logged_in:
             self.login()
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+#
+#   syncs.py - check and sync many source packages from Debian at once
+#
+#   Copyright (C) 2019, Canonical Ltd.
+#
+#   This program is free software; you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License
+#   as published by the Free Software Foundation; version 3.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   See file /usr/share/common-licenses/GPL-3 for more details.
+
+from __future__ import print_function
+
+import threading
+
+from launchpadlib.errors import HTTPError
+
+from ubuntutools.blacklist import SyncBlacklist
+from ubuntutools.lp.checksums import SourceChecksums, files_match
+from ubuntutools.lp.lpapicache import Launchpad
+from ubuntutools.misc import format_table
+from ubuntutools.parallel import DEFAULT_JOBS, WorkerPool
+from ubuntutools.version import Version
+
+__all__ = [
+    'SyncBatch',
+    'SyncCandidate',
+]
+
+# Where to look for the current Ubuntu version, if a pocket has none
+_PARENT_POCKETS = {
+    'Updates': ['Updates', 'Proposed', 'Release'],
+}
+
+
+class SyncCandidate(object):
+    '''A source package to sync, and what the checks found about it.
+
+    Only plain data is kept, so that it can be used from any thread.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.version = None
+        self.component = None
+        self.ubuntu_version = None
+        self.ubuntu_component = None
+        self.blacklisted = False
+        self.comments = []
+        self.error = None
+        self.result = None
+
+    @property
+    def ready(self):
+        return self.error is None
+
+
+class SyncBatch(object):
+    '''Check and sync many source packages from Debian at once.
+
+    The checks (versions, blacklists and whether a fakesync would be
+    needed) run concurrently, sharing one SyncBlacklist and one
+    SourceChecksums. The copies are then requested at most jobs at a time
+    and rate a second.
+    '''
+
+    def __init__(self, debian_archive, debian_series, ubuntu_archive,
+                 ubuntu_series, pocket, current_series, blacklist=None,
+                 force=False, jobs=DEFAULT_JOBS, rate=None, checksums=None):
+        self.links = {
+            'debian_archive': debian_archive.self_link,
+            'debian_series': debian_series.self_link,
+            'ubuntu_archive': ubuntu_archive.self_link,
+            'ubuntu_series': ubuntu_series.self_link,
+            'current_series': current_series.self_link,
+        }
+        self.series_name = ubuntu_series.name
+        self.pocket = pocket
+        self.blacklist = blacklist or SyncBlacklist()
+        self.checksums = checksums or SourceChecksums()
+        self.force = force
+        self.pool = WorkerPool(jobs)
+        self.rate = rate
+        self.sponsored = None
+        self.candidates = []
+        self._local = threading.local()
+
+    def close(self):
+        self.pool.close()
+
+    def _load(self, link):
+        '''Load link with the session of the calling thread, once.'''
+        loaded = self._local.__dict__.setdefault('loaded', {})
+        if link not in loaded:
+            loaded[link] = Launchpad.thread_session().load(link)
+        return loaded[link]
+
+    def _get(self, name):
+        return self._load(self.links[name])
+
+    @staticmethod
+    def _latest(records):
+        latest = None
+        for record in records:
+            if latest is None or (Version(latest.source_package_version)
+                                  < Version(record.source_package_version)):
+                latest = record
+        return latest
+
+    def check(self, names):
+        '''Run the checks on each of the source packages in names.'''
+        seen = set()
+        self.candidates = []
+        for name in names:
+            if name not in seen:
+                seen.add(name)
+                self.candidates.append(SyncCandidate(name))
+        try:
+            self.pool.map(self._check, self.candidates)
+        finally:
+            self.blacklist.save()
+            self.checksums.save()
+        return self.candidates
+
+    def _check(self, candidate):
+        try:
+            debian, ubuntu = self._check_versions(candidate)
+            if candidate.error:
+                return
+            self._check_blacklist(candidate)
+            if candidate.error or ubuntu is None:
+                return
+            self._check_fakesync(candidate, debian, ubuntu)
+        except HTTPError as error:
+            candidate.error = 'HTTP Error %s: %s' % (error.response.status,
+                                                     error.response.reason)
+
+    def _check_versions(self, candidate):
+        '''Return the Debian and Ubuntu publications to compare (either may
+        be None).
+        '''
+        debian = self._latest(self._get('debian_archive').getPublishedSources(
+            source_name=candidate.name, exact_match=True, status='Published',
+            distro_series=self._get('debian_series')))
+        if debian is None:
+            candidate.error = "Not found in Debian"
+            return None, None
+        candidate.version = debian.source_package_version
+        candidate.component = debian.component_name
+
+        records = self._get('ubuntu_archive').getPublishedSources(
+            source_name=candidate.name, exact_match=True, status='Published',
+            distro_series=self._get('ubuntu_series'))
+        records = list(records)
+        for pocket in _PARENT_POCKETS.get(self.pocket,
+                                          [self.pocket, 'Release']):
+            ubuntu = self._latest(record for record in records
+                                  if record.pocket == pocket)
+            if ubuntu is not None:
+                break
+        else:
+            return debian, None
+        candidate.ubuntu_version = ubuntu.source_package_version
+        candidate.ubuntu_component = ubuntu.component_name
+
+        ubuntu_version = Version(candidate.ubuntu_version)
+        if ubuntu_version >= Version(candidate.version):
+            candidate.error = ("Version in Debian (%s) isn't newer than "
+                               "Ubuntu" % candidate.version)
+        elif not self.force and ubuntu_version.is_modified_in_ubuntu():
+            candidate.error = "--force is required to discard Ubuntu changes"
+        return debian, ubuntu
+
+    def _check_blacklist(self, candidate):
+        candidate.blacklisted, candidate.comments = self.blacklist.check(
+            candidate.name, self._get('current_series'))
+        if candidate.blacklisted == 'ALWAYS':
+            candidate.error = "Blacklisted"
+
+    def _check_fakesync(self, candidate, debian, ubuntu):
+        if not files_match(self.checksums.get(debian),
+                           self.checksums.get(ubuntu)):
+            candidate.error = "Checksums mismatch, a fakesync is required"
+
+    def ready(self):
+        return [candidate for candidate in self.candidates
+                if candidate.ready]
+
+    def copy(self, sponsoree=None):
+        '''Request the copies of the candidates that passed the checks.'''
+        self.sponsored = sponsoree.self_link if sponsoree else None
+        self.pool.map(self._copy, self.ready(), self.rate)
+
+    def _copy(self, candidate):
+        sponsored = self._load(self.sponsored) if self.sponsored else None
+        try:
+            self._get('ubuntu_archive').copyPackage(
+                source_name=candidate.name,
+                version=candidate.version,
+                from_archive=self._get('debian_archive'),
+                to_series=self.series_name,
+                to_pocket=self.pocket,
+                include_binaries=False,
+                sponsored=sponsored)
+            candidate.result = 'requested'
+        except HTTPError as error:
+            candidate.result = 'failed'
+            candidate.error = 'HTTP Error %s: %s' % (error.response.status,
+                                                     error.response.reason)
+
+    def summary(self):
+        '''Return a table of the candidates and where they stand.'''
+        rows = [('Package', 'Debian', 'Ubuntu', 'Status')]
+        for candidate in self.candidates:
+            if candidate.result:
+                status = candidate.result
+                if candidate.error:
+                    status += ': ' + candidate.error
+            else:
+                status = candidate.error or 'ready'
+            rows.append((candidate.name, candidate.version or '-',
+                         candidate.ubuntu_version or '-', status))
+        return format_table(rows)
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+#
+#   madison.py - answer rmadison queries from local copies of the Sources
+#
+#   Copyright (C) 2019, Canonical Ltd.
+#
+#   This program is free software; you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License
+#   as published by the Free Software Foundation; version 3.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   See file /usr/share/common-licenses/GPL-3 for more details.
+
+"""The Sources indexes of a suite are downloaded from the archive mirror,
+and only the name, version and component of each source package are kept,
+in a small sorted text file per suite. The indexes are downloaded again
+(with conditional requests) once they are older than SOURCES_TTL seconds;
+if the mirror can't be reached, the copies on disk are used.
+"""
+
+from __future__ import print_function
+
+import os
+import socket
+import time
+import zlib
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+from distro_info import (DebianDistroInfo, UbuntuDistroInfo,
+                         DistroDataOutdated)
+import httplib2
+
+from ubuntutools.logger import Logger
+from ubuntutools.misc import CACHE_DIR, load_cached_json, save_cached_json
+
+__all__ = [
+    'SourcesIndex',
+]
+
+SOURCES_TTL = 6 * 3600
+
+# The compression of the indexes to download
+COMPRESSION = '.xz' if lzma else '.gz'
+
+COMPONENTS = {
+    'debian': ('main', 'contrib', 'non-free'),
+    'ubuntu': ('main', 'restricted', 'universe', 'multiverse'),
+}
+
+# The suites of a series that are looked at when no suite is given
+_POCKETS = {
+    'debian': ('',),
+    'ubuntu': ('', '-security', '-updates', '-proposed', '-backports'),
+}
+
+
+def _decompress(body, compression):
+    if compression == '.xz':
+        return lzma.decompress(body)
+    return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+
+
+def fetch_index(url, cached):
+    '''Download and decompress the archive index at url (ending in .xz or
+    .gz), unless it didn't change since cached (the metadata of the last
+    download, updated in place): then return None. A missing index is
+    empty, since not every suite has every component.
+    '''
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last-modified'):
+        headers['If-Modified-Since'] = cached['last-modified']
+    response, body = httplib2.Http().request(url, headers=headers)
+    if response.status == 304:
+        return None
+    if response.status == 404:
+        cached.clear()
+        return u''
+    if response.status != 200:
+        raise IOError('%s: %s %s' % (url, response.status, response.reason))
+    cached['etag'] = response.get('etag')
+    cached['last-modified'] = response.get('last-modified')
+    body = _decompress(body, os.path.splitext(url)[1])
+    return body.decode('utf-8', 'replace')
+
+
+def parse_sources(text):
+    '''Yield (name, version) for each stanza of the Sources text.'''
+    name = version = None
+    for line in text.splitlines():
+        if line.startswith('Package:'):
+            name = line[8:].strip()
+        elif line.startswith('Version:'):
+            version = line[8:].strip()
+        elif not line.strip():
+            if name and version:
+                yield name, version
+            name = version = None
+    if name and version:
+        yield name, version
+
+
+class SourcesIndex(object):
+    '''The source packages of the suites of a distribution (debian or
+    ubuntu), from the Sources indexes of mirror.
+
+    query() answers the same questions as ubuntutools.archive.rmadison for
+    source packages, without running rmadison.
+    '''
+
+    def __init__(self, distro, mirror, cache_dir=CACHE_DIR, ttl=SOURCES_TTL):
+        self.distro = distro
+        self.mirror = mirror.rstrip('/')
+        self.cache_dir = os.path.join(cache_dir, 'sources', distro)
+        self.ttl = ttl
+        self.compression = COMPRESSION
+        self._suites = {}
+
+    def suites(self):
+        '''Return the suites looked at when no suite is given: those of
+        the supported series.
+        '''
+        if self.distro == 'debian':
+            series = DebianDistroInfo().supported()
+        else:
+            info = UbuntuDistroInfo()
+            series = info.supported()
+            try:
+                if info.devel() not in series:
+                    series.append(info.devel())
+            except DistroDataOutdated as e:
+                Logger.warn(e)
+        return [name + pocket for name in series
+                for pocket in _POCKETS[self.distro]]
+
+    def _path(self, suite):
+        return os.path.join(self.cache_dir, suite)
+
+    def _fetch(self, suite, component, cached):
+        '''Return the (name, version) records of a component of suite, or
+        None if they didn't change since cached (the metadata of the last
+        download, updated in place).
+        '''
+        url = '%s/dists/%s/%s/source/Sources%s' % (
+            self.mirror, suite, component, self.compression)
+        text = fetch_index(url, cached)
+        if text is None:
+            return None
+        return list(parse_sources(text))
+
+    def _read(self, suite):
+        '''Return {name: [(version, component), ...]} from the index of
+        suite on disk.
+        '''
+        packages = {}
+        try:
+            with open(self._path(suite)) as f:
+                for line in f:
+                    name, version, component = line.split()
+                    packages.setdefault(name, []).append((version, component))
+        except (IOError, OSError):
+            pass
+        return packages
+
+    def _write(self, suite, packages):
+        '''Write the index of suite to disk, and return whether it was.'''
+        path = self._path(suite)
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(path + '.new', 'w') as f:
+                for name in sorted(packages):
+                    for version, component in packages[name]:
+                        f.write('%s %s %s\n' % (name, version, component))
+            os.rename(path + '.new', path)
+        except (IOError, OSError) as e:
+            Logger.debug('Could not save %s: %s', path, e)
+            return False
+        return True
+
+    def _update(self, suite):
+        '''Return the index of suite, downloading the Sources again if the
+        copy on disk is too old.
+        '''
+        meta_path = self._path(suite) + '.json'
+        meta = load_cached_json(meta_path)
+        if not os.path.exists(self._path(suite)):
+            # Without the index, the conditional requests would only get
+            # back that nothing changed
+            meta = None
+        if meta and time.time() - meta['time'] < self.ttl:
+            return self._read(suite)
+
+        meta = meta or {'components': {}}
+        fetched = {}
+        try:
+            for component in COMPONENTS[self.distro]:
+                cached = meta['components'].setdefault(component, {})
+                records = self._fetch(suite, component, cached)
+                if records is not None:
+                    fetched[component] = records
+        except (httplib2.HttpLib2Error, socket.error, IOError) as e:
+            Logger.warn('Using the cached Sources of %s %s: %s',
+                        self.distro, suite, e)
+            return self._read(suite)
+
+        packages = self._read(suite)
+        if fetched:
+            # Keep the components that didn't change
+            packages = dict(
+                (name, [(version, component)
+                        for version, component in versions
+                        if component not in fetched])
+                for name, versions in packages.items())
+            for component, records in fetched.items():
+                for name, version in records:
+                    packages.setdefault(name, []).append((version, component))
+            packages = dict((name, versions)
+                            for name, versions in packages.items()
+                            if versions)
+            if not self._write(suite, packages):
+                # Keep the metadata of the index on disk
+                return packages
+        meta['time'] = time.time()
+        save_cached_json(meta_path, meta)
+        return packages
+
+    def packages(self, suite):
+        '''Return {name: [(version, component), ...]} for suite.'''
+        if suite not in self._suites:
+            self._suites[suite] = self._update(suite)
+        return self._suites[suite]
+
+    def query(self, package, suite=None):
+        '''Yield the publications of the source package in suite (or in
+        the suites of the supported series), as rmadison does.
+        '''
+        for name in [suite] if suite else self.suites():
+            for version, component in self.packages(name).get(package, []):
+                yield {
+                    'source': package,
+                    'version': version,
+                    'suite': name,
+                    'component': component,
+                }
@@ -25,6 +25,7 @@
 from __future__ import print_function
 
 # Modules.
+import json
 import locale
 import os
 import sys
@@ -35,6 +36,11 @@ from ubuntutools.lp.udtexceptions import PocketDoesNotExistError
 from ubuntutools.subprocess import Popen, PIPE
 
 _system_distribution_chain = []
+_codename_distributions = {}
+
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME',
+                                        os.path.expanduser('~/.cache')),
+                         'ubuntu-dev-tools')
 
 
 def system_distribution_chain():
@@ -151,6 +157,45 @@ def split_release_pocket(release, default='Release'):
     return (release, pocket)
 
 
+def format_table(rows):
+    '''Return rows (sequences of strings, the first one being the header)
+    as text, in aligned columns.
+    '''
+    widths = [max(len(row[column]) for row in rows)
+              for column in range(len(rows[0]))]
+    return '\n'.join('  '.join(value.ljust(width)
+                               for value, width in zip(row, widths)).rstrip()
+                     for row in rows)
+
+
+def load_cached_json(path):
+    '''Return the data of the JSON cache file path, or None if it can't be
+    read.
+    '''
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def save_cached_json(path, data):
+    '''Replace the JSON cache file path with data. Caches are optional, so
+    this only logs failures (in verbose mode).
+    '''
+    try:
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(path + '.new', 'w') as f:
+            json.dump(data, f)
+        os.rename(path + '.new', path)
+    except (IOError, OSError) as e:
+        # Avoid a circular import
+        from ubuntutools.logger import Logger
+        Logger.debug('Could not save %s: %s', path, e)
+
+
 def require_utf8():
     '''Can be called by programs that only function in UTF-8 locales'''
     if locale.getpreferredencoding() != 'UTF-8':
@@ -177,8 +222,16 @@ def codename_to_distribution(codename):
 
     Finds a given release codename in your distribution's genaology
     (i.e. looking at the current distribution and its parents), or
-    print an error message and return None if it can't be found
+    print an error message and return None if it can't be found.
+    The answers are remembered, so that the distro-info data is only
+    parsed once per codename.
     """
+    if codename not in _codename_distributions:
+        _codename_distributions[codename] = _codename_to_distribution(codename)
+    return _codename_distributions[codename]
+
+
+def _codename_to_distribution(codename):
     for distro in system_distribution_chain() + ["Ubuntu", "Debian"]:
         info = vendor_to_distroinfo(distro)
         if not info:
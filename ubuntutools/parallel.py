@@ -0,0 +1,100 @@
+# parallel.py - run independent network operations concurrently
+#
+# Copyright (C) 2019, Canonical Ltd.
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+DEFAULT_JOBS = 8
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class RateLimiter(object):
+    """Spread calls out to at most rate calls per second, across threads.
+
+    A rate of None (or 0) doesn't limit anything.
+    """
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.rate:
+            return
+        with self._lock:
+            now = _clock()
+            when = max(now, self._next)
+            self._next = when + 1.0 / self.rate
+        if when > now:
+            time.sleep(when - now)
+
+
+class WorkerPool(object):
+    """A set of threads to run calls on, kept for as long as the pool is
+    open, so that per-thread state (like Launchpad sessions) is reused from
+    one map() to the next.
+    """
+
+    def __init__(self, jobs=DEFAULT_JOBS):
+        self.jobs = max(1, jobs)
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def map(self, func, items, rate=None):
+        """Call func(item) for each of items, at most rate times a second.
+        Return the results, in the order of items.
+
+        An exception raised by func is raised again here; functions that
+        should not stop the other calls have to catch their errors
+        themselves.
+        """
+        items = list(items)
+        limiter = RateLimiter(rate)
+
+        def call(item):
+            limiter.wait()
+            return func(item)
+
+        if self.jobs == 1 or len(items) <= 1:
+            return [call(item) for item in items]
+
+        if self._pool is None:
+            self._pool = ThreadPool(self.jobs)
+        return self._pool.map(call, items, chunksize=1)
+
+
+def run_parallel(func, items, jobs=DEFAULT_JOBS, rate=None):
+    """Call func(item) for each of items, on up to jobs threads and at most
+    rate times a second. Return the results, in the order of items.
+    """
+    items = list(items)
+    with WorkerPool(min(jobs, len(items) or 1)) as pool:
+        return pool.map(func, items, rate)
@@ -12,18 +12,24 @@
 # ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
 # OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 
+import copy
 import json
 import os
+import threading
 
 import httplib2
 
+from ubuntutools.config import UDTConfig
+from ubuntutools.parallel import DEFAULT_JOBS, WorkerPool
+
+DEFAULT_SERVER = 'http://qa.ubuntuwire.org/rdepends'
+
 
 class RDependsException(Exception):
     pass
 
 
-def query_rdepends(package, release, arch,
-                   server='http://qa.ubuntuwire.org/rdepends'):
+def query_rdepends(package, release, arch, server=DEFAULT_SERVER):
     """Look up a packages reverse-dependencies on the Ubuntuwire
     Reverse- webservice
     """
@@ -34,3 +40,239 @@ def query_rdepends(package, release, arch,
     if response.status != 200:
         raise RDependsException(data.strip())
     return json.loads(data)
+
+
+class RDependsClient(object):
+    """Look up many reverse-dependencies on the Ubuntuwire Reverse-
+    webservice at once.
+
+    Each worker thread keeps one HTTP connection open for all its queries,
+    and the answer to each (package, release, arch) query is kept for the
+    lifetime of the client. Call close() when done.
+
+    If index (an ubuntutools.rdepends_index.RDependsIndex) is given, the
+    queries are answered from it rather than by the webservice.
+    """
+
+    def __init__(self, server=DEFAULT_SERVER, jobs=DEFAULT_JOBS, index=None):
+        self.server = server
+        self.index = index
+        self.pool = WorkerPool(jobs)
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.pool.close()
+        if self.index is not None:
+            self.index.close()
+
+    def _http(self):
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = httplib2.Http()
+        return http
+
+    def query(self, package, release, arch):
+        """Like query_rdepends, from the cache if it was asked before.
+        Failed queries are cached too, and raise the same exception again.
+        """
+        key = (package, release, arch)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is None:
+            if self.index is not None:
+                try:
+                    cached = self.index.query(package, release, arch)
+                except RDependsException as e:
+                    cached = e
+            else:
+                url = os.path.join(self.server, 'v1', release, arch, package)
+                response, data = self._http().request(url)
+                if response.status != 200:
+                    cached = RDependsException(data.strip())
+                else:
+                    cached = json.loads(data)
+            with self._lock:
+                self._cache[key] = cached
+        if isinstance(cached, RDependsException):
+            raise cached
+        # The callers are free to modify the result
+        return copy.deepcopy(cached)
+
+    def _query(self, key):
+        try:
+            return self.query(*key), None
+        except RDependsException as e:
+            return None, e
+
+    def query_many(self, queries):
+        """Look up all the (package, release, arch) queries, concurrently.
+
+        Return two dicts keyed by query: the results of the successful
+        queries and the RDependsException of the failed ones.
+        """
+        queries = list(queries)
+        results = {}
+        errors = {}
+        for key, (data, error) in zip(queries,
+                                      self.pool.map(self._query, queries)):
+            if error is None:
+                results[key] = data
+            else:
+                errors[key] = error
+        return results, errors
+
+
+def rdepends_client(server=None, jobs=DEFAULT_JOBS):
+    """Return an RDependsClient on server, or if none is given and
+    UBUNTUTOOLS_RDEPENDS_INDEX=yes, on a local RDependsIndex.
+    """
+    if server is None and UDTConfig().get_value('RDEPENDS_INDEX',
+                                                boolean=True):
+        # Avoid a circular import
+        from ubuntutools.rdepends_index import RDependsIndex
+        return RDependsClient(jobs=jobs, index=RDependsIndex())
+    return RDependsClient(server or DEFAULT_SERVER, jobs)
+
+
+def merge_rdepends(results, fields, components=None):
+    """Merge the results of many queries (as returned by
+    RDependsClient.query_many) into one {field: [rdep, ...]} report, with
+    the rdeps sorted by package.
+
+    fields is {arch: [field, ...]}, the fields kept from each architecture.
+    The Architectures of an rdep found in several queries are merged, and
+    its Dependencies are the packages it was found for.
+    """
+    merged = {}
+    for (package, _, arch), data in results.items():
+        for field in fields[arch]:
+            for rdep in data.get(field, []):
+                if components and rdep['Component'] not in components:
+                    continue
+                entry = merged.setdefault(field, {}).setdefault(
+                    rdep['Package'], {'Package': rdep['Package'],
+                                      'Component': rdep['Component'],
+                                      'Architectures': set(),
+                                      'Dependencies': set()})
+                entry['Architectures'].update(rdep.get('Architectures')
+                                              or [arch])
+                entry['Dependencies'].add(rdep.get('Dependency', package))
+    report = {}
+    for field, entries in merged.items():
+        report[field] = []
+        for name in sorted(entries):
+            entry = entries[name]
+            entry['Architectures'] = sorted(entry['Architectures'])
+            entry['Dependencies'] = sorted(entry['Dependencies'])
+            report[field].append(entry)
+    return report
+
+
+class RDependsGraph(object):
+    """The reverse-dependencies of packages, followed recursively.
+
+    The graph is walked breadth first: the queries of each level are
+    looked up at once (with RDependsClient.query_many), and each package is
+    visited once, at the depth it was first found at. fields is
+    {arch: [field, ...]}, the relationships followed in each architecture.
+    Reverse-build-dependencies are source packages, so they are followed
+    through their binaries, as src:package.
+    """
+
+    def __init__(self, client, release, fields, components=None):
+        self.client = client
+        self.release = release
+        self.fields = fields
+        self.components = components
+        # {package: depth}
+        self.depths = {}
+        # {rdep: {package: {field: set(architectures)}}}
+        self.edges = {}
+        # {(package, release, arch): RDependsException}
+        self.errors = {}
+
+    def _rdeps(self, data, arch):
+        """Yield (name, field, architectures) for the reverse-dependencies
+        in the data of an arch query.
+        """
+        for field in self.fields[arch]:
+            for rdep in data.get(field, []):
+                if (self.components
+                        and rdep['Component'] not in self.components):
+                    continue
+                name = rdep['Package']
+                if field.startswith('Reverse-Build-'):
+                    name = 'src:' + name
+                yield name, field, rdep.get('Architectures') or [arch]
+
+    def traverse(self, packages, depth=None):
+        """Walk the reverse-dependencies of packages, depth levels deep (or
+        until no new package is found). Return the levels: the sorted lists
+        of the packages first found at each depth, packages at 0.
+        """
+        frontier = sorted(set(packages) - set(self.depths))
+        levels = []
+        while frontier:
+            for package in frontier:
+                self.depths[package] = len(levels)
+            levels.append(frontier)
+            if depth is not None and len(levels) > depth:
+                break
+            queries = [(package, self.release, arch)
+                       for package in frontier for arch in sorted(self.fields)]
+            results, errors = self.client.query_many(queries)
+            self.errors.update(errors)
+            found = set()
+            for (package, _, arch), data in results.items():
+                for name, field, archs in self._rdeps(data, arch):
+                    edge = self.edges.setdefault(name, {}).setdefault(
+                        package, {})
+                    edge.setdefault(field, set()).update(archs)
+                    if name not in self.depths:
+                        found.add(name)
+            frontier = sorted(found)
+        return levels
+
+    def _edges(self):
+        """Yield (rdep, package, fields) for each edge, sorted."""
+        for rdep in sorted(self.edges):
+            for package, fields in sorted(self.edges[rdep].items()):
+                yield rdep, package, fields
+
+    def to_json(self):
+        """Return the graph as a dict, to be serialized to JSON."""
+        return {
+            'release': self.release,
+            'architectures': sorted(self.fields),
+            'packages': [{'Package': package, 'Depth': depth}
+                         for package, depth in sorted(self.depths.items())],
+            'edges': [{'Package': rdep, 'Dependency': package,
+                       'Field': field, 'Architectures': sorted(archs)}
+                      for rdep, package, fields in self._edges()
+                      for field, archs in sorted(fields.items())],
+        }
+
+    def to_dot(self):
+        """Return the graph in the Graphviz DOT language, with an edge from
+        each reverse-dependency to the package it depends on, and the
+        packages the walk started from in boxes.
+        """
+        lines = ['digraph "reverse-depends" {']
+        for package, depth in sorted(self.depths.items()):
+            lines.append('  "%s"%s;'
+                         % (package, ' [shape=box]' if depth == 0 else ''))
+        for rdep, package, fields in self._edges():
+            label = ', '.join(field.replace('Reverse-', '', 1)
+                              for field in sorted(fields))
+            lines.append('  "%s" -> "%s" [label="%s"];'
+                         % (rdep, package, label))
+        lines.append('}')
+        return '\n'.join(lines) + '\n'
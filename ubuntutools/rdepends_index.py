@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+#
+#   rdepends_index.py - answer reverse-dependency queries from the archive
+#                       indexes, without the rdepends webservice
+#
+#   Copyright (C) 2019, Canonical Ltd.
+#
+#   This program is free software; you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License
+#   as published by the Free Software Foundation; version 3.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   See file /usr/share/common-licenses/GPL-3 for more details.
+
+"""The Packages (or, for the source "architecture", Sources) indexes of a
+release are downloaded from the archive mirror, and their relationships
+inverted: for each component, one line per package relationship, keyed by
+the package depended on. The lines of all the components are merged into a
+single sorted file per release and architecture, which is memory-mapped and
+binary-searched, so a query reads a few pages of it.
+
+The indexes are downloaded again (with conditional requests) once they are
+older than RDEPENDS_TTL seconds. Only the components that changed are
+inverted again before the merge. If the mirror can't be reached, the copies
+on disk are used.
+"""
+
+from __future__ import print_function
+
+import mmap
+import os
+import re
+import socket
+import threading
+import time
+
+import httplib2
+
+from ubuntutools.config import UDTConfig
+from ubuntutools.logger import Logger
+from ubuntutools.madison import COMPONENTS, COMPRESSION, fetch_index
+from ubuntutools.misc import (CACHE_DIR, codename_to_distribution,
+                              load_cached_json, save_cached_json)
+from ubuntutools.rdepends import RDependsException
+
+__all__ = [
+    'RDependsIndex',
+]
+
+RDEPENDS_TTL = 6 * 3600
+
+# The architectures of an "any" query
+ARCHITECTURES = {
+    'debian': ('amd64', 'arm64', 'armel', 'armhf', 'i386', 'mips64el',
+               'mipsel', 'ppc64el', 's390x'),
+    'ubuntu': ('amd64', 'arm64', 'armhf', 'i386', 'ppc64el', 's390x'),
+}
+
+# The Ubuntu architectures that are not on the ports mirror
+_PRIMARY_ARCHITECTURES = ('amd64', 'i386', 'source')
+
+_BINARY_FIELDS = (
+    ('Pre-Depends', 'Reverse-Depends'),
+    ('Depends', 'Reverse-Depends'),
+    ('Recommends', 'Reverse-Recommends'),
+    ('Suggests', 'Reverse-Suggests'),
+    ('Enhances', 'Reverse-Enhances'),
+)
+
+_SOURCE_FIELDS = (
+    ('Build-Depends', 'Reverse-Build-Depends'),
+    ('Build-Depends-Arch', 'Reverse-Build-Depends'),
+    ('Build-Depends-Indep', 'Reverse-Build-Depends-Indep'),
+)
+
+_NAME_RE = re.compile(r'\s*([a-zA-Z0-9][a-zA-Z0-9+.\-]*)')
+
+
+def _paragraphs(text, fields):
+    '''Yield {field: value} of the fields of each stanza of text.'''
+    paragraph = {}
+    field = None
+    for line in text.splitlines():
+        if not line.strip():
+            if paragraph:
+                yield paragraph
+            paragraph = {}
+            field = None
+        elif line[0] in ' \t':
+            if field is not None:
+                paragraph[field] += ' ' + line.strip()
+        else:
+            name, _, value = line.partition(':')
+            field = name if name in fields else None
+            if field is not None:
+                paragraph[field] = value.strip()
+    if paragraph:
+        yield paragraph
+
+
+def _names(relationship):
+    '''Yield the package names in the relationship field, alternatives
+    included.
+    '''
+    for alternative in re.split(r'[,|]', relationship):
+        m = _NAME_RE.match(alternative)
+        if m:
+            yield m.group(1)
+
+
+def invert_packages(text, component):
+    '''Yield the index lines (key, field, package, component) for the
+    Packages text.
+    '''
+    fields = set(['Package', 'Provides'] + [f for f, _ in _BINARY_FIELDS])
+    for paragraph in _paragraphs(text, fields):
+        package = paragraph.get('Package')
+        if not package:
+            continue
+        yield package, 'Package', package, component
+        for name in _names(paragraph.get('Provides', '')):
+            yield package, 'Provides', name, component
+        for field, reverse in _BINARY_FIELDS:
+            for name in _names(paragraph.get(field, '')):
+                yield name, reverse, package, component
+
+
+def invert_sources(text, component):
+    '''Yield the index lines (key, field, package, component) for the
+    Sources text.
+    '''
+    fields = set(['Package', 'Binary'] + [f for f, _ in _SOURCE_FIELDS])
+    for paragraph in _paragraphs(text, fields):
+        source = paragraph.get('Package')
+        if not source:
+            continue
+        for name in _names(paragraph.get('Binary', '')):
+            yield name, 'Source', source, component
+            yield 'src:' + source, 'Binary', name, component
+        for field, reverse in _SOURCE_FIELDS:
+            for name in _names(paragraph.get(field, '')):
+                yield name, reverse, source, component
+
+
+class _SortedIndex(object):
+    '''A sorted file of tab-separated lines, looked up by their first
+    column.
+    '''
+
+    def __init__(self, path):
+        self._file = None
+        self._data = b''
+        if os.path.getsize(path):
+            self._file = open(path, 'rb')
+            self._data = mmap.mmap(self._file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._file is not None:
+            self._data.close()
+            self._file.close()
+            self._file = None
+
+    def lookup(self, key):
+        '''Return the other columns of the lines for key.'''
+        data = self._data
+        key = key.encode('utf-8')
+        low, high = 0, len(data)
+        # Find the start of the first line with a first column >= key
+        while low < high:
+            middle = (low + high) // 2
+            start = data.rfind(b'\n', 0, middle) + 1
+            end = data.find(b'\n', start)
+            if data[start:data.find(b'\t', start)] < key:
+                low = end + 1
+            else:
+                high = start
+        rows = []
+        prefix = key + b'\t'
+        while data[low:low + len(prefix)] == prefix:
+            end = data.find(b'\n', low)
+            rows.append(data[low + len(prefix):end].decode('utf-8')
+                        .split('\t'))
+            low = end + 1
+        return rows
+
+
+class RDependsIndex(object):
+    '''Reverse-dependencies from the Packages and Sources indexes of the
+    Debian and Ubuntu mirrors.
+
+    query() returns the same data as ubuntutools.rdepends.query_rdepends.
+    An RDependsIndex can be used from several threads at once.
+    '''
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=RDEPENDS_TTL, mirrors=None):
+        self.cache_dir = os.path.join(cache_dir, 'rdepends')
+        self.ttl = ttl
+        if mirrors is None:
+            config = UDTConfig()
+            mirrors = {
+                'debian': config.get_value('DEBIAN_MIRROR'),
+                'ubuntu': config.get_value('UBUNTU_MIRROR'),
+                'ubuntu-ports': config.get_value('UBUNTU_PORTS_MIRROR'),
+            }
+        self.mirrors = mirrors
+        self.compression = COMPRESSION
+        self._indexes = {}
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            for index in self._indexes.values():
+                index.close()
+            self._indexes = {}
+            self._building = {}
+
+    def _url(self, distro, release, arch, component):
+        mirror = self.mirrors[distro]
+        if distro == 'ubuntu' and arch not in _PRIMARY_ARCHITECTURES:
+            mirror = self.mirrors['ubuntu-ports']
+        if arch == 'source':
+            return '%s/dists/%s/%s/source/Sources%s' % (
+                mirror.rstrip('/'), release, component, self.compression)
+        return '%s/dists/%s/%s/binary-%s/Packages%s' % (
+            mirror.rstrip('/'), release, component, arch, self.compression)
+
+    def _update(self, distro, release, arch):
+        '''Return the path of the index of release and arch, downloading and
+        inverting the archive indexes again if they are too old.
+        '''
+        directory = os.path.join(self.cache_dir, distro, release, arch)
+        path = os.path.join(directory, 'index')
+        meta_path = os.path.join(directory, 'meta.json')
+        meta = load_cached_json(meta_path)
+        if (meta and time.time() - meta['time'] < self.ttl
+                and os.path.exists(path)):
+            return path
+
+        meta = meta or {'components': {}}
+        invert = invert_sources if arch == 'source' else invert_packages
+        changed = False
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            for component in COMPONENTS[distro]:
+                cached = meta['components'].setdefault(component, {})
+                if not os.path.exists(os.path.join(directory, component)):
+                    # Without the inverted index, the conditional requests
+                    # would only get back that nothing changed
+                    cached.clear()
+                text = fetch_index(self._url(distro, release, arch,
+                                             component), cached)
+                if text is None:
+                    continue
+                lines = set('\t'.join(line)
+                            for line in invert(text, component))
+                component_path = os.path.join(directory, component)
+                with open(component_path + '.new', 'wb') as f:
+                    f.write(u''.join(line + u'\n' for line in lines)
+                            .encode('utf-8'))
+                os.rename(component_path + '.new', component_path)
+                changed = True
+        except (httplib2.HttpLib2Error, socket.error, IOError, OSError) as e:
+            if not os.path.exists(path):
+                raise RDependsException('Unable to download the indexes of '
+                                        '%s %s: %s' % (release, arch, e))
+            Logger.warn('Using the cached indexes of %s %s: %s',
+                        release, arch, e)
+            return path
+
+        if changed or not os.path.exists(path):
+            self._merge(directory, distro, path)
+        meta['time'] = time.time()
+        save_cached_json(meta_path, meta)
+        return path
+
+    def _merge(self, directory, distro, path):
+        lines = []
+        for component in COMPONENTS[distro]:
+            try:
+                with open(os.path.join(directory, component), 'rb') as f:
+                    lines.extend(f.read().splitlines(True))
+            except IOError:
+                pass
+        lines.sort()
+        with open(path + '.new', 'wb') as f:
+            f.writelines(lines)
+        os.rename(path + '.new', path)
+
+    def _index(self, distro, release, arch):
+        '''Return the open index of release and arch, updating it first.
+        Each index is updated under its own lock, so that the queries on
+        the other indexes don't wait for it.
+        '''
+        key = (distro, release, arch)
+        with self._lock:
+            if key in self._indexes:
+                return self._indexes[key]
+            building = self._building.setdefault(key, threading.Lock())
+        with building:
+            with self._lock:
+                if key in self._indexes:
+                    return self._indexes[key]
+            index = _SortedIndex(self._update(distro, release, arch))
+            with self._lock:
+                self._indexes[key] = index
+            return index
+
+    def query(self, package, release, arch):
+        '''Look up the reverse-dependencies of package (or of the binaries
+        of src:package) in release and arch (any for all the architectures
+        and source). Raise RDependsException if it isn't published there.
+        '''
+        distro = codename_to_distribution(release)
+        if not distro or distro.lower() not in COMPONENTS:
+            raise RDependsException('Unknown release %s' % release)
+        distro = distro.lower()
+        if arch == 'any':
+            archs = list(ARCHITECTURES[distro]) + ['source']
+        else:
+            archs = [arch]
+
+        names = [package]
+        if package.startswith('src:'):
+            names = sorted(set(
+                binary for field, binary, _
+                in self._index(distro, release, 'source').lookup(package)
+                if field == 'Binary'))
+
+        found = False
+        result = {}
+        for index_arch in archs:
+            index = self._index(distro, release, index_arch)
+            for name in names:
+                rows = index.lookup(name)
+                dependencies = [(name, rows)]
+                for field, value, _ in rows:
+                    if field in ('Package', 'Source'):
+                        found = True
+                    elif field == 'Provides':
+                        dependencies.append((value, index.lookup(value)))
+                for dependency, dependency_rows in dependencies:
+                    for field, rdep, component in dependency_rows:
+                        if not field.startswith('Reverse-'):
+                            continue
+                        entry = result.setdefault(field, {}).setdefault(
+                            rdep, {'Package': rdep, 'Component': component,
+                                   'Architectures': []})
+                        if index_arch not in entry['Architectures']:
+                            entry['Architectures'].append(index_arch)
+                        if dependency != package:
+                            entry['Dependency'] = dependency
+
+        if not found:
+            raise RDependsException('%s is not published in %s (%s)'
+                                    % (package, release, arch))
+        return dict((field, sorted(entries.values(),
+                                   key=lambda entry: entry['Package']))
+                    for field, entries in result.items())
@@ -22,7 +22,11 @@
 
 from __future__ import print_function
 
+import hashlib
+import itertools
+import os
 import re
+import threading
 
 from debian.deb822 import Changes
 from distro_info import DebianDistroInfo, DistroDataOutdated
@@ -32,6 +36,8 @@ from ubuntutools.lp import udtexceptions
 from ubuntutools.lp.lpapicache import (Launchpad, Distribution, PersonTeam,
                                        DistributionSourcePackage)
 from ubuntutools.logger import Logger
+from ubuntutools.misc import CACHE_DIR
+from ubuntutools.parallel import DEFAULT_JOBS, WorkerPool, run_parallel
 from ubuntutools.question import confirmation_prompt
 
 
@@ -83,63 +89,203 @@ team.''')
     return need_sponsor
 
 
-def check_existing_reports(srcpkg):
+OPEN_STATUSES = ["Incomplete", "New", "Confirmed", "Triaged", "In Progress",
+                 "Fix Committed"]
+
+# The title of a bug task: Bug #1 in foo (Ubuntu): "Sync foo ..."
+_TASK_TITLE_RE = re.compile(r'^Bug #\d+ in (\S+) \([^)]*\): "(.*)"$',
+                            re.DOTALL)
+
+
+class SyncRequests(object):
+    '''
+    The open sync requests of a distribution, to look many source packages
+    up at once.
+
+    The bugs that mention syncs are searched for once, and indexed by source
+    package; their titles are read from the bug tasks, so that no bug is
+    loaded.
+    '''
+
+    def __init__(self, distribution='ubuntu'):
+        self.distribution = distribution
+        self._index = None
+
+    def _load(self):
+        index = {}
+        tasks = Distribution(self.distribution).searchTasks(
+            status=OPEN_STATUSES, omit_duplicates=True, search_text='sync')
+        for task in tasks:
+            m = _TASK_TITLE_RE.match(task.title)
+            if m is None or task.is_complete:
+                continue
+            index.setdefault(m.group(1), []).append((m.group(2),
+                                                     task.web_link))
+        return index
+
+    def find(self, srcpkg):
+        '''
+        Return (title, url) of the open sync requests for srcpkg.
+        '''
+        if self._index is None:
+            self._index = self._load()
+        return [(title, url) for title, url in self._index.get(srcpkg, [])
+                if 'ync %s' % srcpkg in title]
+
+
+def check_existing_reports(srcpkg, sync_requests=None):
     '''
     Check existing bug reports on Launchpad for a possible sync request.
 
-    If found ask for confirmation on filing a request.
+    If found ask for confirmation on filing a request. The open sync
+    requests are looked up in sync_requests (a SyncRequests) if given,
+    otherwise in the bugs of the source package.
     '''
 
-    # Fetch the package's bug list from Launchpad
-    pkg = Distribution('ubuntu').getSourcePackage(name=srcpkg)
-    pkg_bug_list = pkg.searchTasks(status=["Incomplete", "New", "Confirmed",
-                                           "Triaged", "In Progress",
-                                           "Fix Committed"],
-                                   omit_duplicates=True)
+    if sync_requests is not None:
+        duplicates = sync_requests.find(srcpkg)
+    else:
+        # Fetch the package's bug list from Launchpad
+        pkg = Distribution('ubuntu').getSourcePackage(name=srcpkg)
+        pkg_bug_list = pkg.searchTasks(status=OPEN_STATUSES,
+                                       omit_duplicates=True)
+
+        # Search bug list for other sync requests.
+        duplicates = [(bug.title, bug.web_link) for bug in pkg_bug_list
+                      # check for Sync or sync and the package name
+                      if not bug.is_complete and 'ync %s' % srcpkg in bug.title]
+
+    for title, url in duplicates:
+        print('The following bug could be a possible duplicate sync bug '
+              'on Launchpad:\n'
+              ' * %s (%s)\n'
+              'Please check the above URL to verify this before '
+              'continuing.'
+              % (title, url))
+        confirmation_prompt()
+
 
-    # Search bug list for other sync requests.
-    for bug in pkg_bug_list:
-        # check for Sync or sync and the package name
-        if not bug.is_complete and 'ync %s' % srcpkg in bug.title:
-            print('The following bug could be a possible duplicate sync bug '
-                  'on Launchpad:\n'
-                  ' * %s (%s)\n'
-                  'Please check the above URL to verify this before '
-                  'continuing.'
-                  % (bug.title, bug.web_link))
-            confirmation_prompt()
+CHANGES_CACHE_DIR = os.path.join(CACHE_DIR, 'changes')
+# The number of .changes kept on disk, the least recently used are removed
+CHANGES_CACHE_SIZE = 1000
 
 
-def get_ubuntu_delta_changelog(srcpkg):
+def _changes_path(link):
+    return os.path.join(CHANGES_CACHE_DIR,
+                        hashlib.sha1(link.encode('utf-8')).hexdigest())
+
+
+def _changes_sources(records):
     '''
-    Download the Ubuntu changelog and extract the entries since the last sync
-    from Debian.
+    Yield (link, record) for each publication in records, record being None
+    when its .changes is on disk already.
     '''
-    archive = Distribution('ubuntu').getArchive()
-    spph = archive.getPublishedSources(source_name=srcpkg.getPackageName(),
-                                       exact_match=True, pocket='Release')
+    for record in records:
+        link = record.self_link
+        if os.path.exists(_changes_path(link)):
+            yield link, None
+        else:
+            yield link, record
+
+
+def _fetch_changes(source, owner):
+    '''
+    Return the .changes of a publication, from the disk or downloaded, or
+    None if it has none (a native sync) or it can't be downloaded.
+
+    The publication was loaded by the owner thread; any other thread looks
+    it up again with its own Launchpad session.
+    '''
+    link, record = source
+    path = _changes_path(link)
+    if record is None:
+        with open(path, 'rb') as f:
+            body = f.read()
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return body
+
+    if threading.current_thread() is not owner:
+        record = Launchpad.thread_session().load(link)
+    url = record.changesFileUrl()
+    if url is None:
+        return None
+    try:
+        response, body = Http().request(url)
+    except HttpLib2Error as e:
+        Logger.error(str(e))
+        return None
+    if response.status != 200:
+        Logger.error("%s: %s %s", url, response.status, response.reason)
+        return None
+    return body
+
+
+def _save_changes(link, body):
+    '''Keep the .changes of a publication on disk, they never change.'''
+    path = _changes_path(link)
+    try:
+        if not os.path.isdir(CHANGES_CACHE_DIR):
+            os.makedirs(CHANGES_CACHE_DIR)
+        with open(path + '.new', 'wb') as f:
+            f.write(body)
+        os.rename(path + '.new', path)
+    except (IOError, OSError) as e:
+        Logger.debug('Could not save %s: %s', path, e)
+
+
+def _prune_changes(size=CHANGES_CACHE_SIZE):
+    '''Remove the least recently used .changes, past size of them.'''
+    try:
+        paths = [os.path.join(CHANGES_CACHE_DIR, name)
+                 for name in os.listdir(CHANGES_CACHE_DIR)]
+        if len(paths) <= size:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - size]:
+            os.unlink(path)
+    except OSError as e:
+        Logger.debug('Could not prune %s: %s', CHANGES_CACHE_DIR, e)
+
+
+def _iter_changes(records, jobs):
+    '''
+    Yield the .changes of the publications in records, in order. They are
+    looked up and downloaded in windows of 1, 2, 4... up to jobs
+    publications at once, so that little is downloaded past the last sync
+    from Debian when it is recent. Only the .changes that are yielded are
+    kept on disk.
+    '''
+    owner = threading.current_thread()
+    sources = _changes_sources(records)
+    size = 1
+    with WorkerPool(jobs) as pool:
+        while True:
+            window = list(itertools.islice(sources, min(size, jobs)))
+            if not window:
+                return
+            size *= 2
+            bodies = pool.map(lambda source: _fetch_changes(source, owner), window)
+            for source, body in zip(window, bodies):
+                if body is None:
+                    return
+                link, record = source
+                if record is not None:
+                    _save_changes(link, body)
+                yield body
+
+
+def _delta_changelog(records, jobs):
     debian_info = DebianDistroInfo()
     topline = re.compile(r'^(\w%(name_chars)s*) \(([^\(\) \t]+)\)'
                          r'((\s+%(name_chars)s+)+)\;'
                          % {'name_chars': '[-+0-9a-z.]'},
                          re.IGNORECASE)
     delta = []
-    for record in spph:
-        changes_url = record.changesFileUrl()
-        if changes_url is None:
-            # Native sync
-            break
-        try:
-            response, body = Http().request(changes_url)
-        except HttpLib2Error as e:
-            Logger.error(str(e))
-            break
-        if response.status != 200:
-            Logger.error("%s: %s %s", changes_url, response.status,
-                         response.reason)
-            break
-
-        changes = Changes(Http().request(changes_url)[1])
+    for body in _iter_changes(records, jobs):
+        changes = Changes(body)
         for line in changes['Changes'].splitlines():
             line = line[1:]
             m = topline.match(line)
@@ -156,6 +302,41 @@ def get_ubuntu_delta_changelog(srcpkg):
     return '\n'.join(delta)
 
 
+def get_ubuntu_delta_changelog(srcpkg, jobs=DEFAULT_JOBS):
+    '''
+    Download the Ubuntu changelog and extract the entries since the last sync
+    from Debian.
+
+    The .changes of the publications are downloaded up to jobs at a time,
+    and kept on disk.
+    '''
+    archive = Distribution('ubuntu').getArchive()
+    spph = archive.getPublishedSources(source_name=srcpkg.getPackageName(),
+                                       exact_match=True, pocket='Release')
+    try:
+        return _delta_changelog(spph, jobs)
+    finally:
+        _prune_changes()
+
+
+def get_ubuntu_delta_changelogs(names, jobs=DEFAULT_JOBS):
+    '''
+    Return {name: delta changelog} for the source packages names, like
+    get_ubuntu_delta_changelog, looking up to jobs packages up at once.
+    '''
+    def delta_changelog(name):
+        ubuntu = Launchpad.thread_session().distributions['ubuntu']
+        spph = ubuntu.main_archive.getPublishedSources(
+            source_name=name, exact_match=True, pocket='Release')
+        return _delta_changelog(spph, 1)
+
+    names = list(names)
+    try:
+        return dict(zip(names, run_parallel(delta_changelog, names, jobs)))
+    finally:
+        _prune_changes()
+
+
 def post_bug(srcpkg, subscribe, status, bugtitle, bugtext):
     '''
     Use the LP API to file the sync request.
@@ -0,0 +1,116 @@
+# test_blacklist.py - Test ubuntutools.blacklist.
+#
+# Copyright (C) 2019, Canonical Ltd.
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import datetime
+import shutil
+import tempfile
+
+import httplib2
+import mock
+
+from ubuntutools.blacklist import SyncBlacklist
+from ubuntutools.test import unittest
+
+BLACKLIST = u"""\
+# Header comment
+
+# Removed from Ubuntu
+foo  # no longer wanted
+
+# Whole families
+bar-*
+baz-[0-9]
+
+# Listed again
+foo
+bar-baz
+"""
+
+
+class SyncBlacklistTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.responses = []
+        self.requests = []
+        patcher = mock.patch.object(httplib2.Http, 'request', self._request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.series = mock.Mock()
+        self.series.name = 'disco'
+        self.series.getDifferenceComments.return_value = []
+        self.series.getDifferencesTo.return_value = []
+
+    def _request(self, url, headers=None):
+        self.requests.append(headers)
+        status, body, response_headers = self.responses.pop(0)
+        response = httplib2.Response(dict(response_headers, status=status))
+        return response, body.encode('utf-8')
+
+    def _blacklist(self):
+        return SyncBlacklist(cache_dir=self.cache_dir)
+
+    def test_match(self):
+        self.responses.append((200, BLACKLIST, {}))
+        blacklist = self._blacklist()
+        self.assertEqual(["# Removed from Ubuntu\n", "foo  # no longer wanted\n"],
+                         blacklist.match('foo'))
+        self.assertEqual(["# Whole families\n", "bar-*\n"], blacklist.match('bar-baz'))
+        self.assertEqual(["# Whole families\n", "bar-*\n", "baz-[0-9]\n"],
+                         blacklist.match('baz-1'))
+        for query in ('bar', 'baz-a', 'foobar', 'Foo'):
+            self.assertIsNone(blacklist.match(query))
+        self.assertEqual(1, len(self.requests))
+
+    def test_conditional_get(self):
+        self.responses.append((200, BLACKLIST, {'etag': '"1"'}))
+        self._blacklist().lines()
+        self.responses.append((304, u'', {}))
+        self.assertIsNotNone(self._blacklist().match('foo'))
+        self.assertEqual({'If-None-Match': '"1"'}, self.requests[1])
+
+        self.responses.append((200, u'other\n', {'etag': '"2"'}))
+        blacklist = self._blacklist()
+        self.assertIsNone(blacklist.match('foo'))
+        self.assertIsNotNone(blacklist.match('other'))
+
+        self.responses.append((503, u'', {}))
+        self.assertIsNotNone(self._blacklist().match('other'))
+
+    def test_check(self):
+        self.responses.append((200, BLACKLIST, {}))
+        comment = mock.Mock(body_text='Not yet', comment_date=datetime.datetime(2019, 1, 1))
+        comment.comment_author.name = 'someone'
+        self.series.getDifferenceComments.return_value = [comment]
+        self.series.getDifferencesTo.side_effect = lambda status: [
+            mock.Mock(sourcepackagename='current', status=status)
+        ] if status == 'Blacklisted current version' else []
+
+        blacklist = self._blacklist()
+        self.assertEqual(('CURRENT', ['Not yet\n  -- someone  Tue, 01 Jan 2019 00:00:00 +0000']),
+                         blacklist.check('current', self.series))
+        self.assertEqual('ALWAYS', blacklist.check('foo', self.series)[0])
+        blacklist.check('current', self.series)
+        self.assertEqual(2, self.series.getDifferenceComments.call_count)
+        self.assertEqual(2, self.series.getDifferencesTo.call_count)
+        blacklist.save()
+
+        # Cached on disk
+        self.responses.append((304, u'', {}))
+        self.assertEqual('CURRENT', self._blacklist().check('current', self.series)[0])
+        self.assertEqual(2, self.series.getDifferenceComments.call_count)
+        self.assertEqual(2, self.series.getDifferencesTo.call_count)
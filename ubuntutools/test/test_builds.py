@@ -0,0 +1,74 @@
+# test_builds.py - Test ubuntutools.lp.builds.
+#
+# Copyright (C) 2019, Canonical Ltd.
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import mock
+from launchpadlib.errors import HTTPError
+
+from ubuntutools.lp.builds import BuildBatch, SourceBuilds
+from ubuntutools.test import unittest
+
+
+def http_error(status):
+    return HTTPError(mock.Mock(status=status, reason='Error'), b'')
+
+
+class CheckPermissionsTestCase(unittest.TestCase):
+    def setUp(self):
+        series = mock.Mock(self_link='/disco')
+        series.name = 'disco'
+        self.batch = BuildBatch(mock.Mock(self_link='/ubuntu'), series, 'Release',
+                                ['amd64'], jobs=4)
+        self.addCleanup(self.batch.close)
+        self.batch._load = self._load
+        self.allowed = set(['foo', 'baz'])
+
+    def _load(self, link):
+        return mock.Mock(self_link=link, checkUpload=self._check_upload)
+
+    def _check_upload(self, sourcepackagename, **kwargs):
+        self.assertEqual('Release', kwargs['pocket'])
+        self.assertEqual('/me', kwargs['person'].self_link)
+        if sourcepackagename == 'broken':
+            raise http_error(500)
+        if sourcepackagename not in self.allowed:
+            raise http_error(403)
+
+    def _sources(self, names):
+        self.batch.sources = []
+        for name in names:
+            source = SourceBuilds(name)
+            source.component = 'main'
+            if name == 'missing':
+                source.error = 'Not found'
+            self.batch.sources.append(source)
+        return self.batch.sources
+
+    def test_check_permissions(self):
+        sources = self._sources(['foo', 'bar', 'baz', 'missing', 'qux'])
+        me = mock.Mock(self_link='/me')
+        self.assertEqual(['bar', 'qux'], self.batch.check_permissions(me))
+        self.assertEqual([True, False, True, False, False],
+                         [source.can_retry for source in sources])
+        # Asked once per package
+        self.allowed = set()
+        self.batch.check_permissions(me)
+        self.assertEqual([True, False, True, False, False],
+                         [source.can_retry for source in sources])
+
+    def test_error(self):
+        self._sources(['foo', 'broken'])
+        self.assertRaises(HTTPError, self.batch.check_permissions,
+                          mock.Mock(self_link='/me'))
@@ -0,0 +1,76 @@
+# test_checksums.py - Test ubuntutools.lp.checksums.
+#
+# Copyright (C) 2019, Canonical Ltd.
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import shutil
+import tempfile
+
+import mock
+
+from ubuntutools.lp.checksums import SourceChecksums, files_match
+from ubuntutools.test import unittest
+
+URL = 'https://launchpad.net/debian/+archive/primary/+sourcefiles/foo/1.0-1/'
+
+
+def spph(link, files):
+    record = mock.Mock(self_link=link)
+    record.sourceFileUrls.return_value = [
+        {'url': URL + name, 'size': size, 'sha256': sha256}
+        for name, size, sha256 in files]
+    return record
+
+
+class SourceChecksumsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def test_get(self):
+        record = spph('/foo', [('foo_1.0-1.dsc', 100, 'aa'),
+                               ('foo_1.0.orig.tar.gz', 2000, 'bb'),
+                               ('foo_1.0%2Bdfsg.orig.tar.gz', 10, 'cc')])
+        checksums = SourceChecksums(self.cache_dir)
+        expected = {'foo_1.0-1.dsc': (100, 'aa'),
+                    'foo_1.0.orig.tar.gz': (2000, 'bb'),
+                    'foo_1.0+dfsg.orig.tar.gz': (10, 'cc')}
+        self.assertEqual(expected, checksums.get(record))
+        self.assertEqual(expected, checksums.get(record))
+        record.sourceFileUrls.assert_called_once_with(include_meta=True)
+
+        # Kept on disk for the next run
+        checksums.save()
+        record.sourceFileUrls.reset_mock()
+        self.assertEqual(expected, SourceChecksums(self.cache_dir).get(record))
+        self.assertFalse(record.sourceFileUrls.called)
+
+    def test_expired(self):
+        record = spph('/foo', [('foo_1.0.orig.tar.gz', 2000, 'bb')])
+        checksums = SourceChecksums(self.cache_dir)
+        checksums.get(record)
+        checksums.save()
+        SourceChecksums(self.cache_dir, ttl=-1).get(record)
+        self.assertEqual(2, record.sourceFileUrls.call_count)
+
+    def test_files_match(self):
+        debian = {'foo_1.0-1.dsc': (100, 'aa'),
+                  'foo_1.0.orig.tar.gz': (2000, 'bb'),
+                  'foo_1.0-1.debian.tar.xz': (30, 'dd')}
+        ubuntu = {'foo_1.0-1.dsc': (101, 'ab'),
+                  'foo_1.0.orig.tar.gz': (2000, 'bb'),
+                  'foo_1.0-2.debian.tar.xz': (31, 'de')}
+        self.assertTrue(files_match(debian, ubuntu))
+        ubuntu['foo_1.0.orig.tar.gz'] = (2000, 'bc')
+        self.assertFalse(files_match(debian, ubuntu))
@@ -0,0 +1,174 @@
+# test_madison.py - Test ubuntutools.madison.
+#
+# Copyright (C) 2019, Canonical Ltd.
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import gzip
+import io
+import os
+import shutil
+import socket
+import tempfile
+
+import httplib2
+import mock
+
+from ubuntutools.madison import SourcesIndex
+from ubuntutools.test import unittest
+
+MIRROR = 'http://deb.example.com/debian'
+
+MAIN = u"""\
+Package: foo
+Binary: foo, libfoo1
+Version: 1.0-1
+Section: misc
+
+Package: bar
+Version: 2:2.0-3
+"""
+
+CONTRIB = u"""\
+Package: foo
+Version: 0.9-1
+"""
+
+
+def gzipped(text):
+    data = io.BytesIO()
+    with gzip.GzipFile(fileobj=data, mode='wb') as f:
+        f.write(text.encode('utf-8'))
+    return data.getvalue()
+
+
+class SourcesIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.sources = {}
+        self.requests = []
+        patcher = mock.patch.object(httplib2.Http, 'request', self._request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._stubout('ubuntutools.logger.Logger.stderr')
+
+    def _stubout(self, stub):
+        patcher = mock.patch(stub)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _request(self, url, headers=None):
+        self.requests.append((url, headers))
+        suite, component = url[len(MIRROR):].split('/')[2:4]
+        source = self.sources.get((suite, component))
+        if source is None:
+            return httplib2.Response({'status': 404}), b''
+        if isinstance(source, Exception):
+            raise source
+        if headers.get('If-None-Match') == '"%s"' % hash(source):
+            return httplib2.Response({'status': 304}), b''
+        return (httplib2.Response({'status': 200, 'etag': '"%s"' % hash(source)}),
+                gzipped(source))
+
+    def _index(self, ttl=3600):
+        index = SourcesIndex('debian', MIRROR, cache_dir=self.cache_dir, ttl=ttl)
+        index.compression = '.gz'
+        return index
+
+    def test_query(self):
+        self.sources[('sid', 'main')] = MAIN
+        self.sources[('sid', 'contrib')] = CONTRIB
+        self.assertEqual([{'source': 'foo', 'version': '1.0-1', 'suite': 'sid',
+                           'component': 'main'},
+                          {'source': 'foo', 'version': '0.9-1', 'suite': 'sid',
+                           'component': 'contrib'}],
+                         sorted(self._index().query('foo', 'sid'),
+                                key=lambda record: record['version'], reverse=True))
+        self.assertEqual(['2:2.0-3'], [record['version']
+                                       for record in self._index().query('bar', 'sid')])
+        self.assertEqual([], list(self._index().query('baz', 'sid')))
+        self.assertEqual(MIRROR + '/dists/sid/main/source/Sources.gz', self.requests[0][0])
+        # Answered from the disk after the first query
+        self.assertEqual(3, len(self.requests))
+
+    def test_all_suites(self):
+        self.sources[('sid', 'main')] = MAIN
+        self.sources[('buster', 'main')] = CONTRIB
+        index = self._index()
+        index.suites = lambda: ['buster', 'sid']
+        self.assertEqual([('buster', '0.9-1'), ('sid', '1.0-1')],
+                         [(record['suite'], record['version'])
+                          for record in index.query('foo')])
+
+    def test_refresh(self):
+        self.sources[('sid', 'main')] = MAIN
+        self.sources[('sid', 'contrib')] = CONTRIB
+        list(self._index().query('foo', 'sid'))
+        del self.requests[:]
+
+        # Only the changed component is downloaded again
+        self.sources[('sid', 'contrib')] = u'Package: foo\nVersion: 0.9-2\n'
+        records = self._index(ttl=-1).query('foo', 'sid')
+        self.assertEqual(['1.0-1', '0.9-2'], [record['version'] for record in records])
+        self.assertEqual(3, len(self.requests))
+        self.assertEqual('"%s"' % hash(MAIN), self.requests[0][1]['If-None-Match'])
+
+    def test_missing_index(self):
+        self.sources[('sid', 'main')] = MAIN
+        list(self._index().query('foo', 'sid'))
+        os.unlink(os.path.join(self.cache_dir, 'sources', 'debian', 'sid'))
+        del self.requests[:]
+
+        # Downloaded again, not asked whether it changed
+        records = self._index().query('foo', 'sid')
+        self.assertEqual(['1.0-1'], [record['version'] for record in records])
+        self.assertNotIn('If-None-Match', self.requests[0][1])
+
+    def test_write_error(self):
+        self.sources[('sid', 'main')] = MAIN
+        index = self._index()
+        with mock.patch.object(index, '_write', return_value=False):
+            self.assertEqual(['1.0-1'], [record['version']
+                                         for record in index.query('foo', 'sid')])
+        # The next run downloads the index again
+        del self.requests[:]
+        records = self._index().query('foo', 'sid')
+        self.assertEqual(['1.0-1'], [record['version'] for record in records])
+        self.assertEqual(3, len(self.requests))
+        self.assertNotIn('If-None-Match', self.requests[0][1])
+
+    def test_offline(self):
+        self.sources[('sid', 'main')] = MAIN
+        list(self._index().query('foo', 'sid'))
+        self.sources[('sid', 'main')] = socket.error('unreachable')
+        records = self._index(ttl=-1).query('foo', 'sid')
+        self.assertEqual(['1.0-1'], [record['version'] for record in records])
+
+
+class RmadisonTestCase(unittest.TestCase):
+    @mock.patch('ubuntutools.archive._sources_indexes', {})
+    @mock.patch('ubuntutools.archive._rmadison')
+    @mock.patch('ubuntutools.archive.SourcesIndex')
+    def test_backend(self, index, cli):
+        from ubuntutools.archive import rmadison
+        with mock.patch.dict('os.environ', {'UBUNTUTOOLS_SOURCES_INDEX': 'yes'}):
+            rmadison('debian', 'foo', 'sid', 'source')
+            rmadison('debian', 'foo')
+            rmadison('debian', 'foo', arch='amd64')
+        with mock.patch.dict('os.environ', {'UBUNTUTOOLS_SOURCES_INDEX': 'no'}):
+            rmadison('debian', 'foo', 'sid', 'source')
+        self.assertEqual(1, index.call_count)
+        self.assertEqual([mock.call('foo', 'sid'), mock.call('foo', None)],
+                         index.return_value.query.call_args_list)
+        self.assertEqual(2, cli.call_count)
@@ -0,0 +1,152 @@
+# test_parallel.py - Test ubuntutools.parallel and ubuntutools.lp.builds.
+#
+# Copyright (C) 2019, Canonical Ltd.
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+import threading
+import time
+
+import mock
+
+from ubuntutools.lp.builds import BuildBatch, BuildInfo, BuildWatcher, SourceBuilds
+from ubuntutools.parallel import RateLimiter, run_parallel
+from ubuntutools.test import unittest
+
+
+class RunParallelTestCase(unittest.TestCase):
+    def test_order(self):
+        def slow_square(n):
+            time.sleep(0.01 * (5 - n))
+            return n * n
+        self.assertEqual([0, 1, 4, 9, 16], run_parallel(slow_square, range(5), jobs=5))
+
+    def test_bounded(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def work(_):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        run_parallel(work, range(12), jobs=3)
+        self.assertEqual(3, running[1])
+
+    def test_exception(self):
+        def fail(n):
+            if n == 2:
+                raise ValueError(n)
+            return n
+        self.assertRaises(ValueError, run_parallel, fail, range(4), jobs=2)
+
+    def test_rate(self):
+        limiter = RateLimiter(100)
+        start = time.time()
+        for _ in range(6):
+            limiter.wait()
+        self.assertGreaterEqual(time.time() - start, 0.05 - 0.005)
+
+
+class BuildBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        archive = mock.Mock(displayname='Primary Archive for Ubuntu')
+        series = mock.Mock()
+        series.name = 'disco'
+        self.batch = BuildBatch(archive, series, 'Proposed', ['amd64', 'i386'], jobs=2)
+        self.loaded = {}
+        self.batch._load = lambda link: self.loaded.setdefault(link, mock.Mock())
+
+    def _source(self, name, can_retry, builds):
+        source = SourceBuilds(name)
+        source.version = '1.0'
+        source.can_retry = can_retry
+        for arch, state, retriable in builds:
+            source.builds[arch] = BuildInfo(arch, state, retriable, True,
+                                            '/%s/%s' % (name, arch))
+        return source
+
+    def test_run(self):
+        self.batch.sources = [
+            self._source('foo', True, [('amd64', 'Failed to build', True),
+                                       ('i386', 'Successfully built', False),
+                                       ('armhf', 'Failed to build', True)]),
+            self._source('bar', False, [('amd64', 'Failed to build', True)]),
+        ]
+        self.batch.run(retry=True)
+        self.assertEqual(['/foo/amd64'], sorted(self.loaded))
+        self.loaded['/foo/amd64'].retry.assert_called_once_with()
+        self.assertEqual({'amd64': {'retry': 'done'}, 'i386': {'retry': 'skipped'}},
+                         self.batch.sources[0].results)
+        self.assertEqual({'amd64': {'retry': 'denied'}}, self.batch.sources[1].results)
+
+    def test_summary(self):
+        missing = SourceBuilds('missing')
+        missing.error = 'not there'
+        self.batch.sources = [
+            self._source('foo', True, [('amd64', 'Failed to build', True)]),
+            missing,
+        ]
+        self.batch.run(retry=True, priority=5000)
+        self.assertEqual(self.batch.summary().splitlines(), [
+            'Package  Version  Arch   State            Retry  Rescore',
+            'foo      1.0      amd64  Failed to build  done   done',
+            'missing  -        -      not found        -      -',
+        ])
+
+
+class BuildWatcherTestCase(unittest.TestCase):
+    def test_watch(self):
+        archive = mock.Mock(displayname='Primary Archive for Ubuntu')
+        series = mock.Mock()
+        series.name = 'disco'
+        batch = BuildBatch(archive, series, 'Proposed', ['amd64', 'i386'], jobs=1)
+        source = SourceBuilds('foo')
+        source.version = '1.0'
+        source.builds = {
+            'amd64': BuildInfo('amd64', 'Needs building', False, True, '/amd64'),
+            'i386': BuildInfo('i386', 'Successfully built', False, False, '/i386'),
+        }
+        batch.sources = [source]
+
+        states = {'/amd64': ['Currently building', 'Currently building',
+                             'Successfully built'],
+                  '/i386': ['Successfully built']}
+        builds = {}
+        for link in states:
+            build = builds[link] = mock.Mock(buildstate=states[link][0])
+            build.lp_refresh.side_effect = (
+                lambda build=build, link=link: setattr(build, 'buildstate',
+                                                       states[link].pop(0)))
+        batch._load = builds.get
+
+        output = StringIO()
+        sleeps = []
+        watcher = BuildWatcher(batch, interval=10, max_interval=20, backoff=2,
+                               output=output, sleep=sleeps.append)
+        watcher.watch()
+
+        self.assertEqual([10, 20], sleeps)
+        self.assertEqual(1, builds['/i386'].lp_refresh.call_count)
+        self.assertEqual(3, builds['/amd64'].lp_refresh.call_count)
+        lines = [line.split(' ', 1)[1] for line in output.getvalue().splitlines()]
+        self.assertEqual(['foo 1.0 amd64: Needs building -> Currently building',
+                          'foo 1.0 amd64: Currently building -> Successfully built'],
+                         lines)
@@ -0,0 +1,415 @@
+# test_rdepends.py - Test ubuntutools.rdepends.
+#
+# Copyright (C) 2019, Canonical Ltd.
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import httplib2
+import mock
+
+from ubuntutools.rdepends import (merge_rdepends, RDependsClient,
+                                  RDependsException, RDependsGraph)
+from ubuntutools.rdepends_index import RDependsIndex, _SortedIndex
+from ubuntutools.test import unittest
+
+SERVER = 'http://rdepends.example.com'
+
+
+class RDependsClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        self.connections = set()
+        patcher = mock.patch.object(httplib2.Http, 'request', autospec=True,
+                                    side_effect=self._request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _request(self, http, url):
+        self.requests.append(url)
+        self.connections.add((id(http), threading.current_thread().ident))
+        package = url.rsplit('/', 1)[1]
+        if package == 'missing':
+            return httplib2.Response({'status': 404}), b'Unknown package\n'
+        data = {'Reverse-Depends': [{'Package': package + '-user',
+                                     'Component': 'main'}]}
+        return httplib2.Response({'status': 200}), json.dumps(data).encode('utf-8')
+
+    def test_query_many(self):
+        queries = [('foo', 'disco', 'any'), ('bar', 'disco', 'any'),
+                   ('missing', 'disco', 'any'), ('foo', 'cosmic', 'source')]
+        with RDependsClient(SERVER, jobs=2) as client:
+            results, errors = client.query_many(queries)
+            self.assertEqual(['foo-user', 'bar-user', 'foo-user'],
+                             [results[query]['Reverse-Depends'][0]['Package']
+                              for query in queries if query in results])
+            self.assertEqual([('missing', 'disco', 'any')], list(errors))
+            self.assertIn(SERVER + '/v1/cosmic/source/foo', self.requests)
+
+            # Answered from the cache, failures included
+            client.query_many(queries)
+            client.query('foo', 'disco', 'any')['Reverse-Depends'] = []
+            self.assertRaises(RDependsException, client.query, 'missing', 'disco', 'any')
+            self.assertEqual(1, len(client.query('foo', 'disco', 'any')['Reverse-Depends']))
+        self.assertEqual(4, len(self.requests))
+        # One connection per thread
+        self.assertEqual(len(set(thread for _, thread in self.connections)),
+                         len(self.connections))
+
+    def test_merge(self):
+        results = {
+            ('libfoo1', 'disco', 'amd64'): {
+                'Reverse-Depends': [
+                    {'Package': 'foo-utils', 'Component': 'main'},
+                    {'Package': 'bar', 'Component': 'universe',
+                     'Architectures': ['amd64'], 'Dependency': 'libfoo-abi-1'}],
+                'Reverse-Build-Depends': [
+                    {'Package': 'baz', 'Component': 'main'}]},
+            ('libfoo1', 'disco', 'arm64'): {
+                'Reverse-Depends': [
+                    {'Package': 'foo-utils', 'Component': 'main',
+                     'Architectures': ['arm64']}]},
+            ('libfoo2', 'disco', 'amd64'): {
+                'Reverse-Depends': [
+                    {'Package': 'foo-utils', 'Component': 'main'}]},
+        }
+        fields = {'amd64': ['Reverse-Depends'], 'arm64': ['Reverse-Depends']}
+        self.assertEqual({'Reverse-Depends': [
+            {'Package': 'bar', 'Component': 'universe',
+             'Architectures': ['amd64'], 'Dependencies': ['libfoo-abi-1']},
+            {'Package': 'foo-utils', 'Component': 'main',
+             'Architectures': ['amd64', 'arm64'],
+             'Dependencies': ['libfoo1', 'libfoo2']},
+        ]}, merge_rdepends(results, fields))
+        self.assertEqual(['foo-utils'],
+                         [rdep['Package'] for rdep in merge_rdepends(
+                             results, fields, ['main'])['Reverse-Depends']])
+
+
+# {(package, arch): [(field, rdep, component, architectures)]}
+GRAPH = {
+    ('libfoo1', 'amd64'): [('Reverse-Depends', 'foo-utils', 'main', ['amd64']),
+                           ('Reverse-Depends', 'bar', 'universe', ['amd64'])],
+    ('libfoo1', 'arm64'): [('Reverse-Depends', 'foo-utils', 'main', ['arm64'])],
+    ('libfoo1', 'source'): [('Reverse-Build-Depends', 'baz', 'main', ['source'])],
+    ('foo-utils', 'amd64'): [('Reverse-Recommends', 'bar', 'universe', ['amd64']),
+                             ('Reverse-Depends', 'qux', 'main', ['amd64'])],
+    ('foo-utils', 'arm64'): [],
+    ('bar', 'amd64'): [('Reverse-Depends', 'libfoo1', 'main', ['amd64'])],
+    ('src:baz', 'amd64'): [('Reverse-Depends', 'quux', 'main', ['amd64'])],
+    ('qux', 'amd64'): [('Reverse-Depends', 'corge', 'main', ['amd64'])],
+}
+
+
+class FakeIndex(object):
+    def __init__(self):
+        self.queries = []
+
+    def query(self, package, release, arch):
+        self.queries.append((package, arch))
+        if (package, arch) not in GRAPH:
+            raise RDependsException('%s is not published' % package)
+        data = {}
+        for field, rdep, component, archs in GRAPH[(package, arch)]:
+            data.setdefault(field, []).append({
+                'Package': rdep, 'Component': component,
+                'Architectures': archs})
+        return data
+
+    def close(self):
+        pass
+
+
+class RDependsGraphTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = FakeIndex()
+        self.client = RDependsClient(jobs=2, index=self.index)
+        self.addCleanup(self.client.close)
+
+    def _graph(self, archs, fields=('Reverse-Depends', 'Reverse-Recommends'),
+               components=None):
+        return RDependsGraph(self.client, 'disco',
+                             dict((arch, list(fields)) for arch in archs),
+                             components)
+
+    def test_traverse(self):
+        graph = self._graph(['amd64', 'arm64'])
+        self.assertEqual([['libfoo1'], ['bar', 'foo-utils'], ['qux'],
+                          ['corge']], graph.traverse(['libfoo1']))
+        # Each package is queried once per architecture, cycles included
+        self.assertEqual(len(self.index.queries), len(set(self.index.queries)))
+        self.assertEqual({'libfoo1': {'Reverse-Depends': set(['amd64'])},
+                          'foo-utils': {'Reverse-Recommends': set(['amd64'])}},
+                         graph.edges['bar'])
+        self.assertEqual({'Reverse-Depends': set(['amd64', 'arm64'])},
+                         graph.edges['foo-utils']['libfoo1'])
+        self.assertIn(('corge', 'disco', 'arm64'), graph.errors)
+
+    def test_depth(self):
+        graph = self._graph(['amd64'], components=['main'])
+        self.assertEqual([['libfoo1'], ['foo-utils'], ['qux']],
+                         graph.traverse(['libfoo1'], depth=2))
+        self.assertNotIn(('qux', 'amd64'), self.index.queries)
+        self.assertEqual({'libfoo1': 0, 'foo-utils': 1, 'qux': 2},
+                         graph.depths)
+
+    def test_build_depends(self):
+        graph = RDependsGraph(self.client, 'disco', {
+            'source': ['Reverse-Build-Depends'],
+            'amd64': ['Reverse-Depends']}, ['main'])
+        self.assertEqual([['libfoo1'], ['foo-utils', 'src:baz'],
+                          ['quux', 'qux'], ['corge']],
+                         graph.traverse(['libfoo1']))
+        self.assertEqual({'libfoo1': {'Reverse-Build-Depends': set(['source'])}},
+                         graph.edges['src:baz'])
+
+    def test_export(self):
+        graph = self._graph(['amd64'])
+        graph.traverse(['libfoo1'], depth=1)
+        data = json.loads(json.dumps(graph.to_json()))
+        self.assertEqual(['amd64'], data['architectures'])
+        self.assertEqual([{'Package': 'bar', 'Depth': 1},
+                          {'Package': 'foo-utils', 'Depth': 1},
+                          {'Package': 'libfoo1', 'Depth': 0}],
+                         data['packages'])
+        self.assertEqual({'Package': 'bar', 'Dependency': 'libfoo1',
+                          'Field': 'Reverse-Depends',
+                          'Architectures': ['amd64']}, data['edges'][0])
+        self.assertEqual('digraph "reverse-depends" {\n'
+                         '  "bar";\n'
+                         '  "foo-utils";\n'
+                         '  "libfoo1" [shape=box];\n'
+                         '  "bar" -> "libfoo1" [label="Depends"];\n'
+                         '  "foo-utils" -> "libfoo1" [label="Depends"];\n'
+                         '}\n', graph.to_dot())
+
+
+MIRROR = 'http://archive.example.com/ubuntu'
+
+PACKAGES = {
+    'main': u"""\
+Package: libfoo1
+Architecture: amd64
+Provides: libfoo-abi-1
+Description: the foo library
+ with a long description
+ Depends: not-a-field
+
+Package: foo-utils
+Architecture: amd64
+Depends: libfoo1 (>= 1.0), libc6 (>= 2.28) | libc6-compat
+Recommends: foo-doc
+
+Package: foo-doc
+Architecture: all
+""",
+    'universe': u"""\
+Package: bar
+Architecture: amd64
+Pre-Depends: libfoo-abi-1
+Suggests: foo-utils:any
+
+Package: baz
+Architecture: amd64
+Depends: libfoo1
+""",
+}
+
+SOURCES = {
+    'main': u"""\
+Package: foo
+Binary: libfoo1, foo-utils,
+ foo-doc
+Build-Depends: debhelper (>= 11)
+
+""",
+    'universe': u"""\
+Package: bar
+Binary: bar
+Build-Depends: debhelper, libfoo-dev [amd64] <!nocheck>
+Build-Depends-Indep: foo-doc
+""",
+}
+
+
+def gzipped(text):
+    data = io.BytesIO()
+    with gzip.GzipFile(fileobj=data, mode='wb') as f:
+        f.write(text.encode('utf-8'))
+    return data.getvalue()
+
+
+class RDependsIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.requests = []
+        self.indexes = {}
+        for component, text in PACKAGES.items():
+            self.indexes['%s/binary-amd64/Packages.gz' % component] = text
+        for component, text in SOURCES.items():
+            self.indexes['%s/source/Sources.gz' % component] = text
+        patcher = mock.patch.object(httplib2.Http, 'request', self._request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('ubuntutools.rdepends_index.codename_to_distribution',
+                             return_value='Ubuntu')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict('ubuntutools.rdepends_index.ARCHITECTURES',
+                                  {'ubuntu': ('amd64',)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _request(self, url, headers=None):
+        self.requests.append(url)
+        name = url.split('/dists/disco/', 1)[1]
+        text = self.indexes.get(name)
+        if text is None:
+            return httplib2.Response({'status': 404}), b''
+        if headers.get('If-None-Match') == '"%s"' % hash(text):
+            return httplib2.Response({'status': 304}), b''
+        return httplib2.Response({'status': 200, 'etag': '"%s"' % hash(text)}), gzipped(text)
+
+    def _index(self, ttl=3600):
+        index = RDependsIndex(self.cache_dir, ttl, {'ubuntu': MIRROR,
+                                                    'ubuntu-ports': MIRROR})
+        index.compression = '.gz'
+        self.addCleanup(index.close)
+        return index
+
+    def test_query(self):
+        index = self._index()
+        self.assertEqual({
+            'Reverse-Depends': [
+                {'Package': 'bar', 'Component': 'universe', 'Architectures': ['amd64'],
+                 'Dependency': 'libfoo-abi-1'},
+                {'Package': 'baz', 'Component': 'universe', 'Architectures': ['amd64']},
+                {'Package': 'foo-utils', 'Component': 'main', 'Architectures': ['amd64']},
+            ]}, index.query('libfoo1', 'disco', 'amd64'))
+        self.assertEqual({
+            'Reverse-Build-Depends-Indep': [
+                {'Package': 'bar', 'Component': 'universe', 'Architectures': ['source']}],
+            }, index.query('foo-doc', 'disco', 'source'))
+        self.assertRaises(RDependsException, index.query, 'qux', 'disco', 'amd64')
+        self.assertEqual(MIRROR + '/dists/disco/main/binary-amd64/Packages.gz',
+                         self.requests[0])
+
+    def test_any(self):
+        data = self._index().query('foo-doc', 'disco', 'any')
+        self.assertEqual(['Reverse-Build-Depends-Indep', 'Reverse-Recommends'],
+                         sorted(data))
+        self.assertEqual(['source'], data['Reverse-Build-Depends-Indep'][0]['Architectures'])
+
+    def test_source(self):
+        data = self._index().query('src:foo', 'disco', 'amd64')
+        self.assertEqual([('bar', 'libfoo-abi-1'), ('baz', 'libfoo1'),
+                          ('foo-utils', 'libfoo1')],
+                         [(rdep['Package'], rdep['Dependency'])
+                          for rdep in data['Reverse-Depends']])
+        self.assertEqual([('bar', 'foo-utils')],
+                         [(rdep['Package'], rdep['Dependency'])
+                          for rdep in data['Reverse-Suggests']])
+
+    def test_update(self):
+        self._index().query('libfoo1', 'disco', 'amd64')
+        self.assertEqual(4, len(self.requests))
+        del self.requests[:]
+
+        # Fresh enough
+        self._index().query('libfoo1', 'disco', 'amd64')
+        self.assertEqual([], self.requests)
+
+        # Only the changed component is inverted again
+        self.indexes['universe/binary-amd64/Packages.gz'] = u'Package: qux\nDepends: libfoo1\n'
+        directory = os.path.join(self.cache_dir, 'rdepends', 'ubuntu', 'disco', 'amd64')
+        os.utime(os.path.join(directory, 'main'), (0, 0))
+        data = self._index(ttl=-1).query('libfoo1', 'disco', 'amd64')
+        self.assertEqual(['foo-utils', 'qux'],
+                         [rdep['Package'] for rdep in data['Reverse-Depends']])
+        self.assertEqual(0, os.path.getmtime(os.path.join(directory, 'main')))
+
+        # A component deleted from the disk is downloaded again
+        os.unlink(os.path.join(directory, 'universe'))
+        del self.requests[:]
+        data = self._index(ttl=-1).query('libfoo1', 'disco', 'amd64')
+        self.assertEqual(['foo-utils', 'qux'],
+                         [rdep['Package'] for rdep in data['Reverse-Depends']])
+
+        # Offline
+        self.indexes.clear()
+        with mock.patch.object(httplib2.Http, 'request',
+                               side_effect=httplib2.ServerNotFoundError('offline')):
+            with mock.patch('ubuntutools.logger.Logger.stderr'):
+                data = self._index(ttl=-1).query('libfoo1', 'disco', 'amd64')
+        self.assertEqual(2, len(data['Reverse-Depends']))
+
+    def test_concurrent_updates(self):
+        index = self._index()
+        update = index._update
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_update(distro, series, arch):
+            if arch == 'amd64':
+                started.set()
+                release.wait(10)
+            return update(distro, series, arch)
+
+        index._update = slow_update
+        thread = threading.Thread(target=index._index,
+                                  args=('ubuntu', 'disco', 'amd64'))
+        thread.start()
+        try:
+            self.assertTrue(started.wait(10))
+            # Not held up by the update of amd64
+            index._index('ubuntu', 'disco', 'source')
+            self.assertTrue(thread.is_alive())
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(['bar', 'baz', 'foo-utils'], sorted(
+            rdep['Package'] for rdep in
+            index.query('libfoo1', 'disco', 'amd64')['Reverse-Depends']))
+
+    def test_sorted_index(self):
+        path = os.path.join(self.cache_dir, 'index')
+        keys = ['a', 'a-b', 'a-b', 'ab', 'b', 'c']
+        with open(path, 'wb') as f:
+            for i, key in enumerate(keys):
+                f.write(('%s\t%d\n' % (key, i)).encode('utf-8'))
+        index = _SortedIndex(path)
+        self.addCleanup(index.close)
+        for key in set(keys):
+            self.assertEqual([[str(i)] for i, k in enumerate(keys) if k == key],
+                             index.lookup(key))
+        for key in ('', '0', 'a-', 'aa', 'bb', 'd'):
+            self.assertEqual([], index.lookup(key))
+
+        with open(path, 'wb'):
+            pass
+        self.assertEqual([], _SortedIndex(path).lookup('a'))
+
+    def test_client(self):
+        with RDependsClient(jobs=2, index=self._index()) as client:
+            results, errors = client.query_many([('libfoo1', 'disco', 'amd64'),
+                                                 ('qux', 'disco', 'amd64')])
+        self.assertEqual([('libfoo1', 'disco', 'amd64')], list(results))
+        self.assertEqual([('qux', 'disco', 'amd64')], list(errors))
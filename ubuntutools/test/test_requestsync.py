@@ -0,0 +1,161 @@
+# test_requestsync.py - Test ubuntutools.requestsync.lp.
+#
+# Copyright (C) 2019, Canonical Ltd.
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import threading
+
+import httplib2
+import mock
+
+import ubuntutools.requestsync.lp
+from ubuntutools.requestsync.lp import (SyncRequests, _delta_changelog,
+                                        _prune_changes)
+from ubuntutools.test import unittest
+
+CHANGES = u"""\
+Format: 1.8
+Source: foo
+Version: %(version)s
+Changes:
+ foo (%(version)s) %(distribution)s; urgency=medium
+ .
+   * %(change)s
+"""
+
+
+def spph(version, distribution, change):
+    record = mock.Mock(self_link='/foo/' + version)
+    url = 'https://launchpad.net/foo_%s_source.changes' % version
+    record.changesFileUrl.return_value = url
+    record.changes = CHANGES % {'version': version, 'distribution': distribution,
+                                'change': change}
+    return record
+
+
+class DeltaChangelogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        patcher = mock.patch.object(ubuntutools.requestsync.lp, 'CHANGES_CACHE_DIR',
+                                    self.cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.records = [spph('1.0-1ubuntu2', 'disco', 'Second change.'),
+                        spph('1.0-1ubuntu1', 'cosmic', 'First change.'),
+                        spph('1.0-1', 'unstable', 'Debian change.'),
+                        spph('0.9-1', 'unstable', 'Older change.')]
+        self.urls = []
+        patcher = mock.patch.object(httplib2.Http, 'request', self._request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.loads = []
+        patcher = mock.patch.object(ubuntutools.requestsync.lp.Launchpad, 'thread_session')
+        thread_session = patcher.start()
+        self.addCleanup(patcher.stop)
+        thread_session.return_value.load.side_effect = self._load
+
+    def _load(self, link):
+        self.loads.append((threading.current_thread(), link))
+        for record in self.records:
+            if record.self_link == link:
+                return record
+
+    def _request(self, url):
+        self.urls.append(url)
+        for record in self.records:
+            if record.changesFileUrl.return_value == url and record.changes:
+                return httplib2.Response({'status': 200}), record.changes.encode('utf-8')
+        return httplib2.Response({'status': 404}), b''
+
+    def test_delta(self):
+        self.assertEqual('  * Second change.\n  * First change.',
+                         _delta_changelog(self.records, 2))
+        # Each .changes is downloaded once, one and then two at a time,
+        # and none past the last sync
+        self.assertEqual(3, len(self.urls))
+        self.assertEqual(3, len(set(self.urls)))
+
+        # and kept on disk
+        del self.urls[:]
+        self.assertEqual('  * Second change.\n  * First change.',
+                         _delta_changelog(self.records, 2))
+        self.assertEqual([], self.urls)
+
+    def test_speculative(self):
+        del self.records[1]
+        self.assertEqual('  * Second change.', _delta_changelog(self.records, 8))
+        self.assertEqual(3, len(self.urls))
+        # The .changes past the last sync isn't kept
+        self.assertEqual(2, len(os.listdir(self.cache_dir)))
+
+    def test_prune(self):
+        _delta_changelog(self.records, 2)
+        for age, name in enumerate(sorted(os.listdir(self.cache_dir))):
+            os.utime(os.path.join(self.cache_dir, name), (age, age))
+        newest = sorted(os.listdir(self.cache_dir))[-2:]
+        _prune_changes(2)
+        self.assertEqual(newest, sorted(os.listdir(self.cache_dir)))
+
+    def test_native_sync(self):
+        self.records[1].changesFileUrl.return_value = None
+        self.assertEqual('  * Second change.', _delta_changelog(self.records, 8))
+        self.assertEqual([self.records[0].changesFileUrl.return_value], self.urls[:1])
+        # Nothing past the native sync is kept
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+    def test_thread_sessions(self):
+        _delta_changelog(self.records, 2)
+        # The first publication is looked up where it was loaded, the
+        # others again in the session of the worker thread
+        self.assertEqual([record.self_link for record in self.records[1:3]],
+                         sorted((link for thread, link in self.loads), reverse=True))
+        self.assertNotIn(threading.current_thread(),
+                         [thread for thread, link in self.loads])
+
+    def test_download_error(self):
+        self.records[1].changes = None
+        with mock.patch('ubuntutools.logger.Logger.stderr'):
+            self.assertEqual('  * Second change.', _delta_changelog(self.records, 1))
+
+
+def task(number, target, title, is_complete=False):
+    return mock.Mock(title='Bug #%d in %s: "%s"' % (number, target, title),
+                     web_link='https://launchpad.net/bugs/%d' % number,
+                     is_complete=is_complete)
+
+
+class SyncRequestsTestCase(unittest.TestCase):
+    @mock.patch('ubuntutools.requestsync.lp.Distribution')
+    def test_find(self, distribution):
+        search = distribution.return_value.searchTasks
+        search.return_value = [
+            task(1, 'foo (Ubuntu)', 'Sync foo 1.0-1 (universe) from Debian unstable (main)'),
+            task(2, 'foo (Ubuntu)', 'foo crashes on sync'),
+            task(3, 'foo (Ubuntu Disco)', 'FFe: Sync foo 1.1-1 (universe)'),
+            task(4, 'bar (Ubuntu)', 'Please sync bar 2.0-1 (main) from Debian'),
+            task(5, 'baz (Ubuntu)', 'Sync baz 1.0-1', is_complete=True),
+        ]
+        requests = SyncRequests()
+        self.assertEqual(['https://launchpad.net/bugs/1', 'https://launchpad.net/bugs/3'],
+                         [url for title, url in requests.find('foo')])
+        self.assertEqual([('Please sync bar 2.0-1 (main) from Debian',
+                           'https://launchpad.net/bugs/4')], requests.find('bar'))
+        self.assertEqual([], requests.find('baz'))
+        self.assertEqual([], requests.find('qux'))
+        search.assert_called_once_with(status=mock.ANY, omit_duplicates=True,
+                                       search_text='sync')
@@ -0,0 +1,100 @@
+# test_syncs.py - Test ubuntutools.lp.syncs.
+#
+# Copyright (C) 2019, Canonical Ltd.
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import mock
+
+from ubuntutools.lp.syncs import SyncBatch
+from ubuntutools.test import unittest
+
+
+def spph(version, component='main', pocket='Release'):
+    return mock.Mock(source_package_version=version, component_name=component,
+                     pocket=pocket)
+
+
+class SyncBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.blacklist = mock.Mock()
+        self.blacklist.check.return_value = (False, [])
+        series = mock.Mock()
+        series.name = 'disco'
+        self.batch = SyncBatch(mock.Mock(self_link='/debian'), mock.Mock(self_link='/sid'),
+                               mock.Mock(self_link='/ubuntu'), series, 'Proposed',
+                               mock.Mock(self_link='/current'), self.blacklist, jobs=1,
+                               checksums=mock.Mock())
+        self.objects = {'/debian': mock.Mock(), '/ubuntu': mock.Mock()}
+        self.batch._load = lambda link: self.objects.setdefault(link, mock.Mock())
+        self.published = {'/debian': {}, '/ubuntu': {}}
+        for link, published in self.published.items():
+            self.objects[link].getPublishedSources.side_effect = (
+                lambda source_name, published=published, **kwargs:
+                published.get(source_name, []))
+        self.batch._check_fakesync = mock.Mock()
+
+    def test_check(self):
+        self.published['/debian'].update({
+            'new': [spph('1.0-1')],
+            'newer': [spph('2.0-1'), spph('2.0-2')],
+            'older': [spph('1.0-1')],
+            'modified': [spph('1.0-2')],
+            'blacklisted': [spph('1.0-1')],
+        })
+        self.published['/ubuntu'].update({
+            'newer': [spph('2.0-1', pocket='Release'),
+                      spph('1.0-1', pocket='Proposed')],
+            'older': [spph('1.0-1ubuntu1')],
+            'modified': [spph('1.0-1ubuntu1')],
+        })
+        self.blacklist.check.side_effect = lambda name, series: (
+            ('ALWAYS', ['comment']) if name == 'blacklisted' else (False, []))
+
+        self.batch.check(['new', 'newer', 'older', 'modified', 'blacklisted',
+                          'missing', 'new'])
+        self.assertEqual([('new', '1.0-1', None, None),
+                          ('newer', '2.0-2', '1.0-1', None),
+                          ('older', '1.0-1', '1.0-1ubuntu1',
+                           "Version in Debian (1.0-1) isn't newer than Ubuntu"),
+                          ('modified', '1.0-2', '1.0-1ubuntu1',
+                           '--force is required to discard Ubuntu changes'),
+                          ('blacklisted', '1.0-1', None, 'Blacklisted'),
+                          ('missing', None, None, 'Not found in Debian')],
+                         [(c.name, c.version, c.ubuntu_version, c.error)
+                          for c in self.batch.candidates])
+        # Only the package already in Ubuntu, that passed the other checks
+        self.assertEqual(1, self.batch._check_fakesync.call_count)
+        self.assertEqual(['new', 'newer'], [c.name for c in self.batch.ready()])
+        _, debian, ubuntu = self.batch._check_fakesync.call_args[0]
+        self.assertEqual(('2.0-2', '1.0-1'), (debian.source_package_version,
+                                              ubuntu.source_package_version))
+        self.batch.checksums.save.assert_called_once_with()
+
+    def test_copy(self):
+        self.published['/debian'].update({'new': [spph('1.0-1')],
+                                          'other': [spph('1.0-1')]})
+        self.batch.check(['new', 'other', 'missing'])
+        self.batch.copy()
+        copy = self.objects['/ubuntu'].copyPackage
+        self.assertEqual(2, copy.call_count)
+        copy.assert_called_with(source_name='other', version='1.0-1',
+                                from_archive=self.objects['/debian'],
+                                to_series='disco', to_pocket='Proposed',
+                                include_binaries=False, sponsored=None)
+        self.assertEqual(self.batch.summary().splitlines(), [
+            'Package  Debian  Ubuntu  Status',
+            'new      1.0-1   -       requested',
+            'other    1.0-1   -       requested',
+            'missing  -       -       Not found in Debian',
+        ])